@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+
+from core.api_key import get_api_key
+from core.config import settings
+from core.core_model import CoreModel
+from services.s3 import copy_stats
+from workers.worker import pacer, replication
+
+router = APIRouter()
+
+
+class CopyStatsResponse(CoreModel):
+    streamed_objects: int
+    streamed_bytes: int
+    skipped_objects: int
+    skipped_bytes: int
+    saved_bytes: int  # байты, не прошедшие через сеть воркеров
+
+
+@router.get("/stats", response_model=CopyStatsResponse)
+def get_stats(api_key=Depends(get_api_key)):
+    return CopyStatsResponse(**copy_stats.get())
+
+
+class ReplicationStatsResponse(CoreModel):
+    queued: int  # фильмов в очереди репликации
+    queued_bytes: int  # их размер, если известен
+    active: int  # копируется сейчас
+    deleting: int  # удаляется сейчас, копирования ждут удалений
+    max_transfers: int
+    bandwidth: int  # ограничение полосы, байт/с, 0 - без ограничения
+    throughput: float  # байт/с через воркеры за последнюю минуту
+
+
+@router.get("/stats/replication", response_model=ReplicationStatsResponse)
+def get_replication_stats(api_key=Depends(get_api_key)):
+    return ReplicationStatsResponse(
+        **replication.stats(),
+        max_transfers=settings.REPLICATION_MAX_TRANSFERS,
+        bandwidth=settings.REPLICATION_BANDWIDTH,
+        throughput=pacer.throughput(),
+    )
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseSettings, Field
 
@@ -17,10 +18,46 @@ class Settings(BaseSettings):
     SYNC_URI: str = Field(..., env="S3LS_SYNC_URI")
     HEARTBEAT_URI: str = Field(..., env="S3LS_HEARTBEAT_URI")
     BEAT_TIMEOUT: int = Field(30, env="BEAT_TIMEOUT")
+    # уведомления отправляются на сервер синхронизации пачками по UPDATE_BATCH_SIZE,
+    # не больше UPDATE_MAX_BATCHES пачек за BEAT_TIMEOUT; список в это время заблокирован
+    # не дольше UPDATE_LOCK_TIMEOUT секунд
+    UPDATE_BATCH_SIZE: int = Field(500, env="S3LS_UPDATE_BATCH_SIZE")
+    UPDATE_MAX_BATCHES: int = Field(20, env="S3LS_UPDATE_MAX_BATCHES")
+    UPDATE_LOCK_TIMEOUT: int = Field(300, env="S3LS_UPDATE_LOCK_TIMEOUT")
+    # формат обновлений: packed - 17 байт на фильм, json; UPDATE_COMPRESSION - сжимать тело zlib
+    UPDATE_FORMAT: Literal["packed", "json"] = Field("packed", env="S3LS_UPDATE_FORMAT")
+    UPDATE_COMPRESSION: bool = Field(False, env="S3LS_UPDATE_COMPRESSION")
+    SYNC_TIMEOUT: float = Field(5, env="S3LS_SYNC_TIMEOUT")
     API_KEY: str = Field("secret", env="S3LS_API_KEY")
     BUCKET: str = "movies"
     ACCESS_KEY: str = Field(..., env="S3LS_ACCESS_KEY")
     SECRET_KEY: str = Field(..., env="S3LS_SECRET_KEY")
+    # доступность хранилищ и наличие bucket проверяются не чаще раза в MINIO_CHECK_TTL секунд на процесс воркера
+    MINIO_CHECK_TTL: float = Field(30, env="S3LS_MINIO_CHECK_TTL")
+    # объекты больше COPY_PART_SIZE копируются частями в COPY_CONCURRENCY потоков,
+    # в памяти воркера не больше COPY_PART_SIZE * COPY_CONCURRENCY байт на копирование
+    COPY_PART_SIZE: int = Field(16 * 1024 * 1024, env="S3LS_COPY_PART_SIZE")
+    COPY_CONCURRENCY: int = Field(4, env="S3LS_COPY_CONCURRENCY")
+    # репликация: одновременно копируется не больше REPLICATION_MAX_TRANSFERS фильмов,
+    # данные через воркеры идут не быстрее REPLICATION_BANDWIDTH байт/с (0 - без ограничения)
+    # с всплесками до REPLICATION_BURST байт; воркер продлевает место копирования, пока передает данные,
+    # место, которое не продлевалось REPLICATION_TRANSFER_TIMEOUT секунд (воркер упал), считается свободным;
+    # таймаут должен быть больше времени передачи одной части при ограниченной полосе
+    REPLICATION_MAX_TRANSFERS: int = Field(2, env="S3LS_REPLICATION_MAX_TRANSFERS")
+    REPLICATION_BANDWIDTH: int = Field(0, env="S3LS_REPLICATION_BANDWIDTH")
+    REPLICATION_BURST: int = Field(64 * 1024 * 1024, env="S3LS_REPLICATION_BURST")
+    REPLICATION_TRANSFER_TIMEOUT: int = Field(600, env="S3LS_REPLICATION_TRANSFER_TIMEOUT")
+    REPLICATION_SCHEDULE_INTERVAL: int = Field(10, env="S3LS_REPLICATION_SCHEDULE_INTERVAL")
+    # удаления и загрузки идут в разные очереди Celery со своими воркерами;
+    # загрузки ждут удалений задания синхронизации не дольше DELETE_TIMEOUT секунд
+    DELETE_QUEUE: str = Field("delete", env="S3LS_DELETE_QUEUE")
+    UPLOAD_QUEUE: str = Field("upload", env="S3LS_UPLOAD_QUEUE")
+    DELETE_TIMEOUT: int = Field(600, env="S3LS_DELETE_TIMEOUT")
+    # контрольные точки multipart копирования живут MULTIPART_CHECKPOINT_TTL секунд с последней части;
+    # незавершенные загрузки старше MULTIPART_STALE_AFTER удаляются раз в MULTIPART_JANITOR_INTERVAL
+    MULTIPART_CHECKPOINT_TTL: int = Field(2 * 24 * 3600, env="S3LS_MULTIPART_CHECKPOINT_TTL")
+    MULTIPART_STALE_AFTER: int = Field(24 * 3600, env="S3LS_MULTIPART_STALE_AFTER")
+    MULTIPART_JANITOR_INTERVAL: int = Field(3600, env="S3LS_MULTIPART_JANITOR_INTERVAL")
 
 
 settings = Settings(_env_file=ENV_FILE)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import AnyUrl
 
 from core.core_model import CoreModel
@@ -14,6 +16,9 @@ class Movie(CoreModel):
 class UploadTask(CoreModel):
     movie_id: MovieId
     storage_url: AnyUrl
+    # для порядка репликации: сначала популярные, из них - маленькие
+    size_bytes: Optional[int] = None
+    score: Optional[float] = None
 
 
 class SyncTask(CoreModel):
@@ -0,0 +1,73 @@
+import time
+from typing import NamedTuple, Optional
+
+from redis import Redis
+
+"""
+Контрольные точки multipart копирования в Redis.
+Для каждого копируемого объекта хранится hash с upload_id, размером части,
+ETag источника и ETag загруженных частей, поэтому повтор упавшей задачи
+продолжает загрузку с незагруженных частей, а не с начала файла.
+Ключ живет `ttl` секунд с последней загруженной части.
+"""
+
+
+class Checkpoint(NamedTuple):
+    upload_id: str
+    source_etag: str
+    size: int
+    part_size: int
+    parts: dict[int, str]  # номер части -> ETag
+    updated_at: float
+
+
+class CopyCheckpoints:
+    redis: Redis
+    prefix: str = "multipart"
+
+    def __init__(self, redis: Redis, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+
+    def key(self, bucket: str, object_name: str) -> str:
+        return "{0}:{1}/{2}".format(self.prefix, bucket, object_name)
+
+    def get(self, bucket: str, object_name: str) -> Optional[Checkpoint]:
+        values = self.redis.hgetall(self.key(bucket, object_name))
+        if not values or "upload_id" not in values:
+            return None
+        return Checkpoint(
+            upload_id=values["upload_id"],
+            source_etag=values["source_etag"],
+            size=int(values["size"]),
+            part_size=int(values["part_size"]),
+            parts={int(field[5:]): etag for field, etag in values.items() if field.startswith("part:")},
+            updated_at=float(values["updated_at"]),
+        )
+
+    def start(self, bucket: str, object_name: str, upload_id: str, source_etag: str, size: int, part_size: int):
+        key = self.key(bucket, object_name)
+        pipeline = self.redis.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(
+            key,
+            mapping={
+                "upload_id": upload_id,
+                "source_etag": source_etag,
+                "size": size,
+                "part_size": part_size,
+                "updated_at": time.time(),
+            },
+        )
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def add_part(self, bucket: str, object_name: str, number: int, etag: str):
+        key = self.key(bucket, object_name)
+        pipeline = self.redis.pipeline()
+        pipeline.hset(key, mapping={"part:{0}".format(number): etag, "updated_at": time.time()})
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def finish(self, bucket: str, object_name: str):
+        self.redis.delete(self.key(bucket, object_name))
@@ -0,0 +1,91 @@
+import logging
+import os
+import threading
+import time
+
+from minio import Minio
+from urllib3.exceptions import HTTPError
+
+"""
+Клиенты Minio, общие для задач одного процесса воркера.
+Клиент создается один раз на хранилище и переиспользует соединения своего пула,
+результаты проверок хранилища (доступно ли, есть ли bucket) запоминаются на `ttl` секунд,
+поэтому пачка задач синхронизации не делает лишних запросов перед каждым копированием.
+После fork (prefork пул Celery) клиенты создаются заново - соединения родителя не используются.
+"""
+
+Endpoint = tuple[bool, str]  # https, host:port
+
+
+def split_host_uri(host: str) -> Endpoint:
+    """
+    выделяет из URL хост и схему
+    Так как Минио вместе со схемой не понимает путь
+    """
+    lst = host.lower().rstrip("/").split("://")
+    secure = (len(lst) == 2) and (lst[0] == "https")
+    return secure, lst[-1]
+
+
+class MinioPool:
+    def __init__(self, access_key: str, secret_key: str, ttl: float):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.ttl = ttl
+        self.clients: dict[Endpoint, Minio] = {}
+        self.checks: dict[tuple[Endpoint, str], tuple[bool, float]] = {}  # (хранилище, bucket) -> результат, время
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def get(self, host: str) -> Minio:
+        endpoint = split_host_uri(host)
+        with self.lock:
+            if self.pid != os.getpid():
+                self.clients.clear()
+                self.checks.clear()
+                self.pid = os.getpid()
+            client = self.clients.get(endpoint)
+            if client is None:
+                secure, address = endpoint
+                client = Minio(address, access_key=self.access_key, secret_key=self.secret_key, secure=secure)
+                self.clients[endpoint] = client
+        return client
+
+    def cached(self, host: str, bucket: str):
+        """Запомненный результат проверки или None, если его нет или он устарел"""
+        result, checked_at = self.checks.get((split_host_uri(host), bucket), (None, 0.0))
+        if time.monotonic() - checked_at > self.ttl:
+            return None
+        return result
+
+    def remember(self, host: str, bucket: str, result: bool):
+        self.checks[(split_host_uri(host), bucket)] = (result, time.monotonic())
+
+    def forget(self, host: str):
+        """Сбросить проверки хранилища, например после ошибки запроса к нему"""
+        endpoint = split_host_uri(host)
+        for key in [key for key in self.checks if key[0] == endpoint]:
+            self.checks.pop(key, None)
+
+    def is_available(self, host: str, bucket: str) -> bool:
+        """Хранилище отвечает; bucket при этом может и не существовать"""
+        result = self.cached(host, bucket)
+        if result is not None:
+            return True
+        try:
+            found = self.get(host).bucket_exists(bucket)
+        except HTTPError as err:
+            logging.error("storage {0} is not available: {1}".format(host, err))
+            return False
+        self.remember(host, bucket, found)
+        return True
+
+    def ensure_bucket(self, host: str, bucket: str):
+        """Создает bucket, если его нет; S3Error и HTTPError не перехватываются"""
+        if self.cached(host, bucket):
+            return
+        client = self.get(host)
+        if not client.bucket_exists(bucket):
+            client.make_bucket(bucket)
+            logging.debug("Create new bucket: [{0}]".format(bucket))
+        self.remember(host, bucket, True)
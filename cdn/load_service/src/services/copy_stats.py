@@ -0,0 +1,41 @@
+import logging
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+"""
+Счетчики копирования в Redis, общие для всех воркеров.
+Для каждого способа копирования считаются объекты и байты:
+streamed - данные прошли через воркер (get_object - put_object или multipart),
+skipped - в хранилище назначения уже лежит такой же объект, данные не передавались.
+"""
+
+MODES = ("streamed", "skipped")
+
+
+class CopyStats:
+    redis: Redis
+    key: str = "copy_stats"
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    def add(self, mode: str, size: int):
+        pipeline = self.redis.pipeline()
+        pipeline.hincrby(self.key, "{0}_objects".format(mode), 1)
+        pipeline.hincrby(self.key, "{0}_bytes".format(mode), size)
+        try:
+            pipeline.execute()
+        except RedisError as err:
+            # без счетчиков копирование все равно успешно
+            logging.error("can't update copy stats: {0}".format(err))
+
+    def get(self) -> dict[str, int]:
+        values = self.redis.hgetall(self.key)
+        stats = {}
+        for mode in MODES:
+            for unit in ("objects", "bytes"):
+                field = "{0}_{1}".format(mode, unit)
+                stats[field] = int(values.get(field, 0))
+        stats["saved_bytes"] = stats["skipped_bytes"]
+        return stats
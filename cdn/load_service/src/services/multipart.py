@@ -0,0 +1,222 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from minio import Minio
+from minio.datatypes import Part
+from minio.error import S3Error
+from urllib3.exceptions import HTTPError
+
+from services.checkpoints import CopyCheckpoints
+from services.pacing import Pacer
+
+"""
+Параллельное копирование объекта между хранилищами Minio.
+Объект делится на части, части читаются ranged GET запросами и загружаются
+как части multipart upload одновременно в `concurrency` потоков.
+В памяти одновременно не больше `concurrency` частей.
+Целостность проверяется по ETag: ETag части - md5 ее данных,
+ETag собранного объекта - md5 от md5 частей с числом частей через дефис.
+С контрольными точками загруженные части запоминаются, и при повторе
+копирования того же объекта незагруженные части докачиваются в ту же
+multipart загрузку; брошенные загрузки удаляет abort_stale_uploads.
+"""
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # ограничения S3 multipart upload
+MAX_PARTS = 10000
+# ETag источника в метаданных копии: ETag multipart копии не совпадает с ETag источника
+SOURCE_ETAG_HEADER = "X-Amz-Meta-Source-Etag"
+
+
+class CopyError(Exception):
+    pass
+
+
+class PartRange(NamedTuple):
+    number: int
+    offset: int
+    length: int
+
+
+def split_parts(size: int, part_size: int) -> list[PartRange]:
+    """Делит объект на части; размер части увеличивается, если частей больше MAX_PARTS"""
+    part_size = max(part_size, MIN_PART_SIZE, -(-size // MAX_PARTS))
+    return [
+        PartRange(number, offset, min(part_size, size - offset))
+        for number, offset in enumerate(range(0, size, part_size), start=1)
+    ]
+
+
+def multipart_etag(part_digests: list[bytes]) -> str:
+    return "{0}-{1}".format(hashlib.md5(b"".join(part_digests)).hexdigest(), len(part_digests))
+
+
+class MultipartCopier:
+    def __init__(
+        self,
+        source: Minio,
+        destination: Minio,
+        part_size: int,
+        concurrency: int,
+        checkpoints: Optional[CopyCheckpoints] = None,
+        pacer: Optional[Pacer] = None,
+    ):
+        self.source = source
+        self.destination = destination
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.checkpoints = checkpoints
+        self.pacer = pacer
+
+    def copy(
+        self,
+        source_bucket: str,
+        source_object: str,
+        destination_bucket: str,
+        destination_object: str,
+        size: int,
+        source_etag: str = "",
+    ) -> dict:
+        upload_id, part_size, done = self.start(destination_bucket, destination_object, size, source_etag)
+        parts = split_parts(size, part_size)
+
+        def copy_part(part: PartRange) -> tuple[Part, bytes]:
+            return self.copy_part(
+                source_bucket, source_object, destination_bucket, destination_object, upload_id, part
+            )
+
+        try:
+            uploaded = self.run_parts(copy_part, [part for part in parts if part.number not in done])
+            uploaded += [(Part(number, etag), bytes.fromhex(etag)) for number, etag in done.items()]
+            uploaded.sort(key=lambda item: item[0].part_number)
+            result = self.destination._complete_multipart_upload(
+                destination_bucket, destination_object, upload_id, [part for part, _ in uploaded]
+            )
+        except (S3Error, HTTPError) as err:
+            # загрузка остается для повтора, если ее есть где продолжить
+            if not self.checkpoints or (isinstance(err, S3Error) and err.code == "NoSuchUpload"):
+                self.abort(destination_bucket, destination_object, upload_id)
+            raise
+        except CopyError:
+            self.abort(destination_bucket, destination_object, upload_id)
+            raise
+
+        if self.checkpoints:
+            self.checkpoints.finish(destination_bucket, destination_object)
+        etag = result.etag.strip('"')
+        expected = multipart_etag([digest for _, digest in uploaded])
+        if etag != expected:
+            raise CopyError(
+                "{0}: etag {1} does not match parts, expected {2}".format(destination_object, etag, expected)
+            )
+
+        logging.debug("copied {0} in {1} parts; etag: {2}".format(destination_object, len(parts), etag))
+        return {"name": destination_object, "etag": etag, "size": size}
+
+    def run_parts(self, copy_part, parts: list[PartRange]) -> list[tuple[Part, bytes]]:
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="copy") as pool:
+            futures = [pool.submit(copy_part, part) for part in parts]
+            try:
+                return [future.result() for future in futures]
+            except BaseException:
+                # после первой ошибки оставшиеся части не копируются
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def start(self, bucket: str, object_name: str, size: int, source_etag: str) -> tuple[str, int, dict[int, str]]:
+        """upload_id, размер части и уже загруженные части - продолженной или новой загрузки"""
+        if self.checkpoints:
+            checkpoint = self.checkpoints.get(bucket, object_name)
+            if checkpoint and (checkpoint.source_etag, checkpoint.size) == (source_etag, size):
+                logging.info(
+                    "resume upload of {0}: {1} parts are uploaded".format(object_name, len(checkpoint.parts))
+                )
+                return checkpoint.upload_id, checkpoint.part_size, checkpoint.parts
+            if checkpoint:
+                # источник изменился - старые части не подходят
+                self.abort(bucket, object_name, checkpoint.upload_id)
+
+        headers = {"Content-Type": "application/octet-stream"}
+        if source_etag:
+            headers[SOURCE_ETAG_HEADER] = source_etag
+        upload_id = self.destination._create_multipart_upload(bucket, object_name, headers)
+        if self.checkpoints:
+            self.checkpoints.start(bucket, object_name, upload_id, source_etag, size, self.part_size)
+        return upload_id, self.part_size, {}
+
+    def copy_part(
+        self,
+        source_bucket: str,
+        source_object: str,
+        destination_bucket: str,
+        destination_object: str,
+        upload_id: str,
+        part: PartRange,
+    ) -> tuple[Part, bytes]:
+        response = self.source.get_object(source_bucket, source_object, offset=part.offset, length=part.length)
+        try:
+            data = response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+        if len(data) != part.length:
+            raise CopyError(
+                "{0}: part {1} is {2} bytes, expected {3}".format(source_object, part.number, len(data), part.length)
+            )
+        if self.pacer:
+            self.pacer.take(len(data))
+
+        digest = hashlib.md5(data).digest()
+        etag = self.destination._upload_part(
+            destination_bucket, destination_object, data, None, upload_id, part.number
+        ).strip('"')
+        if etag != digest.hex():
+            raise CopyError("{0}: part {1} etag does not match its data".format(destination_object, part.number))
+        if self.checkpoints:
+            self.checkpoints.add_part(destination_bucket, destination_object, part.number, etag)
+        return Part(part.number, etag), digest
+
+    def abort(self, bucket: str, object_name: str, upload_id: str):
+        if self.checkpoints:
+            self.checkpoints.finish(bucket, object_name)
+        try:
+            self.destination._abort_multipart_upload(bucket, object_name, upload_id)
+        except (S3Error, HTTPError) as err:
+            logging.error("can't abort upload {0} of {1}: {2}".format(upload_id, object_name, err))
+
+
+def abort_stale_uploads(
+    minio: Minio, bucket: str, checkpoints: Optional[CopyCheckpoints], stale_after: float
+) -> list[str]:
+    """
+    Удаляет незавершенные multipart загрузки, начатые больше stale_after секунд назад,
+    кроме загрузок с контрольной точкой, обновлявшейся за это время.
+    Возвращает имена объектов, загрузки которых удалены.
+    """
+    now = datetime.now(timezone.utc)
+    aborted = []
+    key_marker = upload_id_marker = None
+    while True:
+        result = minio._list_multipart_uploads(bucket, key_marker=key_marker, upload_id_marker=upload_id_marker)
+        for upload in result.uploads:
+            if upload.initiated_time and now - upload.initiated_time < timedelta(seconds=stale_after):
+                continue
+            checkpoint = checkpoints.get(bucket, upload.object_name) if checkpoints else None
+            if checkpoint and checkpoint.upload_id == upload.upload_id:
+                if now.timestamp() - checkpoint.updated_at < stale_after:
+                    continue
+                checkpoints.finish(bucket, upload.object_name)
+            try:
+                minio._abort_multipart_upload(bucket, upload.object_name, upload.upload_id)
+            except S3Error as err:
+                logging.error("can't abort upload {0} of {1}: {2}".format(upload.upload_id, upload.object_name, err))
+                continue
+            aborted.append(upload.object_name)
+
+        if not result.is_truncated:
+            return aborted
+        key_marker, upload_id_marker = result.next_key_marker, result.next_upload_id_marker
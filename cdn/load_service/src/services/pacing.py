@@ -0,0 +1,101 @@
+import time
+from typing import Callable, Optional
+
+from redis import Redis
+
+"""
+Ограничение полосы, которую занимает репликация на хранилище.
+Token bucket в Redis общий для всех воркеров хранилища: каждый прочитанный
+из источника кусок забирает из корзины столько токенов, сколько в нем байт,
+корзина пополняется со скоростью rate байт в секунду до burst байт.
+Если токенов не хватило, корзина уходит в долг, а воркер ждет, пока долг
+не погасится, - так общий поток не превышает rate при любом числе копирований.
+Заодно считается пропускная способность репликации по 10-секундным окнам.
+Pacer копирования (for_transfer) на каждом куске еще и вызывает heartbeat,
+который продлевает место копирования в очереди репликации.
+"""
+
+# KEYS[1] - корзина; ARGV - скорость, емкость, текущее время, число байт;
+# возвращает, сколько секунд ждать (строкой - Lua округляет числа до целых)
+TAKE_SCRIPT = """
+local rate, burst, now, amount = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate) - amount
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+WINDOW = 10  # секунд в окне счетчика пропускной способности
+
+
+class Pacer:
+    redis: Redis
+    bucket_key: str = "replication:bucket"
+    bytes_prefix: str = "replication:bytes"
+
+    def __init__(
+        self,
+        redis: Redis,
+        rate: float,
+        burst: float,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        heartbeat: Optional[Callable[[], None]] = None,
+    ):
+        """rate - байт в секунду, 0 - без ограничения"""
+        self.redis = redis
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.heartbeat = heartbeat
+        self.take_script = redis.register_script(TAKE_SCRIPT)
+
+    def for_transfer(self, heartbeat: Callable[[], None]) -> "Pacer":
+        """Pacer с той же корзиной для одного копирования"""
+        return Pacer(self.redis, self.rate, self.burst, self.clock, self.sleep, heartbeat)
+
+    def take(self, amount: int) -> float:
+        """Учитывает amount переданных байт и ждет, если полоса занята; возвращает время ожидания"""
+        if self.heartbeat:
+            self.heartbeat()
+        now = self.clock()
+        window = "{0}:{1}".format(self.bytes_prefix, int(now) // WINDOW)
+        pipeline = self.redis.pipeline()
+        pipeline.incrby(window, amount)
+        pipeline.expire(window, WINDOW * 10)
+        pipeline.execute()
+
+        if not self.rate:
+            return 0.0
+        wait = float(self.take_script(keys=[self.bucket_key], args=[self.rate, self.burst, now, amount]))
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def throughput(self, seconds: int = 60) -> float:
+        """Байт в секунду за последние seconds секунд, без текущего неполного окна"""
+        current = int(self.clock()) // WINDOW
+        windows = max(seconds // WINDOW, 1)
+        keys = ["{0}:{1}".format(self.bytes_prefix, current - n) for n in range(1, windows + 1)]
+        return sum(int(value or 0) for value in self.redis.mget(keys)) / (windows * WINDOW)
+
+
+class PacedReader:
+    """Поток ответа Minio, чтение из которого учитывается в Pacer"""
+
+    def __init__(self, stream, pacer: Pacer):
+        self.stream = stream
+        self.pacer = pacer
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        if data:
+            self.pacer.take(len(data))
+        return data
@@ -0,0 +1,41 @@
+import zlib
+from uuid import UUID
+
+from models.update import Actions, Updates
+
+"""
+Форматы уведомлений для сервера синхронизации.
+JSON - Updates как есть, со строковыми UUID и названиями действий.
+Упакованный (CONTENT_TYPE) - байт версии формата, затем записи по 17 байт:
+16 байт UUID фильма и байт действия, в несколько раз меньше JSON.
+Тело любого формата можно сжать zlib (Content-Encoding: deflate).
+"""
+
+JSON_CONTENT_TYPE = "application/json"
+CONTENT_TYPE = "application/vnd.film-actions"
+VERSION = 1
+ACTION_CODES = {Actions.UPLOAD: 1, Actions.DELETE: 2}
+
+
+def pack_updates(updates: Updates) -> bytes:
+    """ValueError, если movie_id не UUID - такие обновления можно отправить только в JSON"""
+    records = (UUID(item.movie_id).bytes + bytes([ACTION_CODES[item.action]]) for item in updates.items)
+    return bytes([VERSION]) + b"".join(records)
+
+
+def encode_updates(updates: Updates, packed: bool, compress: bool) -> tuple[bytes, dict[str, str]]:
+    """Тело запроса и его заголовки"""
+    body, content_type = None, JSON_CONTENT_TYPE
+    if packed:
+        try:
+            body, content_type = pack_updates(updates), CONTENT_TYPE
+        except ValueError:
+            pass
+    if body is None:
+        body = updates.json().encode()
+
+    headers = {"Content-Type": content_type}
+    if compress:
+        body = zlib.compress(body)
+        headers["Content-Encoding"] = "deflate"
+    return body, headers
@@ -1,16 +1,28 @@
 import logging
+from typing import Optional
 
 from minio import Minio
+from minio.datatypes import Object
 from minio.error import S3Error
 from urllib3.exceptions import HTTPError
 
 from core.config import settings
+from services.checkpoints import CopyCheckpoints
+from services.clients import MinioPool
+from services.copy_stats import CopyStats
+from services.multipart import SOURCE_ETAG_HEADER, CopyError, MultipartCopier, abort_stale_uploads
+from services.pacing import PacedReader, Pacer
+from services.storage import redis
 
 """Обертка над Minio для копирования и удаления"""
 
 PART_SIZE = 10 * 1024 * 1024
 PARALLEL_UPLOADS = 4
 
+minio_pool = MinioPool(settings.ACCESS_KEY, settings.SECRET_KEY, settings.MINIO_CHECK_TTL)
+copy_checkpoints = CopyCheckpoints(redis, settings.MULTIPART_CHECKPOINT_TTL)
+copy_stats = CopyStats(redis)
+
 
 class LoaderException(Exception):
     pass
@@ -19,57 +31,99 @@ class LoaderException(Exception):
 class MinioLoader:
     source_minio: Minio
     destination_minio: Minio
-    part_size = 10 * 1024 * 1024  # для загрузки больших файлов по частям
-    parallel_uploads = 4
-
-    def __init__(self, source_host: str, destination_host: str, access_key: str, secret_key: str):
-        def split_host_uri(host: str) -> tuple[bool, str]:
-            """
-            выделяет из URL хост и схему
-            Так как Минио вместе со схемой не понимает путь
-            """
-            lst = host.split("://")
-            secure = (len(lst) == 2) and (lst[0] == "https")
-            return secure, lst[-1]
+    part_size = settings.COPY_PART_SIZE  # объекты больше копируются по частям параллельно
+    parallel_uploads = settings.COPY_CONCURRENCY
 
-        secure, host = split_host_uri(source_host)
-        self.source_minio = Minio(host, access_key=access_key, secret_key=secret_key, secure=secure)
-
-        secure, host = split_host_uri(destination_host)
-        self.destination_minio = Minio(host, access_key=access_key, secret_key=secret_key, secure=secure)
+    def __init__(self, source_host: str, destination_host: str, pool: MinioPool, pacer: Optional[Pacer] = None):
+        self.pool = pool
+        self.pacer = pacer  # ограничение полосы для данных, идущих через воркер
+        self.source_host = source_host
+        self.destination_host = destination_host
+        self.source_minio = pool.get(source_host)
+        self.destination_minio = pool.get(destination_host)
 
     def copy_file(
         self, source_bucket: str, source_object: str, destination_bucket: str, destination_object: str
     ) -> dict:
-        # 1 Получаем объект
+        # 1 Узнаем размер объекта
         try:
-            response = self.source_minio.get_object(source_bucket, source_object)
-            size = int(response.info()["Content-Length"])
+            stat = self.source_minio.stat_object(source_bucket, source_object)
         except (S3Error, HTTPError) as err:
             logging.error(err)
+            self.pool.forget(self.source_host)
             raise LoaderException(err)
 
         try:
             # 2 создаем bucket если его нет
-            found = self.destination_minio.bucket_exists(destination_bucket)
-            if not found:
-                self.destination_minio.make_bucket(destination_bucket)
-                logging.debug("Create new bucket: [{0}]".format(destination_bucket))
+            self.pool.ensure_bucket(self.destination_host, destination_bucket)
+
+            # 3 Такой же объект уже есть - копировать нечего
+            if self.is_copied(stat, destination_bucket, destination_object):
+                logging.debug("{0} is already in {1}".format(destination_object, destination_bucket))
+                result = {"name": destination_object, "etag": stat.etag, "size": stat.size, "copy": "skipped"}
+
+            # 4 Копируем данные через воркер: большие объекты - частями параллельно
+            elif stat.size <= self.part_size:
+                result = self.stream_copy(
+                    source_bucket, source_object, destination_bucket, destination_object, stat.etag
+                )
+            else:
+                copier = MultipartCopier(
+                    self.source_minio,
+                    self.destination_minio,
+                    self.part_size,
+                    self.parallel_uploads,
+                    copy_checkpoints,
+                    self.pacer,
+                )
+                result = copier.copy(
+                    source_bucket, source_object, destination_bucket, destination_object, stat.size, stat.etag
+                )
+                result["copy"] = "streamed"
+
+        except (S3Error, HTTPError, CopyError) as err:
+            logging.error(err)
+            self.pool.forget(self.destination_host)
+            raise LoaderException(err)
+
+        copy_stats.add(result["copy"], stat.size)
+        return result
 
-            # 3 Копируем данные
+    def is_copied(self, source: Object, destination_bucket: str, destination_object: str) -> bool:
+        """
+        В назначении лежит копия source: совпадают размер и ETag, или ETag источника,
+        записанный в метаданные при копировании (ETag multipart копии зависит от размера частей)
+        """
+        try:
+            stat = self.destination_minio.stat_object(destination_bucket, destination_object)
+        except S3Error as err:
+            if err.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
+        if stat.size != source.size:
+            return False
+        return source.etag in (stat.etag, stat.metadata.get(SOURCE_ETAG_HEADER))
+
+    def stream_copy(
+        self,
+        source_bucket: str,
+        source_object: str,
+        destination_bucket: str,
+        destination_object: str,
+        source_etag: str = "",
+    ) -> dict:
+        """Копирование одним потоком через get_object - put_object, для небольших объектов"""
+        response = self.source_minio.get_object(source_bucket, source_object)
+        try:
+            size = int(response.info()["Content-Length"])
             result = self.destination_minio.put_object(
                 destination_bucket,
                 destination_object,
-                data=response,
+                data=PacedReader(response, self.pacer) if self.pacer else response,
                 length=size,
-                num_parallel_uploads=self.parallel_uploads,
-                part_size=self.part_size,
+                metadata={SOURCE_ETAG_HEADER: source_etag} if source_etag else None,
             )
-
-        except HTTPError as err:
-            logging.error(err)
-            raise LoaderException(err)
-
         finally:
             response.close()
             response.release_conn()
@@ -77,31 +131,21 @@ class MinioLoader:
         logging.debug(
             "created {0} object; etag: {1}, version-id: {2}".format(result.object_name, result.etag, result.version_id)
         )
-        return {"name": result.object_name, "etag": result.etag, "size": size}
-
-    def check_source(self) -> bool:
-        try:
-            self.source_minio.bucket_exists("movies")
-        except HTTPError:
-            return False
-
-        return True
+        return {"name": result.object_name, "etag": result.etag, "size": size, "copy": "streamed"}
 
-    def check_destination(self) -> bool:
-        try:
-            self.destination_minio.bucket_exists("movies")
-        except HTTPError:
-            return False
+    def check_source(self, bucket: str) -> bool:
+        return self.pool.is_available(self.source_host, bucket)
 
-        return True
+    def check_destination(self, bucket: str) -> bool:
+        return self.pool.is_available(self.destination_host, bucket)
 
 
-def copy_file(file_name: str, source: str, destination: str) -> dict[str, str]:
-    loader = MinioLoader(source, destination, settings.ACCESS_KEY, settings.SECRET_KEY)
-    if not loader.check_source():
+def copy_file(file_name: str, source: str, destination: str, pacer: Optional[Pacer] = None) -> dict[str, str]:
+    loader = MinioLoader(source, destination, minio_pool, pacer)
+    if not loader.check_source(settings.BUCKET):
         return {"error": "source check error"}
 
-    if not loader.check_destination():
+    if not loader.check_destination(settings.BUCKET):
         return {"error": "destination check error"}
 
     try:
@@ -114,7 +158,7 @@ def copy_file(file_name: str, source: str, destination: str) -> dict[str, str]:
 
 
 def delete_file(file_name: str, storage: str) -> dict[str, str]:
-    minio = Minio(storage, access_key=settings.ACCESS_KEY, secret_key=settings.SECRET_KEY, secure=False)
+    minio = minio_pool.get(storage)
     try:
         # Ругнется если не будет файла.
         minio.stat_object(settings.BUCKET, file_name)
@@ -129,12 +173,9 @@ def delete_file(file_name: str, storage: str) -> dict[str, str]:
 
 
 def load_file_to_storage(file_path: str, object_name: str, storage: str):
-    minio = Minio(storage, access_key=settings.ACCESS_KEY, secret_key=settings.SECRET_KEY, secure=False)
+    minio = minio_pool.get(storage)
     try:
-        bucket = minio.bucket_exists(settings.BUCKET)
-        if not bucket:
-            minio.make_bucket(settings.BUCKET)
-            logging.debug("Create new bucket: [{0}]".format(settings.BUCKET))
+        minio_pool.ensure_bucket(storage, settings.BUCKET)
         result = minio.fput_object(
             bucket_name=settings.BUCKET,
             object_name=object_name,
@@ -149,3 +190,13 @@ def load_file_to_storage(file_path: str, object_name: str, storage: str):
             "created {0} object; etag: {1}, version-id: {2}".format(result.object_name, result.etag, result.version_id)
         )
     return {"result": "uploaded", "name": result.object_name, "storage": storage, "etag": result.etag}
+
+
+def abort_stale_multipart_uploads(storage: str) -> dict:
+    minio = minio_pool.get(storage)
+    try:
+        aborted = abort_stale_uploads(minio, settings.BUCKET, copy_checkpoints, settings.MULTIPART_STALE_AFTER)
+    except (S3Error, HTTPError) as err:
+        return {"error": str(err)}
+
+    return {"result": "aborted", "names": aborted, "storage": storage}
@@ -0,0 +1,146 @@
+import json
+import time
+from typing import Callable, NamedTuple, Optional
+
+from redis import Redis
+
+"""
+Очередь репликации фильмов на хранилище.
+Задачи загрузки из задания синхронизации не запускаются сразу, а ставятся в
+очередь в Redis - sorted set, в котором сначала идут самые популярные фильмы,
+из равных по популярности - самые маленькие. Одновременно копируется не больше
+max_transfers фильмов: next_transfers забирает из очереди столько задач, сколько
+свободно мест, finish освобождает место. Пока идет копирование, воркер продлевает
+место (heartbeat); место, которое не продлевалось transfer_timeout секунд
+(воркер упал и after_return задачи не выполнился), считается свободным.
+Пока выполняются удаления из задания синхронизации (hold_for_deletes), новые
+копирования не запускаются: удаления освобождают место, которое нужно загрузкам.
+Удаление, не завершенное за delete_timeout секунд, копирования больше не держит.
+"""
+
+# KEYS - очередь, задачи, активные копирования; ARGV - movie_id, элемент очереди, приоритет, задача
+ENQUEUE_SCRIPT = """
+if redis.call('ZSCORE', KEYS[3], ARGV[1]) then
+    return 0
+end
+local old = redis.call('HGET', KEYS[2], ARGV[1])
+if old then
+    redis.call('ZREM', KEYS[1], cjson.decode(old)['member'])
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[2])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[4])
+return 1
+"""
+
+# KEYS[4] - удаляемые фильмы; ARGV - число мест, текущее время, transfer_timeout, delete_timeout;
+# возвращает запущенные задачи
+NEXT_SCRIPT = """
+local limit, now, timeout = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', now - tonumber(ARGV[4]))
+if redis.call('ZCARD', KEYS[4]) > 0 then
+    return {}
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - timeout)
+local free = limit - redis.call('ZCARD', KEYS[3])
+local started = {}
+while free > 0 do
+    local member = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+    if not member then
+        break
+    end
+    redis.call('ZREM', KEYS[1], member)
+    local task = redis.call('HGET', KEYS[2], string.sub(member, 22))
+    if task then
+        local movie_id = cjson.decode(task)['movie_id']
+        redis.call('HDEL', KEYS[2], movie_id)
+        redis.call('ZADD', KEYS[3], now, movie_id)
+        table.insert(started, task)
+        free = free - 1
+    end
+end
+return started
+"""
+
+
+class Transfer(NamedTuple):
+    movie_id: str
+    storage_url: str
+    size_bytes: Optional[int] = None
+    score: Optional[float] = None
+
+
+class ReplicationScheduler:
+    redis: Redis
+    queue_key: str = "replication:queue"  # элемент - размер (20 цифр):movie_id, оценка - минус популярность
+    tasks_key: str = "replication:tasks"  # movie_id -> задача
+    active_key: str = "replication:active"  # movie_id -> время запуска или продления
+    deleting_key: str = "replication:deleting"  # movie_id -> время запуска удаления
+
+    def __init__(self, redis: Redis, max_transfers: int, transfer_timeout: float, delete_timeout: float = 600):
+        self.redis = redis
+        self.max_transfers = max_transfers
+        self.transfer_timeout = transfer_timeout
+        self.delete_timeout = delete_timeout
+        self.keys = [self.queue_key, self.tasks_key, self.active_key, self.deleting_key]
+        self.enqueue_script = redis.register_script(ENQUEUE_SCRIPT)
+        self.next_script = redis.register_script(NEXT_SCRIPT)
+
+    def enqueue(self, transfer: Transfer) -> bool:
+        """Ставит фильм в очередь или обновляет его задачу; False - фильм уже копируется"""
+        # фильмы без размера - после фильмов той же популярности с известным размером
+        size = transfer.size_bytes if transfer.size_bytes is not None else 10**20 - 1
+        member = "{0:020d}:{1}".format(size, transfer.movie_id)
+        task = json.dumps({**transfer._asdict(), "member": member})
+        priority = -(transfer.score or 0.0)
+        return bool(self.enqueue_script(keys=self.keys, args=[transfer.movie_id, member, priority, task]))
+
+    def next_transfers(self) -> list[Transfer]:
+        """Забирает из очереди задачи на свободные места"""
+        started = self.next_script(
+            keys=self.keys, args=[self.max_transfers, time.time(), self.transfer_timeout, self.delete_timeout]
+        )
+        transfers = []
+        for task in started:
+            values = json.loads(task)
+            values.pop("member")
+            transfers.append(Transfer(**values))
+        return transfers
+
+    def finish(self, movie_id: str):
+        self.redis.zrem(self.active_key, movie_id)
+
+    def touch(self, movie_id: str):
+        """Продлевает место копирования; освобожденное или устаревшее место не занимается заново"""
+        self.redis.zadd(self.active_key, {movie_id: time.time()}, xx=True)
+
+    def heartbeat(self, movie_id: str) -> Callable[[], None]:
+        """Функция для цикла копирования: продлевает место не чаще, чем раз в 1/10 transfer_timeout"""
+        touched_at = None
+
+        def beat():
+            nonlocal touched_at
+            now = time.monotonic()
+            if touched_at is None or now - touched_at >= self.transfer_timeout / 10:
+                touched_at = now
+                self.touch(movie_id)
+
+        return beat
+
+    def hold_for_deletes(self, movie_ids: list[str]):
+        """Не запускать копирования, пока не закончатся удаления movie_ids"""
+        if movie_ids:
+            now = time.time()
+            self.redis.zadd(self.deleting_key, {movie_id: now for movie_id in movie_ids})
+
+    def delete_done(self, movie_id: str):
+        self.redis.zrem(self.deleting_key, movie_id)
+
+    def stats(self) -> dict:
+        pipeline = self.redis.pipeline()
+        pipeline.zcard(self.queue_key)
+        pipeline.zcard(self.active_key)
+        pipeline.zcard(self.deleting_key)
+        pipeline.hvals(self.tasks_key)
+        queued, active, deleting, tasks = pipeline.execute()
+        queued_bytes = sum(json.loads(task)["size_bytes"] or 0 for task in tasks)
+        return {"queued": queued, "queued_bytes": queued_bytes, "active": active, "deleting": deleting}
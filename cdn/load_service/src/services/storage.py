@@ -2,50 +2,125 @@ import backoff
 from pydantic.error_wrappers import ValidationError
 from redis import Redis
 from redis.exceptions import RedisError
+from redis.lock import Lock
 
 from core.config import settings
 from models.update import UpdateItem, Updates
 
-""" Обертка над редис для хранения списка синхронизации"""
+""" Обертка над редис для хранения обновлений для сервера синхронизации"""
 
 __all__ = ("storage",)
 
+# добавить действие с фильмом: последнее действие в hash, номер изменения - в sorted set
+ADD_SCRIPT = """
+local sequence = redis.call('INCR', KEYS[3])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], sequence, ARGV[1])
+return sequence
+"""
+
+# удалить отправленные действия, если с момента чтения фильм не менялся:
+# ARGV - пары movie_id, номер изменения на момент чтения
+ACK_SCRIPT = """
+local deleted = 0
+for i = 1, #ARGV, 2 do
+    if redis.call('ZSCORE', KEYS[2], ARGV[i]) == ARGV[i + 1] then
+        redis.call('ZREM', KEYS[2], ARGV[i])
+        redis.call('HDEL', KEYS[1], ARGV[i])
+        deleted = deleted + 1
+    end
+end
+return deleted
+"""
+
+# перенести до ARGV[1] уведомлений из списка прежнего формата, сообщения с ошибками удаляются
+MIGRATE_SCRIPT = """
+local messages = redis.call('LRANGE', KEYS[4], 0, tonumber(ARGV[1]) - 1)
+for _, message in ipairs(messages) do
+    local ok, item = pcall(cjson.decode, message)
+    if ok and type(item) == 'table' and type(item['movie_id']) == 'string' and type(item['action']) == 'string' then
+        local sequence = redis.call('INCR', KEYS[3])
+        redis.call('HSET', KEYS[1], item['movie_id'], item['action'])
+        redis.call('ZADD', KEYS[2], sequence, item['movie_id'])
+    end
+end
+redis.call('LTRIM', KEYS[4], #messages, -1)
+return #messages
+"""
+
 
 class Storage:
+    """
+    Уведомления о действиях с фильмами для сервера синхронизации.
+    Для каждого фильма хранится только последнее действие: повторы и смена
+    UPLOAD/DELETE между отправками схлопываются, отправляется итоговое состояние.
+    Порядок отправки - по времени последнего изменения фильма.
+    """
+
     redis: Redis
-    update_key: str = "sync"
+    update_key: str = "sync"  # список уведомлений прежнего формата
+    actions_key: str = "sync:actions"  # movie_id -> последнее действие
+    order_key: str = "sync:order"  # movie_id -> номер последнего изменения
+    sequence_key: str = "sync:sequence"
+    lock_key: str = "sync:lock"
 
     def __init__(self, redis: Redis):
         self.redis = redis
-
-    def add_message(self, message: str):
-        self.redis.rpush(self.update_key, message)
+        self.keys = [self.actions_key, self.order_key, self.sequence_key, self.update_key]
+        self.add_script = redis.register_script(ADD_SCRIPT)
+        self.ack_script = redis.register_script(ACK_SCRIPT)
+        self.migrate_script = redis.register_script(MIGRATE_SCRIPT)
 
     def add_update(self, update: UpdateItem):
-        self.add_message(update.json())
-
-    def delete(self, count: int = 0):
-        """Удаляет из списка count первых сообщений"""
-        self.redis.ltrim(self.update_key, count, -1)
-
-    def get_messages(self):
-        return self.redis.lrange(self.update_key, 0, -1)
-
-    def get_updates(self):
-        messages = self.get_messages()
+        self.add_script(keys=self.keys, args=[update.movie_id, update.action.value])
+
+    def get_updates(self, limit: int = 0) -> tuple[dict[str, int], Updates]:
+        """
+        Первые limit обновлений, все при limit = 0, и прочитанное: movie_id -> номер изменения.
+        Прочитанное нужно передать в ack. Действия с ошибками пропускаются, но входят в прочитанное
+        """
+        order = self.redis.zrange(self.order_key, 0, limit - 1, withscores=True, score_cast_func=int)
+        if not order:
+            return {}, Updates(items=[])
+
+        actions = self.redis.hmget(self.actions_key, [movie_id for movie_id, _ in order])
         items = []
-        for message in messages:
+        for (movie_id, _), action in zip(order, actions):
             try:
-                update_item = UpdateItem.parse_raw(message)
+                update_item = UpdateItem(action=action, movie_id=movie_id)
                 items.append(update_item)
 
             except ValidationError:
                 continue
 
-        return Updates(items=items)
+        return dict(order), Updates(items=items)
+
+    def ack(self, read: dict[str, int]) -> int:
+        """
+        Удаляет отправленные обновления. Фильмы, измененные после чтения,
+        остаются и уйдут со следующей отправкой. Возвращает число удаленных
+        """
+        args = [value for movie_id, sequence in read.items() for value in (movie_id, sequence)]
+        if not args:
+            return 0
+        return self.ack_script(keys=self.keys, args=args)
+
+    def migrate(self, limit: int) -> int:
+        """Переносит уведомления из списка прежнего формата, возвращает число перенесенных сообщений"""
+        return self.migrate_script(keys=self.keys, args=[limit])
+
+    def clear(self):
+        self.redis.delete(*self.keys)
+
+    def lock(self, timeout: float) -> Lock:
+        """
+        Блокировка отправки: отправлять должен один процесс,
+        иначе одни и те же обновления уйдут на сервер дважды
+        """
+        return self.redis.lock(self.lock_key, timeout=timeout, blocking=False)
 
     def count(self) -> int:
-        return self.redis.llen(self.update_key)
+        return self.redis.zcard(self.order_key) + self.redis.llen(self.update_key)
 
     @backoff.on_predicate(backoff.expo, max_tries=None, max_value=30)
     def check_broker(self) -> bool:
@@ -1,28 +1,75 @@
+import logging
+import os
+from http import HTTPStatus
+from typing import Optional
+
 import backoff
 import httpx
+from redis.exceptions import LockError
 
 from core.api_key import get_api_key_header
 from core.config import settings
 from models.update import Updates
+from services.packed import encode_updates
 from services.storage import storage
 
 """
 Функции для отправки данных на сервер синхронизации
-do_update() - проверяет список в редис, если там есть данные - отправляет на сервер
-если отправка проходит успешно - удаляет отправленные данные из списка
+do_update() - проверяет обновления в редис, если они есть - отправляет на сервер
+если отправка проходит успешно - удаляет отправленные данные, данные отправляются пачками
 send_heartbeat() - отправляет ping на сервер
 Запускать их планируется из Celery
+Запросы идут через один клиент на процесс, соединения с сервером переиспользуются.
+Обновления отправляются в упакованном формате, если сервер его не принимает (415) - в JSON без сжатия
 """
 
+client: Optional[httpx.Client] = None
+client_pid = 0
+# сервер синхронизации принимает упакованный формат обновлений
+packed_updates = settings.UPDATE_FORMAT == "packed"
+# сервер синхронизации принимает тело, сжатое zlib
+compressed_updates = settings.UPDATE_COMPRESSION
+
+
+def get_client() -> httpx.Client:
+    """Клиент процесса; после fork создается заново, соединения родителя не используются"""
+    global client, client_pid
+    if client is None or client_pid != os.getpid():
+        client = httpx.Client(headers=get_api_key_header(), timeout=settings.SYNC_TIMEOUT)
+        client_pid = os.getpid()
+    return client
+
 
 def post_message_to_server(url: str, message: dict) -> bool:
     """
     Отправляем POST на url с сообщением message (в json)
     Если ответ 200 - возвращаем True
     """
-    headers = get_api_key_header()
     try:
-        response = httpx.post(url=url, headers=headers, json=message, timeout=1)
+        response = get_client().post(url=url, json=message)
+        response.raise_for_status()
+
+    except httpx.HTTPError:
+        return False
+
+    return True
+
+
+def post_updates_to_server(url: str, updates: Updates) -> bool:
+    """
+    Отправляем POST на url с обновлениями в упакованном формате или JSON
+    Если ответ 200 - возвращаем True
+    """
+    global packed_updates, compressed_updates
+    try:
+        body, headers = encode_updates(updates, packed_updates, compressed_updates)
+        response = get_client().post(url=url, content=body, headers=headers)
+        if response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE and (packed_updates or compressed_updates):
+            # 415 не говорит, что именно не принял сервер - формат или сжатие, отключаем оба
+            logging.warning("sync server does not accept packed or compressed updates, switch to plain JSON")
+            packed_updates = compressed_updates = False
+            body, headers = encode_updates(updates, packed_updates, compressed_updates)
+            response = get_client().post(url=url, content=body, headers=headers)
         response.raise_for_status()
 
     except httpx.HTTPError:
@@ -38,8 +85,7 @@ def send_updates(updates: Updates) -> bool:
     если все ОК - возвращает True
     """
     sync_url = settings.SYNC_URI.format(storage_id=settings.HOME_STORAGE_ID)
-    body = updates.dict()
-    return post_message_to_server(sync_url, body)
+    return post_updates_to_server(sync_url, updates)
 
 
 @backoff.on_predicate(backoff.expo, max_tries=3)
@@ -59,22 +105,39 @@ def no_changes():
 
 def do_update() -> bool:
     """
-    Отправляет данные для обновления серверу синхронизации.
+    Отправляет данные для обновления серверу синхронизации пачками по UPDATE_BATCH_SIZE,
+    не больше UPDATE_MAX_BATCHES пачек за вызов, остальное - в следующий раз.
     Возвращает True если нет данных или данные отправлены удачно
     """
     # если нет данных для обновления - выходим
     if no_changes():
         return True
 
-    # получаем список обновлений
-    updates = storage.get_updates()
-    count = len(updates.items)
-
-    # отправляем обновления
-    result = send_updates(updates)
+    lock = storage.lock(timeout=settings.UPDATE_LOCK_TIMEOUT)
+    # список уже отправляет другой процесс
+    if not lock.acquire():
+        return True
 
-    # если все хорошо - стираем из списка
-    if result:
-        storage.delete(count)
+    try:
+        # уведомления, записанные воркерами прежней версии
+        storage.migrate(settings.UPDATE_BATCH_SIZE * settings.UPDATE_MAX_BATCHES)
+
+        for _ in range(settings.UPDATE_MAX_BATCHES):
+            # получаем пачку обновлений
+            read, updates = storage.get_updates(settings.UPDATE_BATCH_SIZE)
+            if not read:
+                break
+
+            # отправляем обновления, пачка из одних ошибочных сообщений просто удаляется
+            if updates.items and not send_updates(updates):
+                return False
+
+            # если все хорошо - стираем отправленное, если оно не изменилось после чтения
+            storage.ack(read)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logging.warning("sync list lock expired before the updates were sent")
 
-    return result
+    return True
@@ -1,26 +1,49 @@
-from celery import Celery
+from celery import Celery, Task, states
 from celery.utils.log import get_task_logger
 
 from core.config import settings
 from models.sync import SyncTask
 from models.update import Actions, UpdateItem
-from services.s3 import copy_file, delete_file, load_file_to_storage
-from services.storage import storage
+from services.pacing import Pacer
+from services.s3 import abort_stale_multipart_uploads, copy_file, delete_file, load_file_to_storage
+from services.scheduler import ReplicationScheduler, Transfer
+from services.storage import redis, storage
 from services.update import do_update, send_heartbeat
 
 #   Celery
 celery = Celery("tasks", broker=settings.CELERY_BROKER_URI, backend=settings.CELERY_BACKEND_URI)
 
+# удаления быстрые и освобождают место для загрузок - у них своя очередь и свои воркеры,
+# чтобы не стоять за многогигабайтными копированиями; служебные задачи - в очереди по умолчанию
+celery.conf.task_routes = {
+    "MinioDelete": {"queue": settings.DELETE_QUEUE},
+    "MinioUpload": {"queue": settings.UPLOAD_QUEUE},
+    "UploadFileToStorage": {"queue": settings.UPLOAD_QUEUE},
+}
+
 celery.conf.beat_schedule = {
     "add-every-30-seconds": {
         "task": "Sync",
         "schedule": settings.BEAT_TIMEOUT,
     },
+    "start-replication-transfers": {
+        "task": "Replication",
+        "schedule": settings.REPLICATION_SCHEDULE_INTERVAL,
+    },
+    "abort-stale-multipart-uploads": {
+        "task": "MultipartJanitor",
+        "schedule": settings.MULTIPART_JANITOR_INTERVAL,
+    },
 }
 
 # Create a logger - Enable to display the message on the task logger
 celery_log = get_task_logger(__name__)
 
+replication = ReplicationScheduler(
+    redis, settings.REPLICATION_MAX_TRANSFERS, settings.REPLICATION_TRANSFER_TIMEOUT, settings.DELETE_TIMEOUT
+)
+pacer = Pacer(redis, settings.REPLICATION_BANDWIDTH, settings.REPLICATION_BURST)
+
 
 class TaskFailure(Exception):
     pass
@@ -32,9 +55,28 @@ def add_result_notice(action: Actions, file_name: str):
     celery_log.debug("add result notice ({0},{1})".format(action, file_name))
 
 
-@celery.task(name="MinioUpload", autoretry_for=(TaskFailure,), retry_kwargs={"max_retries": 5, "retry_backoff": True})
+class ReplicationTask(Task):
+    """Копирование фильма из очереди репликации: когда оно закончено, запускается следующее"""
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        # перед повтором задача не закончена, место копирования остается за ней
+        if status != states.RETRY:
+            replication.finish(args[0])
+            start_transfers()
+
+
+@celery.task(
+    name="MinioUpload",
+    base=ReplicationTask,
+    autoretry_for=(TaskFailure,),
+    retry_kwargs={"max_retries": 5, "retry_backoff": True},
+)
 def load_object(file_name: str, source: str) -> dict[str, str]:
-    result = copy_file(file_name, source, settings.HOME_STORAGE_URI)
+    # место копирования продлевается на каждом куске данных; если воркер упадет,
+    # место освободится через REPLICATION_TRANSFER_TIMEOUT
+    heartbeat = replication.heartbeat(file_name)
+    heartbeat()
+    result = copy_file(file_name, source, settings.HOME_STORAGE_URI, pacer.for_transfer(heartbeat))
 
     if "error" in result:
         raise TaskFailure(result)
@@ -43,7 +85,16 @@ def load_object(file_name: str, source: str) -> dict[str, str]:
     return result
 
 
-@celery.task(name="MinioDelete")
+class DeleteTask(Task):
+    """Удаление из задания синхронизации: когда закончены все удаления, запускаются загрузки"""
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        if status != states.RETRY:
+            replication.delete_done(args[0])
+            start_transfers()
+
+
+@celery.task(name="MinioDelete", base=DeleteTask)
 def delete_object(file_name: str) -> dict[str, str]:
     result = delete_file(file_name, settings.HOME_STORAGE_URI)
 
@@ -54,6 +105,23 @@ def delete_object(file_name: str) -> dict[str, str]:
     return result
 
 
+@celery.task(name="Replication")
+def start_transfers() -> int:
+    """Запускает копирования из очереди репликации на свободные места"""
+    transfers = replication.next_transfers()
+    for transfer in transfers:
+        load_object.delay(transfer.movie_id, transfer.storage_url)
+    return len(transfers)
+
+
+@celery.task(name="MultipartJanitor")
+def abort_stale_uploads() -> dict:
+    """Удаляет брошенные multipart загрузки в домашнем хранилище"""
+    result = abort_stale_multipart_uploads(settings.HOME_STORAGE_URI)
+    celery_log.info("stale multipart uploads: {0}".format(result))
+    return result
+
+
 @celery.task(name="Sync")
 def do_sync():
     res_hb = send_heartbeat()
@@ -65,12 +133,16 @@ def add_tasks(tasks_list: SyncTask):
     """Добавляем в Celery задачи из списка задач"""
 
     if tasks_list.delete:
+        # загрузки не начнутся, пока удаления не освободят место
+        replication.hold_for_deletes([task.movie_id for task in tasks_list.delete])
         for task in tasks_list.delete:
             delete_object.delay(task.movie_id)
 
     if tasks_list.upload:
+        # загрузки идут через очередь репликации, а не все сразу
         for task in tasks_list.upload:
-            load_object.delay(task.movie_id, task.storage_url)
+            replication.enqueue(Transfer(task.movie_id, task.storage_url, task.size_bytes, task.score))
+        start_transfers()
 
     return
 
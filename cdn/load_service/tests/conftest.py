@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -5,3 +6,10 @@ from pathlib import Path
 src_path = Path(__file__).parent.parent / "src/"
 if src_path not in sys.path:
     sys.path.insert(1, str(src_path))
+
+# настройки для импорта core.config в тестах без окружения docker-compose;
+# заданные переменные окружения не переопределяются
+for name in ("CELERY_BROKER_URI", "CELERY_BACKEND_URI", "STORAGE_BROKER_URI"):
+    os.environ.setdefault("S3LS_" + name, "redis://localhost:6379/0")
+for name in ("SYNC_URI", "HEARTBEAT_URI", "ACCESS_KEY", "SECRET_KEY"):
+    os.environ.setdefault("S3LS_" + name, "test")
@@ -0,0 +1,183 @@
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from minio.error import S3Error
+from urllib3.exceptions import HTTPError
+
+from services.multipart import multipart_etag
+
+"""
+Хранилище и Redis в памяти для тестов без MinIO и Redis.
+Реализованы только методы, которые вызывают MinioPool, MinioLoader, MultipartCopier,
+CopyCheckpoints и CopyStats.
+"""
+
+
+class Response:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        end = len(self.data) if size is None else self.position + size
+        chunk = self.data[self.position:end]
+        self.position += len(chunk)
+        return chunk
+
+    def info(self):
+        return {"Content-Length": str(len(self.data))}
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class Stat:
+    def __init__(self, size, etag, metadata=None):
+        self.size = size
+        self.etag = etag
+        self.metadata = metadata or {}
+
+
+class WriteResult:
+    def __init__(self, name, etag):
+        self.object_name = name
+        self.etag = etag
+        self.version_id = None
+
+
+class Upload:
+    def __init__(self, object_name, upload_id, initiated_time):
+        self.object_name = object_name
+        self.upload_id = upload_id
+        self.initiated_time = initiated_time
+
+
+class ListUploadsResult:
+    def __init__(self, uploads):
+        self.uploads = uploads
+        self.is_truncated = False
+
+
+class FakeMinio:
+    """Хранилище в памяти: объекты одного bucket, их etag и метаданные"""
+
+    def __init__(self, objects=None, buckets=(), available=True, corrupt_part=None, failing_offset=None):
+        self.objects = dict(objects or {})
+        self.etags = {}
+        self.metadata = {}
+        self.buckets = set(buckets)
+        self.available = available
+        self.requests = 0  # запросы проверки bucket
+        self.calls = []  # запросы копирования одним потоком
+        self.uploads = {}
+        self.initiated = {}
+        self.aborted = []
+        self.ranges = []
+        self.corrupt_part = corrupt_part
+        self.failing_offset = failing_offset
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def bucket_exists(self, bucket):
+        self.requests += 1
+        if not self.available:
+            raise HTTPError("connection refused")
+        return bucket in self.buckets
+
+    def make_bucket(self, bucket):
+        self.requests += 1
+        self.buckets.add(bucket)
+
+    def stat_object(self, bucket, name):
+        if name not in self.objects:
+            raise S3Error("NoSuchKey", "no key", name, "", "", None)
+        return Stat(len(self.objects[name]), self.etags.get(name, ""), self.metadata.get(name))
+
+    def get_object(self, bucket, name, offset=0, length=0):
+        self.calls.append("get_object")
+        if offset == self.failing_offset:
+            self.failing_offset = None
+            raise HTTPError("connection reset")
+        self.ranges.append(offset)
+        data = self.objects[name]
+        return Response(data[offset:offset + length] if length else data[offset:])
+
+    def put_object(self, bucket, name, data, length, metadata=None):
+        self.calls.append("put_object")
+        return self._write(name, data.read(length), "copy-etag", metadata)
+
+    def _write(self, name, data, etag, metadata=None):
+        self.objects[name] = data
+        self.etags[name] = etag
+        self.metadata[name] = metadata or {}
+        return WriteResult(name, etag)
+
+    def _create_multipart_upload(self, bucket, name, headers):
+        upload_id = "upload-{0}".format(len(self.initiated))
+        self.uploads[upload_id] = {}
+        self.initiated[upload_id] = (name, datetime.now(timezone.utc))
+        return upload_id
+
+    def _list_multipart_uploads(self, bucket, key_marker=None, upload_id_marker=None):
+        return ListUploadsResult([
+            Upload(name, upload_id, initiated_time)
+            for upload_id, (name, initiated_time) in self.initiated.items()
+            if upload_id in self.uploads
+        ])
+
+    def _upload_part(self, bucket, name, data, headers, upload_id, part_number):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if part_number == self.corrupt_part:
+                data = data[:-1] + b"!"
+            self.uploads[upload_id][part_number] = data
+            return '"{0}"'.format(hashlib.md5(data).hexdigest())
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _complete_multipart_upload(self, bucket, name, upload_id, parts):
+        chunks = [self.uploads[upload_id][part.part_number] for part in parts]
+        del self.uploads[upload_id]
+        return self._write(name, b"".join(chunks), multipart_etag([hashlib.md5(chunk).digest() for chunk in chunks]))
+
+    def _abort_multipart_upload(self, bucket, name, upload_id):
+        self.aborted.append(upload_id)
+        del self.uploads[upload_id]
+
+
+class FakeRedis:
+    """Хэши Redis, без срока жизни ключей"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({field: str(value) for field, value in mapping.items()})
+
+    def hincrby(self, key, field, amount):
+        values = self.data.setdefault(key, {})
+        values[field] = int(values.get(field, 0)) + amount
+
+    def expire(self, key, ttl):
+        pass
+
+    def delete(self, key):
+        self.data.pop(key, None)
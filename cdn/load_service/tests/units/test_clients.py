@@ -0,0 +1,68 @@
+from fakes import FakeMinio
+
+from services.clients import MinioPool, split_host_uri
+
+
+def make_pool(client, host="edge-1:9000", ttl=60):
+    pool = MinioPool("key", "secret", ttl)
+    pool.clients[split_host_uri(host)] = client
+    return pool
+
+
+def test_split_host_uri():
+    assert split_host_uri("https://Edge-1:9000/") == (True, "edge-1:9000")
+    assert split_host_uri("http://edge-1:9000") == (False, "edge-1:9000")
+    assert split_host_uri("edge-1:9000") == (False, "edge-1:9000")
+
+
+def test_client_per_endpoint():
+    pool = MinioPool("key", "secret", ttl=60)
+
+    assert pool.get("http://edge-1:9000") is pool.get("EDGE-1:9000")
+    assert pool.get("edge-1:9000") is not pool.get("edge-2:9000")
+
+
+def test_client_recreated_after_fork():
+    pool = MinioPool("key", "secret", ttl=60)
+    client = pool.get("edge-1:9000")
+    pool.remember("edge-1:9000", "movies", True)
+
+    pool.pid = -1  # процесс-родитель
+
+    assert pool.get("edge-1:9000") is not client
+    assert pool.cached("edge-1:9000", "movies") is None
+
+
+def test_bucket_checks_are_cached():
+    client = FakeMinio()
+    pool = make_pool(client)
+
+    for _ in range(10):
+        assert pool.is_available("edge-1:9000", "movies")
+        pool.ensure_bucket("http://edge-1:9000", "movies")
+
+    # bucket_exists из проверки доступности, еще раз перед созданием и make_bucket
+    assert client.requests == 3
+    assert client.buckets == {"movies"}
+
+
+def test_checks_expire():
+    client = FakeMinio(buckets=["movies"])
+    pool = make_pool(client, ttl=0)
+
+    pool.ensure_bucket("edge-1:9000", "movies")
+    pool.ensure_bucket("edge-1:9000", "movies")
+
+    assert client.requests == 2
+
+
+def test_unavailable_storage_is_probed_again():
+    client = FakeMinio(buckets=["movies"], available=False)
+    pool = make_pool(client)
+
+    assert not pool.is_available("edge-1:9000", "movies")
+    client.available = True
+    assert pool.is_available("edge-1:9000", "movies")
+
+    pool.forget("edge-1:9000")
+    assert pool.cached("edge-1:9000", "movies") is None
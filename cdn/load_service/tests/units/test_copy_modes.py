@@ -0,0 +1,47 @@
+import pytest
+from fakes import FakeMinio, FakeRedis
+
+from services import s3
+from services.clients import MinioPool, split_host_uri
+from services.copy_stats import CopyStats
+from services.multipart import SOURCE_ETAG_HEADER
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = CopyStats(FakeRedis())
+    monkeypatch.setattr(s3, "copy_stats", stats)
+    return stats
+
+
+def make_loader(source_host, destination_host):
+    pool = MinioPool("key", "secret", ttl=60)
+    pool.clients[split_host_uri(destination_host)] = FakeMinio(buckets=["movies"])
+    pool.clients[split_host_uri(source_host)] = source = FakeMinio({"film": b"data"}, buckets=["movies"])
+    source.etags["film"] = "source-etag"
+    return s3.MinioLoader(source_host, destination_host, pool)
+
+
+def test_stream_copy_between_storages(stats):
+    loader = make_loader("http://edge-1:9000", "edge-2:9000")
+
+    result = loader.copy_file("movies", "film", "movies", "film")
+
+    assert result["copy"] == "streamed"
+    assert loader.destination_minio.calls == ["put_object"]
+    assert loader.destination_minio.metadata["film"] == {SOURCE_ETAG_HEADER: "source-etag"}
+    assert stats.get()["streamed_bytes"] == 4
+    assert stats.get()["saved_bytes"] == 0
+
+
+def test_existing_copy_is_skipped(stats):
+    loader = make_loader("edge-1:9000", "edge-2:9000")
+    loader.copy_file("movies", "film", "movies", "film")
+
+    # ETag копии отличается от ETag источника, копия узнается по метаданным
+    result = loader.copy_file("movies", "film", "movies", "film")
+
+    assert result["copy"] == "skipped"
+    assert loader.destination_minio.calls == ["put_object"]
+    assert stats.get()["skipped_bytes"] == 4
+    assert stats.get()["saved_bytes"] == 4
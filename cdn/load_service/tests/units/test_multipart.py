@@ -0,0 +1,124 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fakes import FakeMinio, FakeRedis
+from minio.error import S3Error
+from urllib3.exceptions import HTTPError
+
+from services.checkpoints import CopyCheckpoints
+from services.multipart import MIN_PART_SIZE, CopyError, MultipartCopier, abort_stale_uploads, split_parts
+
+MB = 1024 * 1024
+
+
+def test_split_parts():
+    parts = split_parts(12 * MB + 1, 5 * MB)
+
+    assert [(part.number, part.offset, part.length) for part in parts] == [
+        (1, 0, 5 * MB),
+        (2, 5 * MB, 5 * MB),
+        (3, 10 * MB, 2 * MB + 1),
+    ]
+    assert split_parts(10, 1)[0].length == 10
+    assert len(split_parts(100000 * MIN_PART_SIZE, MIN_PART_SIZE)) == 10000
+
+
+def test_copy():
+    data = bytes(range(256)) * (23 * MB // 256)
+    source = FakeMinio({"film": data})
+    destination = FakeMinio()
+
+    result = MultipartCopier(source, destination, part_size=5 * MB, concurrency=3).copy(
+        "movies", "film", "movies", "film", len(data)
+    )
+
+    assert destination.objects["film"] == data
+    assert result["size"] == len(data)
+    assert result["etag"].endswith("-5")
+    assert destination.max_in_flight <= 3
+
+
+def test_corrupted_part_aborts_upload():
+    data = b"a" * 11 * MB
+    destination = FakeMinio(corrupt_part=2)
+
+    with pytest.raises(CopyError):
+        MultipartCopier(FakeMinio({"film": data}), destination, part_size=5 * MB, concurrency=2).copy(
+            "movies", "film", "movies", "film", len(data)
+        )
+
+    assert destination.aborted == ["upload-0"]
+    assert "film" not in destination.objects
+
+
+def test_source_error_aborts_upload():
+    class BrokenSource(FakeMinio):
+        def get_object(self, bucket, name, offset=0, length=0):
+            raise S3Error("NoSuchKey", "no key", name, "", "", None)
+
+    destination = FakeMinio()
+    with pytest.raises(S3Error):
+        MultipartCopier(BrokenSource(), destination, part_size=5 * MB, concurrency=2).copy(
+            "movies", "film", "movies", "film", 11 * MB
+        )
+
+    assert destination.aborted == ["upload-0"]
+
+
+def test_resume_after_failure():
+    data = bytes(range(256)) * (16 * MB // 256)
+    source = FakeMinio({"film": data}, failing_offset=10 * MB)
+    destination = FakeMinio()
+    checkpoints = CopyCheckpoints(FakeRedis(), ttl=3600)
+    copier = MultipartCopier(source, destination, part_size=5 * MB, concurrency=1, checkpoints=checkpoints)
+
+    with pytest.raises(HTTPError):
+        copier.copy("movies", "film", "movies", "film", len(data), source_etag="v1")
+
+    done = set(checkpoints.get("movies", "film").parts)
+    assert {1, 2} <= done and 3 not in done
+    assert destination.aborted == []
+
+    source.ranges.clear()
+    result = copier.copy("movies", "film", "movies", "film", len(data), source_etag="v1")
+
+    assert source.ranges == [(number - 1) * 5 * MB for number in range(1, 5) if number not in done]
+    assert destination.objects["film"] == data
+    assert result["etag"].endswith("-4")
+    assert checkpoints.get("movies", "film") is None
+
+
+def test_changed_source_restarts_upload():
+    data = b"a" * 11 * MB
+    destination = FakeMinio()
+    checkpoints = CopyCheckpoints(FakeRedis(), ttl=3600)
+    copier = MultipartCopier(
+        FakeMinio({"film": data}, failing_offset=5 * MB), destination, 5 * MB, 1, checkpoints=checkpoints
+    )
+    with pytest.raises(HTTPError):
+        copier.copy("movies", "film", "movies", "film", len(data), source_etag="v1")
+
+    copier.copy("movies", "film", "movies", "film", len(data), source_etag="v2")
+
+    assert destination.aborted == ["upload-0"]
+    assert destination.objects["film"] == data
+
+
+def test_abort_stale_uploads():
+    destination = FakeMinio()
+    checkpoints = CopyCheckpoints(FakeRedis(), ttl=3600)
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    for name in ("abandoned", "active", "fresh"):
+        upload_id = destination._create_multipart_upload("movies", name, {})
+        if name != "fresh":
+            destination.initiated[upload_id] = (name, week_ago)
+    checkpoints.start("movies", "active", "upload-1", "v1", 11 * MB, 5 * MB)
+    checkpoints.start("movies", "abandoned", "upload-0", "v1", 11 * MB, 5 * MB)
+    checkpoints.redis.data[checkpoints.key("movies", "abandoned")]["updated_at"] = str(time.time() - 7 * 24 * 3600)
+
+    aborted = abort_stale_uploads(destination, "movies", checkpoints, stale_after=24 * 3600)
+
+    assert aborted == ["abandoned"]
+    assert sorted(destination.uploads) == ["upload-1", "upload-2"]
+    assert checkpoints.get("movies", "abandoned") is None
@@ -0,0 +1,66 @@
+import os
+import zlib
+from uuid import UUID, uuid4
+
+import httpx
+
+import services.update
+from models.update import Actions, UpdateItem, Updates
+from services.packed import CONTENT_TYPE, JSON_CONTENT_TYPE, encode_updates, pack_updates
+
+
+def make_updates(count: int) -> Updates:
+    return Updates(
+        items=[UpdateItem(action=(Actions.UPLOAD, Actions.DELETE)[n % 2], movie_id=str(uuid4())) for n in range(count)]
+    )
+
+
+def test_pack_updates():
+    updates = make_updates(3)
+
+    body = pack_updates(updates)
+
+    assert len(body) == 1 + 17 * 3
+    assert body[0] == 1
+    assert UUID(bytes=body[1:17]) == UUID(updates.items[0].movie_id)
+    assert list(body[17::17]) == [1, 2, 1]
+    assert len(body) < len(updates.json()) / 3
+
+
+def test_encode_updates():
+    updates = make_updates(100)
+
+    body, headers = encode_updates(updates, packed=True, compress=True)
+
+    assert headers == {"Content-Type": CONTENT_TYPE, "Content-Encoding": "deflate"}
+    assert zlib.decompress(body) == pack_updates(updates)
+
+
+def test_not_uuid_is_sent_in_json():
+    updates = Updates(items=[UpdateItem(action=Actions.UPLOAD, movie_id="file_0")])
+
+    body, headers = encode_updates(updates, packed=True, compress=False)
+
+    assert headers == {"Content-Type": JSON_CONTENT_TYPE}
+    assert Updates.parse_raw(body) == updates
+
+
+def test_json_fallback(monkeypatch):
+    """Сервер без упакованного формата или сжатия отвечает 415 - обновления уходят в JSON без сжатия"""
+    content_types = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        content_types.append((request.headers["content-type"], request.headers.get("content-encoding")))
+        if request.headers["content-type"] == CONTENT_TYPE or "content-encoding" in request.headers:
+            return httpx.Response(415)
+        assert Updates.parse_raw(request.content)
+        return httpx.Response(200)
+
+    monkeypatch.setattr(services.update, "packed_updates", True)
+    monkeypatch.setattr(services.update, "compressed_updates", True)
+    monkeypatch.setattr(services.update, "client", httpx.Client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(services.update, "client_pid", os.getpid())
+
+    assert services.update.post_updates_to_server("http://sync/events", make_updates(2))
+    assert services.update.post_updates_to_server("http://sync/events", make_updates(2))
+    assert content_types == [(CONTENT_TYPE, "deflate"), (JSON_CONTENT_TYPE, None), (JSON_CONTENT_TYPE, None)]
@@ -0,0 +1,124 @@
+import pytest
+
+from services.pacing import Pacer
+from services.scheduler import ReplicationScheduler, Transfer
+from services.storage import redis
+
+
+@pytest.fixture()
+def scheduler():
+    scheduler = ReplicationScheduler(redis, max_transfers=2, transfer_timeout=3600)
+    redis.delete(*scheduler.keys)
+    return scheduler
+
+
+def test_transfer_order(scheduler):
+    """Сначала популярные фильмы, из одинаково популярных - маленькие"""
+    scheduler.enqueue(Transfer("unpopular", "http://master:9000", size_bytes=10, score=0.1))
+    scheduler.enqueue(Transfer("popular_big", "http://master:9000", size_bytes=1000, score=0.9))
+    scheduler.enqueue(Transfer("popular_small", "http://master:9000", size_bytes=100, score=0.9))
+    scheduler.enqueue(Transfer("unknown", "http://master:9000"))
+    scheduler.max_transfers = 10
+
+    assert [transfer.movie_id for transfer in scheduler.next_transfers()] == [
+        "popular_small",
+        "popular_big",
+        "unpopular",
+        "unknown",
+    ]
+
+
+def test_max_transfers(scheduler):
+    for number in range(5):
+        scheduler.enqueue(Transfer(f"film_{number}", "http://master:9000", size_bytes=number, score=0.5))
+
+    started = scheduler.next_transfers()
+    assert [transfer.movie_id for transfer in started] == ["film_0", "film_1"]
+    assert scheduler.next_transfers() == []
+    assert scheduler.stats() == {"queued": 3, "queued_bytes": 2 + 3 + 4, "active": 2, "deleting": 0}
+
+    # фильм, который уже копируется, повторно в очередь не ставится
+    assert not scheduler.enqueue(Transfer("film_0", "http://master:9000"))
+
+    scheduler.finish("film_0")
+    assert [transfer.movie_id for transfer in scheduler.next_transfers()] == ["film_2"]
+
+
+def test_requeue_updates_task(scheduler):
+    scheduler.enqueue(Transfer("film", "http://master:9000", size_bytes=10, score=0.1))
+    scheduler.enqueue(Transfer("film", "http://edge:9000", size_bytes=10, score=0.9))
+
+    assert scheduler.stats()["queued"] == 1
+    assert scheduler.next_transfers() == [Transfer("film", "http://edge:9000", size_bytes=10, score=0.9)]
+
+
+def test_lost_transfer_is_released(scheduler):
+    scheduler.transfer_timeout = -1
+    for number in range(3):
+        scheduler.enqueue(Transfer(f"film_{number}", "http://master:9000"))
+
+    assert len(scheduler.next_transfers()) == 2
+    # воркер не освободил места, но они устарели
+    assert len(scheduler.next_transfers()) == 1
+
+
+def test_heartbeat_keeps_transfer(scheduler):
+    for number in range(3):
+        scheduler.enqueue(Transfer(f"film_{number}", "http://master:9000"))
+    assert len(scheduler.next_transfers()) == 2
+    beat = scheduler.heartbeat("film_0")
+    pacer = Pacer(redis, rate=0, burst=0).for_transfer(beat)
+
+    # film_1 не продлевается - его воркер упал
+    redis.zadd(scheduler.active_key, {"film_0": 0, "film_1": 0})
+    pacer.take(100)
+    scheduler.transfer_timeout = 60
+    assert [transfer.movie_id for transfer in scheduler.next_transfers()] == ["film_2"]
+    assert sorted(redis.zrange(scheduler.active_key, 0, -1)) == ["film_0", "film_2"]
+
+    # освобожденное место продление не занимает
+    scheduler.finish("film_0")
+    scheduler.touch("film_0")
+    assert scheduler.stats()["active"] == 1
+
+
+def test_uploads_wait_for_deletes(scheduler):
+    scheduler.hold_for_deletes(["old_0", "old_1"])
+    scheduler.enqueue(Transfer("new", "http://master:9000"))
+
+    assert scheduler.next_transfers() == []
+
+    scheduler.delete_done("old_0")
+    assert scheduler.next_transfers() == []
+
+    scheduler.delete_done("old_1")
+    assert [transfer.movie_id for transfer in scheduler.next_transfers()] == ["new"]
+
+
+def test_lost_delete_is_released(scheduler):
+    scheduler.delete_timeout = -1
+    scheduler.hold_for_deletes(["old"])
+    scheduler.enqueue(Transfer("new", "http://master:9000"))
+
+    assert [transfer.movie_id for transfer in scheduler.next_transfers()] == ["new"]
+
+
+def test_pacer():
+    now = [1000.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    pacer = Pacer(redis, rate=100, burst=200, clock=lambda: now[0], sleep=sleep)
+    redis.delete(pacer.bucket_key)
+
+    assert pacer.take(150) == 0
+    assert pacer.take(100) == pytest.approx(0.5)
+    # за время ожидания долг погашен, новые 100 байт - еще секунда
+    assert pacer.take(100) == pytest.approx(1)
+    assert waits == [pytest.approx(0.5), pytest.approx(1)]
+
+    now[0] += 10
+    assert pacer.throughput(10) == pytest.approx(35)
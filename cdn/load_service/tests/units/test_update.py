@@ -1,7 +1,7 @@
 import pytest
 
 import services.update
-from models.update import Actions, UpdateItem
+from models.update import Actions, UpdateItem, Updates
 from services.storage import storage
 from services.update import do_update, send_heartbeat
 
@@ -13,9 +13,15 @@ def stub_post_message(url: str, message: dict) -> bool:
     return True
 
 
+def stub_post_updates(url: str, updates: Updates) -> bool:
+    messages.append(updates.dict())
+    return True
+
+
 @pytest.fixture()
 def no_sync(mocker):
     mocker.patch.object(services.update, "post_message_to_server", new=stub_post_message)
+    mocker.patch.object(services.update, "post_updates_to_server", new=stub_post_updates)
     messages.clear()
 
 
@@ -29,7 +35,7 @@ def test_heartbeat(no_sync):
 
 def test_update(no_sync):
     """Проверка на отправку сообщений синхронизации"""
-    storage.delete(storage.count())
+    storage.clear()
 
     item_0 = UpdateItem(action=Actions.DELETE, movie_id="file_0")
     item_1 = UpdateItem(action=Actions.DELETE, movie_id="file_1")
@@ -55,3 +61,71 @@ def test_update(no_sync):
     assert item_1.dict() in msg["items"]
     assert item_2.dict() in msg["items"]
     assert item_3.dict() in msg["items"]
+
+
+def test_update_batches(no_sync, monkeypatch):
+    """Обновления отправляются пачками"""
+    storage.clear()
+    monkeypatch.setattr(services.update.settings, "UPDATE_BATCH_SIZE", 3)
+    monkeypatch.setattr(services.update.settings, "UPDATE_MAX_BATCHES", 2)
+
+    for number in range(7):
+        storage.add_update(UpdateItem(action=Actions.UPLOAD, movie_id=f"file_{number}"))
+
+    assert do_update() is True
+
+    # за вызов - не больше двух пачек по три обновления
+    assert storage.count() == 1
+    assert [len(msg["items"]) for msg in messages] == [3, 3]
+
+    do_update()
+
+    assert storage.count() == 0
+    assert [item["movie_id"] for msg in messages for item in msg["items"]] == [f"file_{n}" for n in range(7)]
+
+
+def test_updates_are_coalesced(no_sync):
+    """Для фильма отправляется только последнее действие"""
+    storage.clear()
+
+    storage.add_update(UpdateItem(action=Actions.UPLOAD, movie_id="file_0"))
+    storage.add_update(UpdateItem(action=Actions.UPLOAD, movie_id="file_1"))
+    storage.add_update(UpdateItem(action=Actions.DELETE, movie_id="file_0"))
+    storage.add_update(UpdateItem(action=Actions.UPLOAD, movie_id="file_1"))
+
+    assert storage.count() == 2
+
+    do_update()
+
+    assert messages[0]["items"] == [
+        {"action": Actions.DELETE, "movie_id": "file_0"},
+        {"action": Actions.UPLOAD, "movie_id": "file_1"},
+    ]
+
+
+def test_changed_after_read_is_kept():
+    """Действие, записанное после чтения, не удаляется вместе с отправленным"""
+    storage.clear()
+    storage.add_update(UpdateItem(action=Actions.UPLOAD, movie_id="file_0"))
+
+    read, updates = storage.get_updates()
+    storage.add_update(UpdateItem(action=Actions.DELETE, movie_id="file_0"))
+
+    assert storage.ack(read) == 0
+    _, updates = storage.get_updates()
+    assert updates.items == [UpdateItem(action=Actions.DELETE, movie_id="file_0")]
+
+
+def test_legacy_list_is_migrated(no_sync):
+    """Уведомления из списка прежнего формата отправляются, ошибочные - удаляются"""
+    storage.clear()
+    storage.redis.rpush(storage.update_key, UpdateItem(action=Actions.UPLOAD, movie_id="file_0").json())
+    storage.redis.rpush(storage.update_key, "not a notice")
+    storage.redis.rpush(storage.update_key, UpdateItem(action=Actions.DELETE, movie_id="file_0").json())
+
+    assert storage.count() == 3
+
+    do_update()
+
+    assert storage.count() == 0
+    assert messages[0]["items"] == [{"action": Actions.DELETE, "movie_id": "file_0"}]
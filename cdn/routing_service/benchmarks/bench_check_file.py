@@ -0,0 +1,76 @@
+"""
+Concurrent HEAD probes: latency of check_file_async against a storage whose
+every HEAD takes one network round trip, and the event loop lag meanwhile.
+
+    python -m benchmarks.bench_check_file --requests 200 --round-trip 0.02
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import botocore.exceptions
+
+from src.storages import ObjectStorageBase
+
+
+class SlowS3:
+    """Stand-in for a remote S3: every HEAD takes one network round trip"""
+
+    def __init__(self, keys, round_trip: float):
+        self.keys = set(keys)
+        self.round_trip = round_trip
+
+    def head_object(self, Bucket, Key):
+        time.sleep(self.round_trip)
+        if Key not in self.keys:
+            raise botocore.exceptions.ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": 1}
+
+
+async def timed_check(storage: ObjectStorageBase, key: str) -> float:
+    start = time.perf_counter()
+    await storage.check_file_async(key)
+    return time.perf_counter() - start
+
+
+async def loop_lag(stop: asyncio.Event) -> float:
+    """Worst event loop delay while the probes run"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - start)
+    return worst
+
+
+async def run(storage: ObjectStorageBase, requests: int):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    latencies = await asyncio.gather(*(timed_check(storage, f"film_{n % 2}") for n in range(requests)))
+    stop.set()
+    return latencies, await lag
+
+
+def main(args):
+    storage = ObjectStorageBase("http://localhost:9000", "key", "secret", "movies")
+    storage.s3 = SlowS3({"film_0"}, args.round_trip)
+
+    start = time.perf_counter()
+    latencies, lag = asyncio.run(run(storage, args.requests))
+    elapsed = time.perf_counter() - start
+
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    print(f"{args.requests} HEAD, sequential would take {args.requests * args.round_trip:.2f}s")
+    print(f"total {elapsed:.3f}s, p50 {statistics.median(latencies):.3f}s, p99 {p99:.3f}s, loop lag {lag * 1000:.1f}ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--round-trip", type=float, default=0.02, help="HEAD time, s")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
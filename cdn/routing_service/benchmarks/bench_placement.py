@@ -0,0 +1,32 @@
+"""
+Placement micro-benchmark: cost of ordering candidates by rendezvous weight.
+
+    python -m benchmarks.bench_placement
+"""
+from uuid import uuid4
+
+from benchmarks.utils import measure
+
+from src.placement import Placement, rendezvous_weight
+
+
+def make_storages(size: int, step: float) -> list[dict]:
+    return [
+        {"id": f"edge-{number}", "storage": None, "distance": number * step, "cost": number * step}
+        for number in range(size)
+    ]
+
+
+def main():
+    film_id = str(uuid4())
+    placement = Placement(region_radius=300)
+    for size in (3, 10):
+        storages = make_storages(size, 10.0)
+        measure(f"order {size} candidates, all in region", lambda: placement.order(film_id, storages))
+    storages = make_storages(10, 1000.0)
+    measure("order 10 candidates, 1 in region", lambda: placement.order(film_id, storages))
+    measure("rendezvous_weight", lambda: rendezvous_weight(film_id, "edge-1"))
+
+
+if __name__ == "__main__":
+    main()
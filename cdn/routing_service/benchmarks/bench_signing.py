@@ -0,0 +1,39 @@
+"""
+Presigned URL micro-benchmark: boto3 signing versus a cache hit.
+
+    python -m benchmarks.bench_signing
+"""
+from uuid import uuid4
+
+from benchmarks.utils import measure
+
+from src.signing import PresignedUrlCache
+from src.storages import ObjectStorageBase
+
+EXPIRES_IN = 3600 * 24
+
+
+def main():
+    storage = ObjectStorageBase("http://localhost:9000", "admin", "supersecret", "movies")
+    key = str(uuid4())
+    cache = PresignedUrlCache(max_size=10000, expires_in=EXPIRES_IN, reuse_fraction=0.5)
+    keys = [str(uuid4()) for _ in range(1000)]
+
+    signing = measure("generate_presigned_url", lambda: storage.sign_link_file(key, EXPIRES_IN), number=2000)
+    hit = measure(
+        "cache hit",
+        lambda: cache.get(storage.endpoint_url, key, lambda expires_in: storage.sign_link_file(key, expires_in)),
+    )
+    measure(
+        "cache, batch of 1000 hot keys",
+        lambda: [
+            cache.get(storage.endpoint_url, hot_key, lambda expires_in: storage.sign_link_file(hot_key, expires_in))
+            for hot_key in keys
+        ],
+        number=10,
+    )
+    print(f"speedup on hit: x{signing / hit:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Load test of the playback start: GET /media/get_media/{film_id}.
+
+The harness starts stand-ins of the dependencies in this process - MinIO
+storages answering HEAD with a configurable delay, sync_service with the
+storage list and an empty film locations journal, UGC accepting record
+batches - and routing_service itself with uvicorn in a subprocess, pointed
+at them. Then `concurrency` clients send requests with valid JWT for
+`duration` seconds.
+
+Reported: throughput, p50/p95/p99 of the response time measured by the
+client and of every stage from the Server-Timing header (auth, geoip,
+ranking, placement, probe, sign, ugc). `--save` writes the result as JSON,
+`--baseline` compares p99 with a saved result and fails if any of them grew
+more than `--tolerance` and at least `--min-delta` ms.
+
+    python -m benchmarks.load_test --duration 30 --concurrency 64
+    python -m benchmarks.load_test --save baseline.json
+    python -m benchmarks.load_test --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
+import aiohttp
+import jwt
+from aiohttp import web
+
+SECRET = "load_test_secret"
+BUCKET = "movies"
+SERVICE_ROOT = Path(__file__).parent.parent
+
+
+def make_token() -> str:
+    now = int(time.time())
+    payload = {
+        "fresh": False,
+        "iat": now,
+        "jti": str(uuid4()),
+        "type": "access",
+        "sub": str(uuid4()),
+        "nbf": now,
+        "exp": now + 3600,
+        "name": "load_test",
+        "roles": [],
+        "device_id": "load_test",
+    }
+    return jwt.encode(payload, SECRET, algorithm="HS256")
+
+
+def film_ids(count: int) -> list[str]:
+    return [str(uuid5(NAMESPACE_URL, f"film-{number}")) for number in range(count)]
+
+
+def holder_of(film_id: str, storages: int) -> int:
+    """Номер хранилища, на котором лежит фильм"""
+    return int(film_id[:8], 16) % storages
+
+
+def storage_app(number: int, storages: int, delay: float) -> web.Application:
+    async def head_object(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        if holder_of(request.match_info["key"], storages) != number:
+            return web.Response(status=404)
+        return web.Response(headers={"Content-Length": "1048576", "ETag": '"0"'})
+
+    app = web.Application()
+    app.router.add_route("HEAD", f"/{BUCKET}/{{key}}", head_object)
+    return app
+
+
+def sync_app(storage_urls: list[str]) -> web.Application:
+    async def storages(request: web.Request) -> web.Response:
+        return web.json_response(
+            [{"id": f"edge-{number}", "url": url, "ip_address": "127.0.0.1"} for number, url in enumerate(storage_urls)]
+        )
+
+    async def locations(request: web.Request) -> web.Response:
+        return web.json_response({"last_event_id": 0, "films": {}})
+
+    async def events(request: web.Request) -> web.Response:
+        return web.json_response({"last_event_id": 0, "events": [], "has_more": False})
+
+    app = web.Application()
+    app.router.add_get("/api/v1/storages", storages)
+    app.router.add_get("/api/v1/films/locations", locations)
+    app.router.add_get("/api/v1/films/locations/events", events)
+    return app
+
+
+def ugc_app() -> web.Application:
+    async def record_films(request: web.Request) -> web.Response:
+        await request.read()
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post("/ugc/v1/events/record_films", record_films)
+    return app
+
+
+async def serve(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    timings = {}
+    for metric in filter(None, (part.strip() for part in header.split(","))):
+        name, _, duration = metric.partition(";dur=")
+        if duration:
+            timings[name] = float(duration) / 1000
+    return timings
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    quantiles = statistics.quantiles(values, n=100)
+    return {"p50": statistics.median(values), "p95": quantiles[94], "p99": quantiles[98]}
+
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url):
+                return
+        except aiohttp.ClientError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} is not available")
+
+
+async def run_clients(url: str, films: list[str], concurrency: int, duration: float, warmup: float) -> dict:
+    latencies: list[float] = []
+    stages: dict[str, list[float]] = defaultdict(list)
+    errors = 0
+    tokens = [make_token() for _ in range(concurrency)]
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_ready(session, f"{url}/docs")
+        measure_from = time.monotonic() + warmup
+        stop_at = measure_from + duration
+
+        async def client(token: str):
+            nonlocal errors
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.monotonic() < stop_at:
+                film_id = random.choice(films)
+                start = time.perf_counter()
+                try:
+                    async with session.get(f"{url}/media/get_media/{film_id}", headers=headers) as response:
+                        await response.read()
+                        ok = response.status == 200
+                        timing = response.headers.get("Server-Timing", "")
+                except aiohttp.ClientError:
+                    ok, timing = False, ""
+                latency = time.perf_counter() - start
+                if time.monotonic() < measure_from:
+                    continue
+                if not ok:
+                    errors += 1
+                    continue
+                latencies.append(latency)
+                for name, seconds in parse_server_timing(timing).items():
+                    stages[name].append(seconds)
+
+        await asyncio.gather(*(client(token) for token in tokens))
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / duration,
+        "latency": percentiles(latencies),
+        "stages": {name: percentiles(values) for name, values in sorted(stages.items())},
+    }
+
+
+def print_report(result: dict):
+    print(f"requests {result['requests']}, errors {result['errors']}, throughput {result['throughput']:.1f} rps")
+    print(f"{'stage':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, values in [("client", result["latency"])] + list(result["stages"].items()):
+        print(f"{name:<12} {values['p50'] * 1000:>9.2f} {values['p95'] * 1000:>9.2f} {values['p99'] * 1000:>9.2f}")
+
+
+def regressions(result: dict, baseline: dict, tolerance: float, min_delta: float) -> list[str]:
+    current = {"client": result["latency"], **result["stages"]}
+    previous = {"client": baseline["latency"], **baseline["stages"]}
+    failed = []
+    for name, values in previous.items():
+        if name not in current:
+            continue
+        growth = current[name]["p99"] - values["p99"]
+        if growth > values["p99"] * tolerance and growth >= min_delta / 1000:
+            failed.append(f"{name}: p99 {values['p99'] * 1000:.2f} -> {current[name]['p99'] * 1000:.2f} ms")
+    return failed
+
+
+async def main(args) -> int:
+    storage_ports = [args.base_port + 10 + number for number in range(args.storages)]
+    sync_port, ugc_port, routing_port = args.base_port + 1, args.base_port + 2, args.base_port
+    storage_urls = [f"http://127.0.0.1:{port}" for port in storage_ports]
+    runners = [
+        await serve(storage_app(number, args.storages, args.head_delay), port)
+        for number, port in enumerate(storage_ports)
+    ]
+    runners.append(await serve(sync_app(storage_urls), sync_port))
+    runners.append(await serve(ugc_app(), ugc_port))
+
+    env = {
+        **os.environ,
+        "SYNC_SERVICE_URL": f"http://127.0.0.1:{sync_port}",
+        "UGC_SERVICE_URL": f"http://127.0.0.1:{ugc_port}",
+        "UGC_JWT_KEY": SECRET,
+        "UGC_MOCK_AUTH_TOKEN": "False",
+        "MOVIES_BUCKET": BUCKET,
+        "ROUTING_SERVER_TIMING": "True",
+    }
+    routing = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--host", "127.0.0.1", "--port", str(routing_port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=SERVICE_ROOT,
+        env=env,
+    )
+    try:
+        result = await run_clients(
+            f"http://127.0.0.1:{routing_port}", film_ids(args.films), args.concurrency, args.duration, args.warmup
+        )
+    finally:
+        routing.terminate()
+        routing.wait()
+        for runner in runners:
+            await runner.cleanup()
+
+    print_report(result)
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        failed = regressions(
+            result, json.loads(Path(args.baseline).read_text()), args.tolerance, args.min_delta
+        )
+        for line in failed:
+            print(f"REGRESSION {line}")
+        return 1 if failed else 0
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20, help="measured time, s")
+    parser.add_argument("--warmup", type=float, default=3, help="requests before measurement, s")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of routing_service")
+    parser.add_argument("--storages", type=int, default=3, help="MinIO stand-ins")
+    parser.add_argument("--head-delay", type=float, default=0.005, help="HEAD answer time of a stand-in, s")
+    parser.add_argument("--films", type=int, default=1000)
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--save", help="write the result to a JSON file")
+    parser.add_argument("--baseline", help="compare with a result saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p99 growth against the baseline")
+    parser.add_argument("--min-delta", type=float, default=1, help="smaller p99 growth is noise, ms")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,115 @@
+"""
+Replay of a request trace against routing policies.
+
+Every `window` seconds (the scrape interval) penalties are recomputed from
+the request rates of the previous window, as the scoreboard does with
+Prometheus data, and every request of the window goes to the cheapest
+storage. The report compares how far clients are sent and how often a
+storage gets more requests than it can serve.
+
+The trace is a CSV with `timestamp,latitude,longitude` columns (access log
+with clients located by GeoIP); without it a synthetic trace is generated.
+
+    python -m benchmarks.simulate_load [--trace trace.csv] [--weight 500 1000 2000]
+"""
+import argparse
+import csv
+from typing import NamedTuple
+
+import numpy as np
+
+from src.edges import EdgeRegistry
+from src.load import EdgeLoad, LoadWeights, load_penalties
+from src.schemas import Storage
+
+
+class Edge(NamedTuple):
+    name: str
+    latlng: tuple
+    capacity: float  # запросов в секунду
+
+
+EDGES = (
+    Edge("moscow", (55.7522, 37.6156), 60),
+    Edge("saint-petersburg", (59.8944, 30.2642), 60),
+    Edge("kazan", (55.7887, 49.1221), 60),
+    Edge("berlin", (52.5244, 13.4105), 60),
+)
+# откуда приходят клиенты в синтетической нагрузке: центр и доля запросов
+CLIENTS = (((55.7522, 37.6156), 0.6), ((59.8944, 30.2642), 0.2), ((52.5244, 13.4105), 0.2))
+
+
+def synthetic_trace(duration: float, rate: float, seed: int = 0) -> np.ndarray:
+    random = np.random.default_rng(seed)
+    count = random.poisson(duration * rate)
+    timestamps = np.sort(random.uniform(0, duration, count))
+    centers = np.array([center for center, _ in CLIENTS])
+    shares = np.array([share for _, share in CLIENTS])
+    positions = centers[random.choice(len(CLIENTS), count, p=shares)] + random.normal(0, 1.0, (count, 2))
+    return np.column_stack([timestamps, positions])
+
+
+def read_trace(path: str) -> np.ndarray:
+    with open(path, newline="") as trace_file:
+        rows = [
+            (float(row["timestamp"]), float(row["latitude"]), float(row["longitude"]))
+            for row in csv.DictReader(trace_file)
+        ]
+    trace = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return trace[np.argsort(trace[:, 0], kind="stable")]
+
+
+def simulate(trace: np.ndarray, edges, weights: LoadWeights, window: float) -> dict:
+    storages = [
+        Storage(id=edge.name, url=f"http://{edge.name}", ip="0.0.0.0", access_key="", secret_key="", latlng=edge.latlng)
+        for edge in edges
+    ]
+    capacity = np.array([edge.capacity for edge in edges])
+    penalties = np.zeros(len(edges))
+    distances, overloaded, peak = [], 0, 0.0
+    start = trace[0, 0] if len(trace) else 0.0
+    windows = np.floor((trace[:, 0] - start) / window).astype(np.int64)
+    for window_id in np.unique(windows):
+        requests = trace[windows == window_id]
+        chosen, distance = EdgeRegistry(storages, penalties).nearest(requests[:, 1], requests[:, 2], k=1)
+        rates = np.bincount(chosen[:, 0], minlength=len(edges)) / window
+        utilization = rates / capacity
+        overloaded += int(np.sum(utilization[chosen[:, 0]] > 1))
+        peak = max(peak, float(utilization.max()))
+        distances.append(distance[:, 0])
+        # штрафы следующего окна - по нагрузке этого, как при опросе Prometheus
+        penalties = load_penalties([EdgeLoad(requests_rate=rate) for rate in rates], weights)
+
+    distances = np.concatenate(distances) if distances else np.zeros(0)
+    return {
+        "requests": len(distances),
+        "mean_km": float(distances.mean()) if len(distances) else 0.0,
+        "p95_km": float(np.percentile(distances, 95)) if len(distances) else 0.0,
+        "overloaded": overloaded / len(distances) if len(distances) else 0.0,
+        "peak_utilization": peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", help="CSV with timestamp,latitude,longitude")
+    parser.add_argument("--duration", type=float, default=600, help="synthetic trace length, s")
+    parser.add_argument("--rate", type=float, default=150, help="synthetic requests per second")
+    parser.add_argument("--window", type=float, default=15, help="scrape interval, s")
+    parser.add_argument("--weight", type=float, nargs="+", default=[250, 500, 1000, 2000], help="requests weight, km")
+    args = parser.parse_args()
+
+    trace = read_trace(args.trace) if args.trace else synthetic_trace(args.duration, args.rate)
+    policies = [("distance", LoadWeights())]
+    policies += [(f"load {weight:g} km", LoadWeights(requests=weight)) for weight in args.weight]
+    print(f"{'policy':<20} {'requests':>9} {'mean km':>9} {'p95 km':>9} {'overloaded':>11} {'peak util':>10}")
+    for name, weights in policies:
+        result = simulate(trace, EDGES, weights, args.window)
+        print(
+            f"{name:<20} {result['requests']:>9} {result['mean_km']:>9.0f} {result['p95_km']:>9.0f}"
+            f" {result['overloaded']:>11.1%} {result['peak_utilization']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
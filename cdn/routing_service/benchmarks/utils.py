@@ -0,0 +1,9 @@
+import timeit
+from typing import Callable
+
+
+def measure(name: str, func: Callable, number: int = 10000, repeat: int = 5) -> float:
+    """Print and return the best time of one call in microseconds"""
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+    print(f"{name:<48} {best:>10.2f} us")
+    return best
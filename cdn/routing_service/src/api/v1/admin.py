@@ -0,0 +1,39 @@
+from uuid import NAMESPACE_URL, UUID, uuid5
+
+from fastapi import APIRouter, Depends, Query
+
+from src.config import placement, storage_worker
+from src.placement import rendezvous_order
+from src.security import check_service_token
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(check_service_token)])
+
+
+def storage_nodes() -> list[str]:
+    return [storage.id or storage.url for storage in storage_worker.cdn_storages]
+
+
+@router.get("/placement")
+async def get_placement(sample: int = Query(1000, ge=0, le=100000)):
+    """Storages of the ring and shares of films they are preferred for, estimated on `sample` film ids"""
+    storages = [
+        {
+            "node": storage.id or storage.url,
+            "url": storage.url,
+            "alive": storage_worker.clients[storage.url].is_alive(),
+            "failures": storage_worker.clients[storage.url].failures,
+        }
+        for storage in storage_worker.cdn_storages
+    ]
+    keys = (str(uuid5(NAMESPACE_URL, str(number))) for number in range(sample))
+    return {
+        "region_radius": placement.region_radius,
+        "storages": storages,
+        "shares": placement.shares(storage_nodes(), keys) if storages else {},
+    }
+
+
+@router.get("/placement/{film_id}")
+async def get_film_placement(film_id: UUID):
+    """Storages from the preferred one for the film, regardless of the client location"""
+    return {"film_id": film_id, "nodes": rendezvous_order(str(film_id), storage_nodes())}
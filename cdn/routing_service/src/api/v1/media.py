@@ -1,33 +1,77 @@
+from http import HTTPStatus
+from typing import Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, APIRouter
-from fastapi import Request
+from fastapi import Depends, HTTPException, APIRouter, Query
+from fastapi import Request, Response
+from fastapi.responses import RedirectResponse
 
-from src.config import get_storage_worker
+from src.config import film_locations, get_storage_worker, placement, ugc_recorder
 from src.jwt_config import AccessTokenPayload, jwt_bearer
-from src.utils import save_info_ugc_service, get_ip_address
+from src.metrics import CHOSEN_STORAGE, FALLBACK_DEPTH, STORAGE_SOURCE
+from src.probe import probe_storages
+from src.settings import settings
+from src.timing import stage
+from src.utils import get_ip_address
 
 router = APIRouter(prefix="/media", tags=["media"], responses={404: {"description": "Not found"}})
 
 
+async def resolve_media_url(request: Request, obj_name: UUID) -> str:
+    """Presigned URL of the film on the nearest storage that holds it"""
+    storage_worker = await get_storage_worker()
+    ip_address = await get_ip_address(request)
+    storages = await storage_worker.get_storages(ip_address)
+    if not storages:
+        STORAGE_SOURCE.labels("not_found").inc()
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="storages not found")
+    with stage("placement"):
+        # хранилища региона упорядочены по фильму, чтобы его запросы попадали на одни и те же узлы
+        storages = placement.order(str(obj_name), storages)
+    candidates = [storage_info["storage"] for storage_info in storages]
+    storage = None
+    source = "locations"
+    # если известно, где лежит фильм - берем ближайшее хранилище без проверки
+    holders = film_locations.storages_of(str(obj_name))
+    if holders:
+        storage = next((info["storage"] for info in storages if info["id"] in holders), None)
+    if storage is None:
+        source = "probe"
+        with stage("probe"):
+            storage = await probe_storages(
+                candidates, str(obj_name), fanout=settings.probe_fanout, delay=settings.probe_hedge_delay
+            )
+    if not storage:
+        STORAGE_SOURCE.labels("not_found").inc()
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="file not found")
+    STORAGE_SOURCE.labels(source).inc()
+    CHOSEN_STORAGE.labels(storage.endpoint_url).inc()
+    FALLBACK_DEPTH.observe(candidates.index(storage))
+    with stage("sign"):
+        return storage.get_link_file(str(obj_name))
+
+
 @router.get("/get_media/{obj_name}")
 async def get_media(
         request: Request,
         obj_name: UUID,
+        redirect: Optional[bool] = Query(None, description="302 to the file instead of JSON with its URL"),
         token_payload: AccessTokenPayload = Depends(jwt_bearer),
 ):
-    user_id = str(token_payload.sub)
-    storage_worker = await get_storage_worker()
-    await save_info_ugc_service(obj_name, user_id)
-    ip_address = await get_ip_address(request)
-    storages = await storage_worker.get_storages(ip_address)
-    if not storages:
-        return HTTPException(status_code=404, detail="storages not found")
-    for storage_info in storages:
-        storage = storage_info.get("storage")
-        if not storage:
-            continue
-        if storage.check_file(obj_name):
-            url = storage.get_link_file(obj_name)
-            return {"url": url}
-    return HTTPException(status_code=404, detail="file not found")
+    with stage("ugc"):
+        ugc_recorder.record(str(obj_name), str(token_payload.sub))
+    url = await resolve_media_url(request, obj_name)
+    if settings.media_redirect if redirect is None else redirect:
+        return RedirectResponse(url, status_code=HTTPStatus.FOUND)
+    return {"url": url}
+
+
+@router.head("/get_media/{obj_name}", status_code=HTTPStatus.FOUND, response_class=Response)
+async def head_media(
+        request: Request,
+        obj_name: UUID,
+        token_payload: AccessTokenPayload = Depends(jwt_bearer),
+):
+    """Location of the file without a body; the view is not recorded"""
+    url = await resolve_media_url(request, obj_name)
+    return Response(status_code=HTTPStatus.FOUND, headers={"Location": url})
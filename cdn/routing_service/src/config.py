@@ -1,17 +1,45 @@
 from faker import Faker
 from fastapi import FastAPI
 
+from src.geoip import load_geoip_index
+from src.load import LoadWeights, Scoreboard
+from src.locations import FilmLocations
+from src.placement import Placement
+from src.settings import settings
 from src.storages import StorageWorker
+from src.ugc import UGCRecorder
 
 app = FastAPI()
 
 fake = Faker()
 
-storage_worker = StorageWorker()
+geoip_index = load_geoip_index(settings.geoip_db_path)
+
+scoreboard = None
+if settings.prometheus_url:
+    scoreboard = Scoreboard(
+        settings.prometheus_url,
+        LoadWeights(settings.load_weight_requests, settings.load_weight_network, settings.load_weight_capacity),
+        settings.load_max_staleness,
+    )
+
+storage_worker = StorageWorker(geoip_index, scoreboard)
+
+film_locations = FilmLocations(settings.locations_max_staleness)
+
+placement = Placement(settings.placement_region_radius)
+
+ugc_recorder = UGCRecorder(
+    f"{settings.ugc_service_url}/ugc/v1/events/record_films",
+    queue_size=settings.ugc_queue_size,
+    batch_size=settings.ugc_batch_size,
+    flush_interval=settings.ugc_flush_interval,
+    timeout=settings.ugc_timeout,
+    spill_path=settings.ugc_spill_path,
+)
 
 
 async def get_storage_worker():
-    if storage_worker.cdn_storages:
-        return storage_worker
-    await storage_worker.create_storage_list()
+    # дальше список обновляет фоновая задача, пустой список - тоже загруженный
+    await storage_worker.wait_loaded()
     return storage_worker
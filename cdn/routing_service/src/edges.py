@@ -0,0 +1,68 @@
+"""
+Vectorized distance ranking of storages.
+
+Coordinates of all storages are kept in NumPy arrays, so distances from a
+client (or from a batch of GeoIP locations) to every storage are computed
+with one haversine call. Only the `k` nearest storages are fully sorted:
+they are selected with argpartition first.
+
+Storages are ranked by cost: the distance plus a per-storage penalty in km
+(see src.load), so a loaded storage is ranked as if it were farther.
+"""
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.schemas import Storage
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class EdgeRegistry:
+    def __init__(self, storages: Iterable[Storage], penalties: Optional[Sequence[float]] = None):
+        self.storages = tuple(storages)
+        if penalties is None:
+            self.penalties = np.zeros(len(self.storages))
+        else:
+            self.penalties = np.asarray(penalties, dtype=np.float64).reshape(len(self.storages))
+        coordinates = np.array(
+            [storage.latlng if storage.latlng else (np.nan, np.nan) for storage in self.storages],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        self.latitudes = np.radians(coordinates[:, 0])
+        self.longitudes = np.radians(coordinates[:, 1])
+        self.located = ~np.isnan(self.latitudes)
+
+    def __len__(self) -> int:
+        return len(self.storages)
+
+    def distances(self, latitudes, longitudes) -> np.ndarray:
+        """
+        Distance in km from every point to every storage, shape (points, storages).
+        Storages without coordinates are infinitely far.
+        """
+        latitudes = np.radians(np.asarray(latitudes, dtype=np.float64)).reshape(-1, 1)
+        longitudes = np.radians(np.asarray(longitudes, dtype=np.float64)).reshape(-1, 1)
+        a = (
+            np.sin((self.latitudes - latitudes) / 2) ** 2
+            + np.cos(latitudes) * np.cos(self.latitudes) * np.sin((self.longitudes - longitudes) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+        distances[:, ~self.located] = np.inf
+        return distances
+
+    def nearest(self, latitudes, longitudes, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Indexes of the k cheapest storages for every point, ordered by cost,
+        and the distances to them. Both arrays have shape (points, min(k, storages)).
+        """
+        distances = self.distances(latitudes, longitudes)
+        costs = distances + self.penalties
+        k = min(k, len(self))
+        if k < len(self):
+            selected = np.argpartition(costs, k - 1, axis=1)[:, :k]
+        else:
+            selected = np.broadcast_to(np.arange(len(self)), distances.shape)
+        order = np.argsort(np.take_along_axis(costs, selected, axis=1), axis=1, kind="stable")
+        selected = np.take_along_axis(selected, order, axis=1)
+        return selected, np.take_along_axis(distances, selected, axis=1)
@@ -0,0 +1,149 @@
+"""
+Offline GeoIP lookup.
+
+IPv4 ranges are kept as sorted integer arrays (start, end, location) plus a
+table of unique coordinates, so a lookup is a single binary search with no
+network access. The table is built from a MaxMind GeoLite2 City blocks CSV
+(``network,...,latitude,longitude,...``) and can be compiled into a flat
+binary file that is memory-mapped, so all gunicorn workers share one copy
+through the page cache.
+
+Compile a CSV export:
+    python -m src.geoip GeoLite2-City-Blocks-IPv4.csv geoip.bin
+"""
+import csv
+import ipaddress
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Optional, Tuple
+
+from src.settings import logger
+
+LatLng = Tuple[float, float]
+
+MAGIC = b"GEO1"
+# magic, ranges count, locations count, padding up to 8 bytes alignment
+HEADER = struct.Struct("<4sIII")
+
+
+def ip_to_int(ip_address: str) -> Optional[int]:
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return None
+    if address.version != 4:
+        return None
+    return int(address)
+
+
+class GeoIPIndex:
+    def __init__(self, starts, ends, locations, latitudes, longitudes, mapped: Optional[mmap.mmap] = None):
+        self.starts = starts
+        self.ends = ends
+        self.locations = locations
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self._mapped = mapped
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def empty(cls) -> "GeoIPIndex":
+        return cls(array("I"), array("I"), array("I"), array("d"), array("d"))
+
+    @classmethod
+    def from_csv(cls, path: str) -> "GeoIPIndex":
+        ranges = []
+        coordinates: dict[LatLng, int] = {}
+        with open(path, newline="") as csv_file:
+            for row in csv.DictReader(csv_file):
+                if not row.get("latitude") or not row.get("longitude"):
+                    continue
+                try:
+                    network = ipaddress.ip_network(row["network"])
+                except ValueError:
+                    continue
+                if network.version != 4:
+                    continue
+                latlng = (float(row["latitude"]), float(row["longitude"]))
+                location = coordinates.setdefault(latlng, len(coordinates))
+                ranges.append((int(network.network_address), int(network.broadcast_address), location))
+
+        ranges.sort()
+        index = cls(
+            array("I", (item[0] for item in ranges)),
+            array("I", (item[1] for item in ranges)),
+            array("I", (item[2] for item in ranges)),
+            array("d", (latlng[0] for latlng in coordinates)),
+            array("d", (latlng[1] for latlng in coordinates)),
+        )
+        return index
+
+    @classmethod
+    def open(cls, path: str) -> "GeoIPIndex":
+        """Memory-map a table compiled with `GeoIPIndex.save`."""
+        with open(path, "rb") as db_file:
+            mapped = mmap.mmap(db_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, ranges_count, locations_count, _ = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            mapped.close()
+            raise ValueError(f"{path} is not a compiled GeoIP table")
+
+        view = memoryview(mapped)
+        offset = HEADER.size
+        arrays = []
+        for typecode, count in (("I", ranges_count),) * 3 + (("d", locations_count),) * 2:
+            if typecode == "d":
+                offset += -offset % 8
+            end = offset + count * struct.calcsize(typecode)
+            arrays.append(view[offset:end].cast(typecode))
+            offset = end
+        return cls(*arrays, mapped=mapped)
+
+    def save(self, path: str):
+        with open(path, "wb") as db_file:
+            db_file.write(HEADER.pack(MAGIC, len(self.starts), len(self.latitudes), 0))
+            for values in (self.starts, self.ends, self.locations):
+                db_file.write(array("I", values).tobytes())
+            db_file.write(b"\0" * (-db_file.tell() % 8))
+            for values in (self.latitudes, self.longitudes):
+                db_file.write(array("d", values).tobytes())
+
+    def lookup_location(self, ip_address: str) -> Optional[int]:
+        """Return id of the location for ip_address or None if it is not in the table"""
+        value = ip_to_int(ip_address)
+        if value is None:
+            return None
+        position = bisect_right(self.starts, value) - 1
+        if position < 0 or value > self.ends[position]:
+            return None
+        return self.locations[position]
+
+    def locate(self, ip_address: str) -> Optional[LatLng]:
+        location = self.lookup_location(ip_address)
+        if location is None:
+            return None
+        return self.latitudes[location], self.longitudes[location]
+
+
+def load_geoip_index(path: Optional[str]) -> GeoIPIndex:
+    if not path:
+        logger.warning("GeoIP database is not configured, clients can't be located")
+        return GeoIPIndex.empty()
+    if Path(path).suffix == ".csv":
+        index = GeoIPIndex.from_csv(path)
+    else:
+        index = GeoIPIndex.open(path)
+    logger.info("GeoIP database %s loaded: %d ranges", path, len(index))
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python -m src.geoip <GeoLite2-City-Blocks-IPv4.csv> <output.bin>")
+    GeoIPIndex.from_csv(sys.argv[1]).save(sys.argv[2])
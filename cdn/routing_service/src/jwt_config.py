@@ -1,6 +1,9 @@
+import hashlib
 import logging
+import time
+from collections import OrderedDict
 from http import HTTPStatus
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 import jwt
@@ -9,6 +12,7 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from src.settings import settings
 from src.core_model import CoreModel
+from src.timing import stage
 
 logger = logging.getLogger(__name__)
 
@@ -32,9 +36,53 @@ class AccessTokenPayload(CoreModel):
     device_id: str
 
 
+class TokenCache:
+    """
+    Validated payloads keyed by sha256 of the token, kept until the token expires.
+    A player sends the same token with every request, so it is verified once.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._payloads: OrderedDict[bytes, AccessTokenPayload] = OrderedDict()
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[AccessTokenPayload]:
+        digest = self.digest(token)
+        payload = self._payloads.get(digest)
+        if payload is None:
+            self.misses += 1
+            return None
+        if time.time() >= payload.exp:
+            del self._payloads[digest]
+            self.misses += 1
+            return None
+        self._payloads.move_to_end(digest)
+        self.hits += 1
+        return payload
+
+    def put(self, token: str, payload: AccessTokenPayload):
+        if self.max_size <= 0:
+            return
+        digest = self.digest(token)
+        self._payloads[digest] = payload
+        self._payloads.move_to_end(digest)
+        if len(self._payloads) > self.max_size:
+            self._payloads.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._payloads), "hits": self.hits, "misses": self.misses}
+
+
 class JWTBearer(HTTPBearer):
-    def __init__(self, auto_error: bool = True):
+    def __init__(self, auto_error: bool = True, cache: Optional[TokenCache] = None):
         super().__init__(auto_error=auto_error)
+        self.cache = cache
 
     async def __call__(self, request: Request) -> AccessTokenPayload:
         if MOCK_TOKEN:
@@ -47,14 +95,25 @@ class JWTBearer(HTTPBearer):
         if credentials.scheme != "Bearer":
             raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Invalid authentication scheme.")
 
+        with stage("auth"):
+            return self.decode(credentials.credentials)
+
+    def decode(self, token: str) -> AccessTokenPayload:
+        if self.cache is not None:
+            payload = self.cache.get(token)
+            if payload is not None:
+                return payload
+
         try:
-            decoded_token = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+            decoded_token = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         except jwt.PyJWTError:
             raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Invalid token or expired token.")
 
         logger.debug("jwt-token payload: %s", decoded_token)
-        token = AccessTokenPayload(**decoded_token)
-        return token
+        payload = AccessTokenPayload(**decoded_token)
+        if self.cache is not None:
+            self.cache.put(token, payload)
+        return payload
 
 
 def get_mock_token():
@@ -73,4 +132,4 @@ def get_mock_token():
     )
 
 
-jwt_bearer = JWTBearer()
+jwt_bearer = JWTBearer(cache=TokenCache(settings.jwt_cache_size))
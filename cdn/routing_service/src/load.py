@@ -0,0 +1,113 @@
+"""
+Load of the storages scraped from Prometheus.
+
+Prometheus already collects MinIO cluster metrics of every storage (job
+`minio-job`). The scoreboard periodically queries free capacity, request
+rate and sent traffic per instance and turns them into a penalty in km that
+is added to the distance when storages are ranked, so a nearby saturated
+storage loses traffic to a farther idle one.
+
+Request rate and traffic are taken relative to the busiest storage, capacity
+as the used fraction; each component is multiplied by its weight in km.
+Instances are matched to storages by host name.
+"""
+import asyncio
+import math
+import time
+from typing import NamedTuple, Optional, Sequence
+from urllib.parse import urlsplit
+
+import aiohttp
+import numpy as np
+
+from src.schemas import Storage
+from src.settings import logger
+
+QUERIES = {
+    "free_bytes": "max by (instance) (minio_cluster_capacity_usable_free_bytes)",
+    "total_bytes": "max by (instance) (minio_cluster_capacity_usable_total_bytes)",
+    "requests_rate": "sum by (instance) (rate(minio_s3_requests_total[1m]))",
+    "network_rate": "sum by (instance) (rate(minio_s3_traffic_sent_bytes[1m]))",
+}
+
+
+class EdgeLoad(NamedTuple):
+    free_bytes: float = math.nan
+    total_bytes: float = math.nan
+    requests_rate: float = math.nan
+    network_rate: float = math.nan
+
+
+class LoadWeights(NamedTuple):
+    """Penalty in km for the busiest storage (requests, network) and for a full one (capacity)"""
+
+    requests: float = 0.0
+    network: float = 0.0
+    capacity: float = 0.0
+
+
+def host_of(address: str) -> Optional[str]:
+    """Host of an URL or of a Prometheus instance label (host:port)"""
+    return urlsplit(address if "//" in address else f"//{address}").hostname
+
+
+def relative(values: np.ndarray) -> np.ndarray:
+    known = ~np.isnan(values)
+    peak = values[known].max() if known.any() else 0.0
+    if peak <= 0:
+        return np.zeros_like(values)
+    return np.where(known, values / peak, 0.0)
+
+
+def load_penalties(loads: Sequence[Optional[EdgeLoad]], weights: LoadWeights) -> np.ndarray:
+    """Penalty in km for every storage, 0 for storages without metrics"""
+    table = np.array([load if load is not None else EdgeLoad() for load in loads], dtype=np.float64).reshape(-1, 4)
+    free_bytes, total_bytes, requests_rate, network_rate = table.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        used = np.where(total_bytes > 0, 1 - free_bytes / total_bytes, 0.0)
+    used = np.clip(np.nan_to_num(used), 0, 1)
+    return (
+        weights.requests * relative(requests_rate)
+        + weights.network * relative(network_rate)
+        + weights.capacity * used
+    )
+
+
+class Scoreboard:
+    def __init__(self, prometheus_url: str, weights: LoadWeights, max_staleness: float):
+        self.prometheus_url = prometheus_url
+        self.weights = weights
+        self.max_staleness = max_staleness
+        self.loads: dict[str, EdgeLoad] = {}
+        self.updated_at = 0.0
+
+    def update(self, samples: dict[str, list]):
+        """Take query results: metric name -> Prometheus instant vector"""
+        loads: dict[str, dict] = {}
+        for name, vector in samples.items():
+            for sample in vector:
+                host = host_of(sample["metric"].get("instance", ""))
+                if host:
+                    loads.setdefault(host, {})[name] = float(sample["value"][1])
+        self.loads = {host: EdgeLoad(**values) for host, values in loads.items()}
+        self.updated_at = time.monotonic()
+
+    def load_of(self, storage: Storage) -> Optional[EdgeLoad]:
+        if time.monotonic() - self.updated_at > self.max_staleness:
+            return None
+        return self.loads.get(host_of(storage.url))
+
+    def penalties(self, storages: Sequence[Storage]) -> np.ndarray:
+        return load_penalties([self.load_of(storage) for storage in storages], self.weights)
+
+    async def scrape(self, session: aiohttp.ClientSession):
+        url = f"{self.prometheus_url}/api/v1/query"
+
+        async def query(expression: str) -> list:
+            async with session.get(url, params={"query": expression}) as response:
+                response.raise_for_status()
+                return (await response.json())["data"]["result"]
+
+        results = await asyncio.gather(*(query(expression) for expression in QUERIES.values()))
+        self.update(dict(zip(QUERIES, results)))
+        logger.debug("Storage load updated: %s", self.loads)
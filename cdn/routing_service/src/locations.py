@@ -0,0 +1,75 @@
+"""
+Film locations mirrored from sync_service.
+
+sync_service keeps the film -> storages relation and a journal of its
+changes. The mirror is bulk-loaded once and then follows the journal, so
+the media endpoint knows which storages hold a film without HEAD requests.
+When the mirror is stale or doesn't know a film, callers fall back to
+probing the storages.
+"""
+import asyncio
+import time
+from typing import Optional
+
+import aiohttp
+
+from src.settings import logger, settings
+
+ADD = "ADD"
+REMOVE = "REMOVE"
+
+
+class FilmLocations:
+    def __init__(self, max_staleness: float):
+        self.max_staleness = max_staleness
+        self.films: dict[str, set[str]] = {}
+        self.last_event_id: Optional[int] = None
+        self.updated_at = 0.0
+
+    def load(self, snapshot: dict):
+        self.films = {film_id: set(storage_ids) for film_id, storage_ids in snapshot["films"].items()}
+        self.last_event_id = snapshot["last_event_id"]
+        self.updated_at = time.monotonic()
+
+    def apply(self, changes: dict):
+        for event in changes["events"]:
+            storage_ids = self.films.setdefault(event["film_id"], set())
+            if event["action"] == ADD:
+                storage_ids.add(event["s3storage_id"])
+            elif event["action"] == REMOVE:
+                storage_ids.discard(event["s3storage_id"])
+        self.last_event_id = changes["last_event_id"]
+        self.updated_at = time.monotonic()
+
+    def storages_of(self, film_id: str) -> Optional[set[str]]:
+        """Ids of storages that hold the film, None if the mirror can't tell"""
+        if self.last_event_id is None or time.monotonic() - self.updated_at > self.max_staleness:
+            return None
+        return self.films.get(film_id)
+
+    async def refresh(self, session: aiohttp.ClientSession):
+        url = f"{settings.sync_service_url}/api/v1/films/locations"
+        if self.last_event_id is None:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                self.load(await response.json())
+            logger.info("Film locations loaded: %d films", len(self.films))
+            return
+
+        has_more = True
+        while has_more:
+            async with session.get(f"{url}/events", params={"since": self.last_event_id}) as response:
+                response.raise_for_status()
+                changes = await response.json()
+            self.apply(changes)
+            has_more = changes["has_more"]
+
+    async def follow(self, interval: float):
+        headers = {"Authorization": settings.sync_service_token}
+        async with aiohttp.ClientSession(headers=headers) as session:
+            while True:
+                try:
+                    await self.refresh(session)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                    logger.warning("Can't update film locations: %s", err)
+                await asyncio.sleep(interval)
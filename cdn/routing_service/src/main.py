@@ -1,9 +1,36 @@
+import asyncio
+
 import uvicorn
 
-from src.config import app
-from src.api.v1 import media
+from src.config import app, film_locations, storage_worker, ugc_recorder
+from src.api.v1 import admin, media
+from src import metrics
+from src.settings import settings
+from src.timing import add_server_timing
 
 app.include_router(media.router)
+app.include_router(admin.router)
+app.include_router(metrics.router)
+if settings.server_timing:
+    app.middleware("http")(add_server_timing)
+
+background_tasks = set()
+
+
+@app.on_event("startup")
+async def startup():
+    background_tasks.add(asyncio.create_task(storage_worker.follow(settings.storages_poll_interval)))
+    background_tasks.add(asyncio.create_task(film_locations.follow(settings.locations_poll_interval)))
+    if storage_worker.scoreboard:
+        background_tasks.add(asyncio.create_task(storage_worker.follow_load(settings.load_poll_interval)))
+    ugc_recorder.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await ugc_recorder.stop()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8001)
@@ -0,0 +1,57 @@
+"""
+Prometheus metrics of routing_service, served on /metrics.
+
+With several gunicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty
+directory, so the endpoint aggregates the metrics of all workers.
+"""
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+STAGE_SECONDS = Histogram(
+    "routing_stage_seconds",
+    "Time spent in a stage of the media request",
+    ["stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CHOSEN_STORAGE = Counter("routing_chosen_storage_total", "Storages links were given to", ["storage"])
+STORAGE_SOURCE = Counter(
+    "routing_storage_source_total",
+    "How the storage was found: film locations mirror, probes or not found",
+    ["source"],
+)
+ROUTING_TABLE_LOOKUPS = Counter(
+    "routing_table_lookups_total",
+    "Routing table lookups: hit - precomputed or cached ranking, miss - ranked by network prefix on request",
+    ["result"],
+)
+PRESIGNED_URL_CACHE = Counter(
+    "routing_presigned_url_cache_total",
+    "Presigned URL cache lookups: hit - a cached URL is reused, miss - a new one is signed",
+    ["result"],
+)
+FALLBACK_DEPTH = Histogram(
+    "routing_fallback_depth",
+    "Position of the chosen storage in the ranked list, 0 is the preferred one",
+    buckets=(0, 1, 2, 3, 5, 10),
+)
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
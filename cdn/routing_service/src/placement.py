@@ -0,0 +1,58 @@
+"""
+Rendezvous (highest random weight) placement of films on storages.
+
+Storages of one region - the cheapest storage and the following ones whose
+cost (distance plus load penalty) is at most `region_radius` km higher - are
+ordered by hash(film_id, storage) instead of cost, so a loaded storage leaves
+the region of its neighbours and placement doesn't undo the load ranking.
+Clients without a location (infinite cost) have no region. Requests for a film from the region go to the same
+storage, so its MinIO and nginx caches stay warm, and films are spread
+evenly over the storages of the region. When a storage joins or leaves
+only the films whose highest weight was on it move, about 1/N of them.
+"""
+import hashlib
+import math
+from typing import Iterable, Sequence
+
+
+def rendezvous_weight(key: str, node: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{key}/{node}".encode(), digest_size=8).digest(), "big")
+
+
+def rendezvous_order(key: str, nodes: Iterable[str]) -> list[str]:
+    """Nodes from the preferred one for key"""
+    return sorted(nodes, key=lambda node: rendezvous_weight(key, node), reverse=True)
+
+
+def node_of(storage_info: dict) -> str:
+    return storage_info["id"] or storage_info["storage"].endpoint_url
+
+
+class Placement:
+    def __init__(self, region_radius: float):
+        self.region_radius = region_radius
+
+    def region_size(self, storages: Sequence[dict]) -> int:
+        """How many first storages of the ranked list are in the region of the cheapest one"""
+        if not storages or math.isinf(storages[0]["cost"]):
+            return 0
+        limit = storages[0]["cost"] + self.region_radius
+        size = 1
+        while size < len(storages) and storages[size]["cost"] <= limit:
+            size += 1
+        return size
+
+    def order(self, film_id: str, storages: Sequence[dict]) -> list[dict]:
+        """Ranked storages with the region reordered by rendezvous weight of film_id"""
+        size = self.region_size(storages)
+        region = sorted(storages[:size], key=lambda info: rendezvous_weight(film_id, node_of(info)), reverse=True)
+        return region + list(storages[size:])
+
+    def shares(self, nodes: Sequence[str], keys: Iterable[str]) -> dict[str, float]:
+        """Fraction of keys every node is preferred for"""
+        counts = dict.fromkeys(nodes, 0)
+        total = 0
+        for key in keys:
+            counts[max(nodes, key=lambda node: rendezvous_weight(key, node))] += 1
+            total += 1
+        return {node: count / total if total else 0.0 for node, count in counts.items()}
@@ -0,0 +1,66 @@
+"""
+Hedged probing of candidate storages.
+
+HEAD requests are sent to the `fanout` nearest storages at once; every
+`delay` seconds without a decisive answer one more storage is probed. The
+nearest storage that has the object wins: a positive answer is accepted
+only when all nearer storages have answered negatively. Outstanding probes
+are cancelled as soon as the winner is known.
+
+`delay=None` waits for every answer before probing the next storage, i.e.
+the storages are probed one by one in distance order.
+"""
+import asyncio
+from typing import Optional, Sequence
+
+from src.settings import logger
+from src.storages import ObjectStorageBase
+
+
+async def check_file(storage: ObjectStorageBase, key: str) -> bool:
+    try:
+        found = await storage.check_file_async(key)
+    except Exception as err:
+        logger.warning("Storage %s probe failed: %s", storage.endpoint_url, err)
+        storage.mark_probe(succeeded=False)
+        return False
+    storage.mark_probe(succeeded=True)
+    return bool(found)
+
+
+async def probe_storages(
+    storages: Sequence[ObjectStorageBase], key: str, fanout: int = 1, delay: Optional[float] = None
+) -> Optional[ObjectStorageBase]:
+    answers: list[Optional[bool]] = [None] * len(storages)
+    pending: dict[asyncio.Task, int] = {}
+    launched = 0
+    nearest = 0  # первое хранилище, для которого еще нет отрицательного ответа
+
+    def launch():
+        nonlocal launched
+        pending[asyncio.create_task(check_file(storages[launched], key))] = launched
+        launched += 1
+
+    try:
+        while launched < min(max(fanout, 1), len(storages)):
+            launch()
+
+        while pending:
+            timeout = delay if launched < len(storages) else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                answers[pending.pop(task)] = task.result()
+
+            while nearest < launched and answers[nearest] is False:
+                nearest += 1
+            if nearest < launched and answers[nearest]:
+                return storages[nearest]
+
+            # ответа нет дольше delay или все запущенные проверки отрицательные
+            if launched < len(storages) and (not done or not pending):
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return None
@@ -0,0 +1,127 @@
+"""
+Precomputed nearest-storage routing table.
+
+For every location of the GeoIP table the nearest storages are ranked once,
+when the storage list is loaded, and kept as rows of (locations, candidates)
+arrays, so a media request costs one GeoIP lookup and one row lookup.
+Clients the GeoIP table doesn't know (private networks, gaps in the
+database) are ranked by how many leading bits their address shares with
+the storage address; these rankings are cached per /24 prefix in a bounded
+LRU; storages with the same prefix length are ordered by load penalty.
+Hits and misses are counted in `routing_table_lookups_total`, which outlives
+the tables rebuilt on every storage list or load change.
+"""
+import math
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.edges import EdgeRegistry
+from src.geoip import GeoIPIndex, ip_to_int
+from src.metrics import ROUTING_TABLE_LOOKUPS
+from src.schemas import Storage
+
+PREFIX_SHIFT = 8  # /24
+BUILD_CHUNK_SIZE = 4096  # локаций за один векторный расчет
+
+
+class RankedStorage(NamedTuple):
+    storage: Storage
+    distance: float
+    cost: float  # distance плюс штраф нагрузки, по нему отсортирован Ranking
+
+
+Ranking = Tuple[RankedStorage, ...]
+
+
+def shared_prefix_length(address_1: Optional[int], address_2: Optional[int]) -> int:
+    if address_1 is None or address_2 is None:
+        return 0
+    return 32 - (address_1 ^ address_2).bit_length()
+
+
+class RoutingTable:
+    def __init__(
+        self,
+        storages: Iterable[Storage],
+        geoip: GeoIPIndex,
+        candidates: int,
+        lru_size: int,
+        penalties: Optional[Sequence[float]] = None,
+    ):
+        self.edges = EdgeRegistry(storages, penalties)
+        self.storages = self.edges.storages
+        self.geoip = geoip
+        self.candidates = candidates
+        self.lru_size = lru_size
+        self._order = np.empty((0, 0), dtype=np.int32)
+        self._distance = np.empty((0, 0), dtype=np.float32)
+        self._by_prefix: OrderedDict[int, Ranking] = OrderedDict()
+        self._storage_addresses = [ip_to_int(storage.ip) for storage in self.storages]
+        self._penalties = self.edges.penalties.tolist()
+        self._default = self._rank_by_network(None)
+
+    def build(self) -> "RoutingTable":
+        """Rank storages for every GeoIP location. CPU bound - run it outside the event loop"""
+        latitudes = np.asarray(self.geoip.latitudes, dtype=np.float64)
+        longitudes = np.asarray(self.geoip.longitudes, dtype=np.float64)
+        orders, distances = [], []
+        for start in range(0, len(latitudes), BUILD_CHUNK_SIZE):
+            end = start + BUILD_CHUNK_SIZE
+            order, distance = self.edges.nearest(latitudes[start:end], longitudes[start:end], self.candidates)
+            orders.append(order.astype(np.int32))
+            distances.append(distance.astype(np.float32))
+        if orders:
+            self._order = np.concatenate(orders)
+            self._distance = np.concatenate(distances)
+        return self
+
+    def lookup(self, ip_address: str) -> Ranking:
+        """Storages ordered from the nearest to the farthest, at most `candidates` of them"""
+        return self.rank(ip_address, self.geoip.lookup_location(ip_address))
+
+    def rank(self, ip_address: str, location: Optional[int]) -> Ranking:
+        """Same as lookup for a client already located in the GeoIP table"""
+        if location is not None:
+            ROUTING_TABLE_LOOKUPS.labels("hit").inc()
+            # таблица без строк: хранилищ нет или она еще не построена
+            if not len(self._order):
+                return ()
+            return tuple(
+                RankedStorage(self.storages[index], float(distance), float(distance) + self._penalties[index])
+                for index, distance in zip(self._order[location].tolist(), self._distance[location].tolist())
+            )
+
+        address = ip_to_int(ip_address)
+        if address is None:
+            ROUTING_TABLE_LOOKUPS.labels("hit").inc()
+            return self._default
+
+        prefix = address >> PREFIX_SHIFT
+        ranking = self._by_prefix.get(prefix)
+        if ranking is not None:
+            self._by_prefix.move_to_end(prefix)
+            ROUTING_TABLE_LOOKUPS.labels("hit").inc()
+            return ranking
+
+        ROUTING_TABLE_LOOKUPS.labels("miss").inc()
+        ranking = self._rank_by_network(address)
+        self._by_prefix[prefix] = ranking
+        if len(self._by_prefix) > self.lru_size:
+            self._by_prefix.popitem(last=False)
+        return ranking
+
+    def stats(self) -> dict:
+        return {
+            "storages": len(self.storages),
+            "locations": len(self._order),
+            "prefixes": len(self._by_prefix),
+        }
+
+    def _rank_by_network(self, address: Optional[int]) -> Ranking:
+        ranked = sorted(
+            zip(self.storages, self._storage_addresses, self.edges.penalties.tolist()),
+            key=lambda item: (-shared_prefix_length(address, item[1]), item[2]),
+        )
+        return tuple(RankedStorage(storage, math.inf, math.inf) for storage, _, _ in ranked[: self.candidates])
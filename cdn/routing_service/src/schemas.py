@@ -1,8 +1,13 @@
+from typing import Optional, Tuple
+
 from pydantic import BaseModel
 
 
 class Storage(BaseModel):
+    id: Optional[str] = None
     url: str
     ip: str
     access_key: str
     secret_key: str
+    # координаты хранилища, определяются один раз при загрузке списка хранилищ
+    latlng: Optional[Tuple[float, float]] = None
@@ -0,0 +1,13 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException, Security
+from fastapi.security.api_key import APIKeyHeader
+
+from src.settings import settings
+
+token_header = APIKeyHeader(name="Authorization", auto_error=False)
+
+
+async def check_service_token(token_header: str = Security(token_header)):
+    if token_header != settings.sync_service_token and token_header != f"Bearer {settings.sync_service_token}":
+        raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Invalid authorization token")
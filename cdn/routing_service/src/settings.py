@@ -1,4 +1,5 @@
 from logging import getLogger
+from typing import Optional
 
 from pydantic import BaseSettings, Field
 
@@ -14,9 +15,72 @@ class Settings(BaseSettings):
     MOCK_AUTH_TOKEN: bool = Field(
         False, env="UGC_MOCK_AUTH_TOKEN"
     )  # для отладки - можно отключить проверку токена в заголовках
+    # проверенные токены кешируются до истечения срока, 0 - без кеша
+    jwt_cache_size: int = Field(10000, env="ROUTING_JWT_CACHE_SIZE")
 
     sync_service_url = Field("http://localhost:8010", env="SYNC_SERVICE_URL")
-    ugc_service_url = Field("http://localhost:8010", env="SYNC_SERVICE_URL")
+    ugc_service_url = Field("http://localhost:8000", env="UGC_SERVICE_URL")
+    sync_service_token: str = Field("secret_key", env="SYNC_SECRET_KEY")
+    # как часто забирать изменения расположения фильмов и через сколько секунд
+    # без обновлений перестать им доверять
+    locations_poll_interval: float = Field(5, env="ROUTING_LOCATIONS_POLL_INTERVAL")
+    locations_max_staleness: float = Field(60, env="ROUTING_LOCATIONS_MAX_STALENESS")
+    # обновление списка хранилищ; хранилище без heartbeat дольше storage_heartbeat_timeout
+    # секунд не используется
+    storages_poll_interval: float = Field(30, env="ROUTING_STORAGES_POLL_INTERVAL")
+    storage_heartbeat_timeout: int = Field(90, env="ROUTING_STORAGE_HEARTBEAT_TIMEOUT")
+    # сколько ошибок подряд выводят хранилище из маршрутизации и на сколько секунд
+    storage_failures_threshold: int = Field(3, env="ROUTING_STORAGE_FAILURES_THRESHOLD")
+    storage_dead_cooldown: float = Field(30, env="ROUTING_STORAGE_DEAD_COOLDOWN")
+
+    # нагрузка хранилищ из Prometheus (метрики MinIO); без адреса хранилища ранжируются
+    # только по расстоянию. Веса - штраф в км для самого загруженного (запросы, трафик)
+    # и для заполненного хранилища
+    prometheus_url: Optional[str] = Field(None, env="ROUTING_PROMETHEUS_URL")
+    load_poll_interval: float = Field(15, env="ROUTING_LOAD_POLL_INTERVAL")
+    load_max_staleness: float = Field(60, env="ROUTING_LOAD_MAX_STALENESS")
+    load_weight_requests: float = Field(500, env="ROUTING_LOAD_WEIGHT_REQUESTS")
+    load_weight_network: float = Field(1000, env="ROUTING_LOAD_WEIGHT_NETWORK")
+    load_weight_capacity: float = Field(200, env="ROUTING_LOAD_WEIGHT_CAPACITY")
+    # таблица маршрутов перестраивается, если штраф хранилища изменился больше, чем на столько км
+    load_rebuild_tolerance: float = Field(50, env="ROUTING_LOAD_REBUILD_TOLERANCE")
+
+    # GeoIP: MaxMind GeoLite2 City blocks CSV or table compiled with `python -m src.geoip`
+    geoip_db_path: Optional[str] = Field(None, env="ROUTING_GEOIP_DB")
+    # сколько ближайших хранилищ проверять на наличие файла
+    routing_candidates: int = Field(10, env="ROUTING_CANDIDATES")
+    # фильм закрепляется за хранилищами региона клиента хешированием (rendezvous):
+    # в регион входят ближайшее хранилище и те, что дальше него не больше чем на столько км
+    placement_region_radius: float = Field(300, env="ROUTING_PLACEMENT_REGION_RADIUS")
+    # размер LRU кеша маршрутов для адресов, которых нет в GeoIP базе
+    routing_prefix_cache_size: int = Field(65536, env="ROUTING_PREFIX_CACHE_SIZE")
+    # размер пула keep-alive соединений каждого S3 клиента
+    s3_max_pool_connections: int = Field(50, env="ROUTING_S3_MAX_POOL_CONNECTIONS")
+    s3_connect_timeout: float = Field(1, env="ROUTING_S3_CONNECT_TIMEOUT")
+    s3_read_timeout: float = Field(2, env="ROUTING_S3_READ_TIMEOUT")
+    s3_max_attempts: int = Field(1, env="ROUTING_S3_MAX_ATTEMPTS")
+    # сколько ближайших хранилищ проверять сразу и через сколько секунд без ответа
+    # проверять следующее; без задержки хранилища проверяются по очереди
+    probe_fanout: int = Field(1, env="ROUTING_PROBE_FANOUT")
+    probe_hedge_delay: Optional[float] = Field(0.05, env="ROUTING_PROBE_HEDGE_DELAY")
+    # ссылки выдаются на 24 часа, одна ссылка переиспользуется, пока не прошла
+    # заданная доля ее срока жизни
+    presigned_url_expires: int = Field(3600 * 24, env="ROUTING_PRESIGNED_URL_EXPIRES")
+    presigned_url_reuse_fraction: float = Field(0.5, env="ROUTING_PRESIGNED_URL_REUSE_FRACTION")
+    presigned_url_cache_size: int = Field(10000, env="ROUTING_PRESIGNED_URL_CACHE_SIZE")
+    # get_media отвечает 302 на ссылку вместо JSON; можно переопределить параметром redirect
+    media_redirect: bool = Field(False, env="ROUTING_MEDIA_REDIRECT")
+
+    # запросы фильмов отправляются в UGC пачками из фоновой очереди; при переполнении
+    # очереди или ошибке UGC записи сохраняются в ugc_spill_path.<pid>, если он задан
+    ugc_queue_size: int = Field(10000, env="ROUTING_UGC_QUEUE_SIZE")
+    ugc_batch_size: int = Field(500, env="ROUTING_UGC_BATCH_SIZE")
+    ugc_flush_interval: float = Field(1, env="ROUTING_UGC_FLUSH_INTERVAL")
+    ugc_timeout: float = Field(5, env="ROUTING_UGC_TIMEOUT")
+    ugc_spill_path: Optional[str] = Field(None, env="ROUTING_UGC_SPILL_PATH")
+
+    # время этапов запроса в заголовке Server-Timing, для нагрузочного тестирования
+    server_timing: bool = Field(False, env="ROUTING_SERVER_TIMING")
 
     class Config:
         env_file = "../.env"
@@ -0,0 +1,53 @@
+"""
+Presigned URL cache.
+
+A presigned URL is valid for `expires_in` seconds, so the same URL can be
+handed to every user requesting the object from the same storage until
+`reuse_fraction` of its lifetime has elapsed; after that a fresh one is
+signed, leaving clients at least (1 - reuse_fraction) of the lifetime.
+Hits and misses are counted in `routing_presigned_url_cache_total`, the reuse
+ratio is rate(hit) / rate(hit + miss).
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+
+from src.metrics import PRESIGNED_URL_CACHE
+
+
+class CachedUrl(NamedTuple):
+    url: str
+    reuse_until: float
+
+
+class PresignedUrlCache:
+    def __init__(self, max_size: int, expires_in: int, reuse_fraction: float):
+        self.max_size = max_size
+        self.expires_in = expires_in
+        self.reuse_fraction = reuse_fraction
+        self.hits = 0
+        self.misses = 0
+        self._urls: OrderedDict[tuple[str, str], CachedUrl] = OrderedDict()
+
+    def get(self, storage_url: str, key: str, sign: Callable[[int], str]) -> str:
+        """Cached URL for key on storage_url, `sign(expires_in)` makes a new one"""
+        cache_key = (storage_url, key)
+        now = time.time()
+        cached = self._urls.get(cache_key)
+        if cached is not None and now < cached.reuse_until:
+            self._urls.move_to_end(cache_key)
+            self.hits += 1
+            PRESIGNED_URL_CACHE.labels("hit").inc()
+            return cached.url
+
+        self.misses += 1
+        PRESIGNED_URL_CACHE.labels("miss").inc()
+        url = sign(self.expires_in)
+        self._urls[cache_key] = CachedUrl(url, now + self.expires_in * self.reuse_fraction)
+        self._urls.move_to_end(cache_key)
+        if len(self._urls) > self.max_size:
+            self._urls.popitem(last=False)
+        return url
+
+    def stats(self) -> dict:
+        return {"size": len(self._urls), "hits": self.hits, "misses": self.misses}
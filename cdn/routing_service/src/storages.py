@@ -1,28 +1,70 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
 import aiohttp
 import backoff as backoff
 import boto3
 import botocore.exceptions
-import geocoder
-import requests
-from geopy.distance import distance
+import numpy as np
+from botocore.config import Config
 
+from src.geoip import GeoIPIndex
+from src.load import Scoreboard
+from src.routing import RoutingTable
 from src.schemas import Storage
-from src.settings import settings, logger
+from src.settings import logger, settings
+from src.signing import PresignedUrlCache
+from src.timing import stage
+
+# boto3 блокирующий, запросы к хранилищам выполняются в отдельных потоках,
+# чтобы не останавливать event loop
+s3_executor = ThreadPoolExecutor(max_workers=settings.s3_max_pool_connections, thread_name_prefix="s3")
+
+presigned_urls = PresignedUrlCache(
+    settings.presigned_url_cache_size, settings.presigned_url_expires, settings.presigned_url_reuse_fraction
+)
 
 
 class ObjectStorageBase:
 
-    def __init__(self, endpoint_url, access_key, secret_key, bucket):
+    def __init__(
+            self,
+            endpoint_url,
+            access_key,
+            secret_key,
+            bucket,
+            session: Optional[boto3.session.Session] = None,
+            config: Optional[Config] = None,
+    ):
         self.endpoint_url = endpoint_url
         self.access_key = access_key
         self.secret_key = secret_key
         self.bucket = bucket
-        self.s3 = boto3.client(
+        self.s3 = (session or boto3).client(
             's3',
             endpoint_url=self.endpoint_url,
             aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key
+            aws_secret_access_key=self.secret_key,
+            config=config,
         )
+        # состояние по результатам последних проверок
+        self.failures = 0
+        self.dead_until = 0.0
+
+    def is_alive(self) -> bool:
+        return time.monotonic() >= self.dead_until
+
+    def mark_probe(self, succeeded: bool):
+        """После storage_failures_threshold ошибок подряд хранилище пропускается storage_dead_cooldown секунд"""
+        if succeeded:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= settings.storage_failures_threshold:
+            self.dead_until = time.monotonic() + settings.storage_dead_cooldown
+            logger.warning("Storage %s is marked as dead", self.endpoint_url)
 
     def check_file(self, key):
         try:
@@ -32,53 +74,179 @@ class ObjectStorageBase:
             logger.info('Object does not exist')
             return
 
+    async def check_file_async(self, key):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(s3_executor, self.check_file, key)
+
     def get_link_file(self, key):
+        return presigned_urls.get(self.endpoint_url, key, lambda expires_in: self.sign_link_file(key, expires_in))
+
+    def sign_link_file(self, key, expires_in):
         url = self.s3.generate_presigned_url(
             'get_object',
             Params={
                 'Bucket': self.bucket,
                 'Key': key
             },
-            ExpiresIn=3600 * 24  # set expiration time for 24 hour
+            ExpiresIn=expires_in
         )
         return url
 
 
+class StorageClients:
+    """
+    S3 clients of all storages, created once per storage list.
+    Clients live as long as the storage list, so their keep-alive connection
+    pools are reused by all requests. Clients of storages that are still in
+    the list are taken over from the previous registry.
+    """
+
+    def __init__(self, storages: Iterable[Storage], previous: Optional["StorageClients"] = None):
+        self.session = previous.session if previous else boto3.session.Session()
+        self.config = Config(
+            max_pool_connections=settings.s3_max_pool_connections,
+            tcp_keepalive=True,
+            connect_timeout=settings.s3_connect_timeout,
+            read_timeout=settings.s3_read_timeout,
+            retries={"max_attempts": settings.s3_max_attempts},
+        )
+        reused = previous.clients if previous else {}
+        self.clients: dict[str, ObjectStorageBase] = {}
+        for storage in storages:
+            client = reused.get(storage.url)
+            if client is None or (client.access_key, client.secret_key) != (storage.access_key, storage.secret_key):
+                client = ObjectStorageBase(
+                    endpoint_url=storage.url,
+                    access_key=storage.access_key,
+                    secret_key=storage.secret_key,
+                    bucket=settings.bucket,
+                    session=self.session,
+                    config=self.config,
+                )
+            self.clients[storage.url] = client
+
+    def __getitem__(self, url: str) -> ObjectStorageBase:
+        return self.clients[url]
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+
 class StorageWorker:
-    cdn_storages = []
+    """
+    Storage list with its routing table and S3 clients.
+    The list is pulled from sync_service periodically; a new list, table and
+    clients are built aside and swapped in together, one build at a time.
+    With a scoreboard the table is also rebuilt when the load of the storages
+    changes. Requests arriving before the first list wait for one shared load.
+    """
+
+    def __init__(self, geoip: GeoIPIndex, scoreboard: Optional[Scoreboard] = None):
+        self.geoip = geoip
+        self.scoreboard = scoreboard
+        self.cdn_storages: list[Storage] = []
+        self.routing_table = self.make_routing_table(self.cdn_storages)
+        self.clients = StorageClients(self.cdn_storages)
+        self.loaded = False
+        self._build_lock = asyncio.Lock()
+        self._load_lock = asyncio.Lock()
+
+    def make_routing_table(self, storages: list[Storage]) -> RoutingTable:
+        penalties = self.scoreboard.penalties(storages) if self.scoreboard else None
+        return RoutingTable(
+            storages, self.geoip, settings.routing_candidates, settings.routing_prefix_cache_size, penalties
+        )
+
+    async def fetch_storages(self, session: aiohttp.ClientSession) -> list[Storage]:
+        """Живые хранилища из sync_service, без повторов"""
+        url = f"{settings.sync_service_url}/api/v1/storages"
+        async with session.get(url, params={"alive_for": settings.storage_heartbeat_timeout}) as response:
+            response.raise_for_status()
+            storages = await response.json()
+        unique_storages: dict[str, Storage] = {}
+        for storage in storages:
+            if storage["url"] in unique_storages:
+                continue
+            unique_storages[storage["url"]] = Storage(
+                id=storage.get("id"),
+                url=storage["url"],
+                ip=storage["ip_address"],
+                access_key=settings.storage_access_key,
+                secret_key=settings.storage_secret_key,
+                latlng=self.geoip.locate(storage["ip_address"]),
+            )
+        return list(unique_storages.values())
 
     @backoff.on_exception(backoff.expo, aiohttp.ClientError, max_tries=3)
-    async def create_storage_list(self):
+    async def create_storage_list(self, session: Optional[aiohttp.ClientSession] = None):
+        if session is None:
+            async with aiohttp.ClientSession(headers={"Authorization": settings.sync_service_token}) as session:
+                storages = await self.fetch_storages(session)
+        else:
+            storages = await self.fetch_storages(session)
+        # одна сборка за раз: boto3 сессия общая для всех StorageClients и не потокобезопасна
+        async with self._build_lock:
+            if storages != self.cdn_storages:
+                # таблица и клиенты строятся заново и подменяются вместе
+                routing_table = await asyncio.to_thread(self.make_routing_table(storages).build)
+                clients = await asyncio.to_thread(StorageClients, storages, self.clients)
+                self.cdn_storages, self.routing_table, self.clients = storages, routing_table, clients
+                logger.info("Storage list updated: %d storages", len(storages))
+        self.loaded = True
+
+    async def wait_loaded(self):
+        """Load the storage list once; concurrent callers wait for the same load"""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if not self.loaded:
+                await self.create_storage_list()
+
+    async def follow(self, interval: float):
+        async with aiohttp.ClientSession(headers={"Authorization": settings.sync_service_token}) as session:
+            while True:
+                try:
+                    await self.create_storage_list(session)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                    logger.warning("Can't update storage list: %s", err)
+                await asyncio.sleep(interval)
+
+    async def rebalance(self):
+        """Rebuild the routing table if penalties of the storages have changed"""
+        storages = self.cdn_storages
+        penalties = self.scoreboard.penalties(storages)
+        if np.allclose(penalties, self.routing_table.edges.penalties, rtol=0, atol=settings.load_rebuild_tolerance):
+            return
+        routing_table = await asyncio.to_thread(self.make_routing_table(storages).build)
+        # список мог обновиться, пока строилась таблица
+        if storages is self.cdn_storages:
+            self.routing_table = routing_table
+            logger.info("Routing table rebuilt, load penalties: %s", penalties.round().tolist())
+
+    async def follow_load(self, interval: float):
         async with aiohttp.ClientSession() as session:
-            async with session.get(f"{settings.sync_service_url}/get_storages") as response:
-                response.raise_for_status()
-                storages = await response.json()
-        for storage in storages:
-            self.cdn_storages.append(
-                Storage(
-                    url=storage["url"],
-                    ip=storage["ip_address"],
-                    access_key=settings.storage_access_key,
-                    secret_key=settings.storage_secret_key
-                ))
+            while True:
+                try:
+                    await self.scoreboard.scrape(session)
+                    await self.rebalance()
+                except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as err:
+                    logger.warning("Can't update storage load: %s", err)
+                await asyncio.sleep(interval)
 
     async def get_storages(self, ip_address) -> list[dict]:
-        user_geo = geocoder.ip(ip_address)
-        storages = []
-        if not self.cdn_storages:
-            return storages
-        for storage in self.cdn_storages:
-            dist = distance(geocoder.ip(storage.ip).latlng, user_geo.latlng).km
-            storages.append(
+        routing_table = self.routing_table
+        with stage("geoip"):
+            location = routing_table.geoip.lookup_location(ip_address)
+        with stage("ranking"):
+            storages = [
                 {
-                    "storage": ObjectStorageBase(
-                        endpoint_url=storage.url,
-                        access_key=storage.access_key,
-                        secret_key=storage.secret_key,
-                        bucket=settings.bucket
-                    ),
-                    "distance": dist
+                    "id": ranked.storage.id,
+                    "storage": self.clients[ranked.storage.url],
+                    "distance": ranked.distance,
+                    "cost": ranked.cost,
                 }
-            )
-        storages.sort(key=lambda x: x["distance"])
-        return storages
+                for ranked in routing_table.rank(ip_address, location)
+            ]
+            alive = [storage for storage in storages if storage["storage"].is_alive()]
+        # если недоступны все - пробуем все, иначе отказ гарантирован
+        return alive or storages
@@ -0,0 +1,45 @@
+"""
+Per-request timing of the media endpoint stages.
+
+Code of a stage is wrapped in `with stage("name")`; spent time is observed
+in the `routing_stage_seconds` histogram and added to the timings of the
+current request, which are returned in the `Server-Timing` header when
+ROUTING_SERVER_TIMING is on.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+
+from src.metrics import STAGE_SECONDS
+
+request_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spent = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(spent)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + spent
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+
+
+async def add_server_timing(request: Request, call_next):
+    timings: dict[str, float] = {}
+    request_timings.set(timings)
+    start = time.perf_counter()
+    response = await call_next(request)
+    timings["total"] = time.perf_counter() - start
+    response.headers["Server-Timing"] = server_timing(timings)
+    return response
@@ -0,0 +1,201 @@
+"""
+Batched recording of film requests to UGC.
+
+The media endpoint only puts a record into a bounded in-process queue; a
+background flusher collects records into batches (up to `batch_size`
+records or `flush_interval` seconds) and posts them to the bulk UGC endpoint
+over one shared session. When the queue is full or UGC doesn't answer,
+records are appended to the spill file (JSON lines) if it is configured and
+dropped otherwise; spilled records are sent again once the queue is drained.
+Every worker process spills to its own file (`spill_path` with the pid suffix),
+so processes never resend or truncate each other's records. On shutdown the
+records still queued are sent once more over the same session; only what
+that final send doesn't deliver is spilled or dropped.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+import aiohttp
+
+from src.settings import logger
+
+
+class UGCRecorder:
+    def __init__(
+        self,
+        url: str,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        timeout: float,
+        spill_path: Optional[str] = None,
+    ):
+        self.url = url
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.spill_path = spill_path
+        self.queue: Optional[asyncio.Queue] = None
+        self.sent = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        # пачка, которую flusher собирает или отправляет сейчас
+        self._pending: list[dict] = []
+
+    def start(self):
+        # очередь создается внутри работающего event loop
+        self.queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.queue is not None:
+            self._overflow(self._drain(self.queue.qsize()))
+
+    def record(self, film_id: str, user_id: str):
+        """Queue a film request, never waits"""
+        record = {"film_id": film_id, "user_id": user_id}
+        if self.queue is None:
+            self._overflow([record])
+            return
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._overflow([record])
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "sent": self.sent,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+        }
+
+    async def run(self):
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            try:
+                while True:
+                    try:
+                        batch = await self._next_batch()
+                        sent = await self._send(session, batch)
+                        self._pending = []
+                        if sent and self.queue.empty():
+                            await self._resend_spilled(session)
+                    except Exception:
+                        # flusher не должен останавливаться: иначе очередь заполнится и все записи пойдут мимо UGC
+                        logger.exception("UGC flusher failed")
+                        self._overflow(self._pending)
+                        self._pending = []
+            except asyncio.CancelledError:
+                await self._flush(session)
+                raise
+
+    async def _flush(self, session: aiohttp.ClientSession):
+        """Final send on shutdown; after the first failed batch the rest is spilled without waiting"""
+        records = self._pending + self._drain(self.queue.qsize())
+        self._pending = []
+        delivered = True
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            if delivered:
+                delivered = await self._send(session, batch)
+            else:
+                self._overflow(batch)
+
+    @property
+    def _spill_file(self) -> str:
+        return f"{self.spill_path}.{os.getpid()}"
+
+    async def _next_batch(self) -> list[dict]:
+        # записи, взятые из очереди, видны в _pending, если flusher остановят посреди сборки
+        batch = self._pending = [await self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            batch.extend(self._drain(self.batch_size - len(batch)))
+            timeout = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _drain(self, limit: int) -> list[dict]:
+        records = []
+        while len(records) < limit and not self.queue.empty():
+            records.append(self.queue.get_nowait())
+        return records
+
+    async def _send(self, session: aiohttp.ClientSession, batch: list[dict]) -> bool:
+        try:
+            async with session.post(self.url, json=batch) as response:
+                response.raise_for_status()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            logger.error("Can't send %d film requests to UGC service: %s", len(batch), err)
+            self._overflow(batch)
+            return False
+        self.sent += len(batch)
+        return True
+
+    async def _resend_spilled(self, session: aiohttp.ClientSession):
+        if not self.spill_path:
+            return
+        # файл переименовывается, чтобы новые записи при ошибке попали в новый файл;
+        # .sending, оставшийся после сбоя, отправляется первым
+        sending_path = f"{self._spill_file}.sending"
+        if not os.path.exists(sending_path):
+            if not os.path.exists(self._spill_file):
+                return
+            os.replace(self._spill_file, sending_path)
+        batch = []
+        with open(sending_path) as spill_file:
+            for line in spill_file:
+                record = self._parse_spilled(line)
+                if record is not None:
+                    batch.append(record)
+                if len(batch) >= self.batch_size:
+                    await self._send_spilled(session, batch)
+                    batch = []
+        await self._send_spilled(session, batch)
+        os.remove(sending_path)
+
+    async def _send_spilled(self, session: aiohttp.ClientSession, batch: list[dict]):
+        if batch:
+            self.spilled -= len(batch)
+            await self._send(session, batch)
+
+    def _parse_spilled(self, line: str) -> Optional[dict]:
+        if not line.strip():
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            logger.warning("Skipping corrupt line in UGC spill file %s: %r", self._spill_file, line[:100])
+            return None
+
+    def _overflow(self, records: list[dict]):
+        if not records:
+            return
+        if not self.spill_path:
+            self.dropped += len(records)
+            return
+        try:
+            with open(self._spill_file, "a") as spill_file:
+                spill_file.writelines(json.dumps(record) + "\n" for record in records)
+        except OSError as err:
+            logger.error("Can't spill film requests to %s: %s", self._spill_file, err)
+            self.dropped += len(records)
+            return
+        self.spilled += len(records)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# add routing_service root to sys.path, modules are imported as src.*
+service_path = Path(__file__).parent.parent
+if str(service_path) not in sys.path:
+    sys.path.insert(1, str(service_path))
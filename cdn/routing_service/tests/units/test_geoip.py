@@ -0,0 +1,54 @@
+import pytest
+
+from src.geoip import GeoIPIndex, load_geoip_index
+
+BLOCKS_CSV = """network,geoname_id,registered_country_geoname_id,represented_country_geoname_id,is_anonymous_proxy,\
+is_satellite_provider,postal_code,latitude,longitude,accuracy_radius
+5.8.0.0/19,524901,2017370,,0,0,,55.7522,37.6156,20
+5.8.32.0/21,498817,2017370,,0,0,,59.8944,30.2642,20
+5.8.40.0/24,524901,2017370,,0,0,,55.7522,37.6156,20
+8.8.8.0/24,6252001,6252001,,0,0,,37.751,-97.822,1000
+10.0.0.0/8,,,,0,0,,,,
+"""
+
+
+@pytest.fixture()
+def blocks_csv(tmp_path):
+    path = tmp_path / "blocks.csv"
+    path.write_text(BLOCKS_CSV)
+    return str(path)
+
+
+def test_locate_from_csv(blocks_csv):
+    index = GeoIPIndex.from_csv(blocks_csv)
+
+    assert len(index) == 4
+    assert index.locate("5.8.0.1") == (55.7522, 37.6156)
+    assert index.locate("5.8.39.255") == (59.8944, 30.2642)
+    assert index.locate("8.8.8.8") == (37.751, -97.822)
+    # диапазоны с одинаковыми координатами ссылаются на одну локацию
+    assert index.lookup_location("5.8.0.1") == index.lookup_location("5.8.40.1")
+
+
+@pytest.mark.parametrize("ip_address", ["1.1.1.1", "5.8.41.0", "10.1.2.3", "255.255.255.255", "::1", "not an ip"])
+def test_unknown_address(blocks_csv, ip_address):
+    index = GeoIPIndex.from_csv(blocks_csv)
+
+    assert index.locate(ip_address) is None
+
+
+def test_compiled_table(blocks_csv, tmp_path):
+    compiled = str(tmp_path / "geoip.bin")
+    GeoIPIndex.from_csv(blocks_csv).save(compiled)
+
+    index = load_geoip_index(compiled)
+
+    assert len(index) == 4
+    assert index.locate("5.8.33.10") == (59.8944, 30.2642)
+    assert index.locate("8.8.4.4") is None
+
+
+def test_not_configured():
+    index = load_geoip_index(None)
+
+    assert index.locate("8.8.8.8") is None
@@ -0,0 +1,78 @@
+import time
+from uuid import uuid4
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from src.jwt_config import JWT_ALGORITHM, JWT_SECRET, JWTBearer, TokenCache
+
+
+def make_token(expires_in: int = 3600) -> str:
+    now = int(time.time())
+    payload = {
+        "fresh": False,
+        "iat": now,
+        "jti": str(uuid4()),
+        "type": "access",
+        "sub": str(uuid4()),
+        "nbf": now,
+        "exp": now + expires_in,
+        "name": "user",
+        "roles": [],
+        "device_id": "tv",
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def test_token_verified_once(monkeypatch):
+    cache = TokenCache(max_size=10)
+    bearer = JWTBearer(cache=cache)
+    token = make_token()
+    decodes = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr("src.jwt_config.jwt.decode", counting_decode)
+
+    first = bearer.decode(token)
+    second = bearer.decode(token)
+
+    assert first is second
+    assert len(decodes) == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_expired_token_is_evicted(monkeypatch):
+    cache = TokenCache(max_size=10)
+    bearer = JWTBearer(cache=cache)
+    token = make_token(expires_in=60)
+    payload = bearer.decode(token)
+
+    monkeypatch.setattr("src.jwt_config.time.time", lambda: payload.exp)
+    assert cache.get(token) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_invalid_token_is_not_cached():
+    cache = TokenCache(max_size=10)
+    bearer = JWTBearer(cache=cache)
+
+    with pytest.raises(HTTPException):
+        bearer.decode(make_token() + "x")
+    assert cache.stats()["size"] == 0
+
+
+def test_bounded():
+    cache = TokenCache(max_size=2)
+    bearer = JWTBearer(cache=cache)
+    tokens = [make_token() for _ in range(3)]
+    for token in tokens:
+        bearer.decode(token)
+
+    assert cache.stats()["size"] == 2
+    assert cache.get(tokens[0]) is None
+    assert cache.get(tokens[2]) is not None
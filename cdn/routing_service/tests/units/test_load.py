@@ -0,0 +1,56 @@
+import pytest
+
+from src.edges import EdgeRegistry
+from src.load import EdgeLoad, LoadWeights, Scoreboard, load_penalties
+from src.schemas import Storage
+
+MOSCOW = (55.7522, 37.6156)
+SAINT_PETERSBURG = (59.8944, 30.2642)
+
+
+def make_storage(host: str, latlng) -> Storage:
+    return Storage(url=f"http://{host}:80", ip="172.18.0.10", access_key="key", secret_key="secret", latlng=latlng)
+
+
+def vector(values: dict) -> list:
+    return [{"metric": {"instance": instance}, "value": [1680000000, str(value)]} for instance, value in values.items()]
+
+
+def test_load_penalties():
+    weights = LoadWeights(requests=100, network=10, capacity=1000)
+    loads = [
+        EdgeLoad(free_bytes=25, total_bytes=100, requests_rate=200, network_rate=0),
+        EdgeLoad(free_bytes=100, total_bytes=100, requests_rate=50, network_rate=0),
+        None,
+    ]
+
+    assert load_penalties(loads, weights).tolist() == pytest.approx([100 + 750, 25, 0])
+
+
+def test_scoreboard_update():
+    scoreboard = Scoreboard("http://prometheus:9090", LoadWeights(requests=100), max_staleness=60)
+    scoreboard.update({"requests_rate": vector({"nginx-minio-0:80": 100, "nginx-minio-1": 25})})
+    storages = [make_storage("nginx-minio-0", MOSCOW), make_storage("nginx-minio-1", MOSCOW)]
+
+    assert scoreboard.load_of(storages[0]).requests_rate == 100
+    assert scoreboard.penalties(storages).tolist() == pytest.approx([100, 25])
+
+
+def test_stale_scoreboard():
+    scoreboard = Scoreboard("http://prometheus:9090", LoadWeights(requests=100), max_staleness=60)
+    scoreboard.update({"requests_rate": vector({"nginx-minio-0": 100})})
+    scoreboard.updated_at -= 61
+
+    assert scoreboard.penalties([make_storage("nginx-minio-0", MOSCOW)]).tolist() == [0]
+
+
+def test_loaded_edge_is_ranked_farther():
+    storages = [make_storage("nginx-minio-0", MOSCOW), make_storage("nginx-minio-1", SAINT_PETERSBURG)]
+
+    order, distances = EdgeRegistry(storages).nearest([MOSCOW[0]], [MOSCOW[1]], k=2)
+    assert order[0].tolist() == [0, 1]
+
+    order, distances = EdgeRegistry(storages, penalties=[1000, 0]).nearest([MOSCOW[0]], [MOSCOW[1]], k=2)
+    assert order[0].tolist() == [1, 0]
+    # возвращается расстояние, а не стоимость
+    assert distances[0].tolist() == pytest.approx([635, 0], abs=5)
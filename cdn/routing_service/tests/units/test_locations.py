@@ -0,0 +1,41 @@
+from src.locations import FilmLocations
+
+FILM_1 = "3c1f4e7e-3375-4f11-a3f9-e735d3f5ae8e"
+FILM_2 = "507447e5-1d3a-4e1e-b16a-3868dbc6cf90"
+
+
+def test_not_loaded():
+    locations = FilmLocations(max_staleness=60)
+
+    assert locations.storages_of(FILM_1) is None
+
+
+def test_load_and_apply():
+    locations = FilmLocations(max_staleness=60)
+    locations.load({"last_event_id": 10, "films": {FILM_1: ["master", "edge-1"]}})
+
+    assert locations.storages_of(FILM_1) == {"master", "edge-1"}
+    assert locations.storages_of(FILM_2) is None
+
+    locations.apply(
+        {
+            "last_event_id": 12,
+            "events": [
+                {"id": 11, "film_id": FILM_1, "s3storage_id": "edge-1", "action": "REMOVE"},
+                {"id": 12, "film_id": FILM_2, "s3storage_id": "edge-2", "action": "ADD"},
+            ],
+            "has_more": False,
+        }
+    )
+
+    assert locations.last_event_id == 12
+    assert locations.storages_of(FILM_1) == {"master"}
+    assert locations.storages_of(FILM_2) == {"edge-2"}
+
+
+def test_stale():
+    locations = FilmLocations(max_staleness=0)
+    locations.load({"last_event_id": 1, "films": {FILM_1: ["master"]}})
+    locations.updated_at -= 1
+
+    assert locations.storages_of(FILM_1) is None
@@ -0,0 +1,76 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src import metrics
+from src.api.v1 import media
+from src.jwt_config import get_mock_token, jwt_bearer
+from src.timing import add_server_timing
+
+FILM = "3c1f4e7e-3375-4f11-a3f9-e735d3f5ae8e"
+URL = f"http://edge-1:9000/movies/{FILM}?X-Amz-Signature=1"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def resolve_media_url(request, obj_name):
+        return URL
+
+    recorded = []
+    monkeypatch.setattr(media, "resolve_media_url", resolve_media_url)
+    monkeypatch.setattr(media.ugc_recorder, "record", lambda film_id, user_id: recorded.append(film_id))
+    app = FastAPI()
+    app.include_router(media.router)
+    app.dependency_overrides[jwt_bearer] = get_mock_token
+    app.middleware("http")(add_server_timing)
+    client = TestClient(app)
+    client.recorded = recorded
+    return client
+
+
+def test_json(client):
+    response = client.get(f"/media/get_media/{FILM}")
+
+    assert response.status_code == 200
+    assert response.json() == {"url": URL}
+    assert client.recorded == [FILM]
+
+
+def test_redirect(client):
+    response = client.get(f"/media/get_media/{FILM}", params={"redirect": True}, follow_redirects=False)
+
+    assert response.status_code == 302
+    assert response.headers["location"] == URL
+
+
+def test_redirect_by_default(client, monkeypatch):
+    monkeypatch.setattr(media.settings, "media_redirect", True)
+
+    assert client.get(f"/media/get_media/{FILM}", follow_redirects=False).status_code == 302
+    assert client.get(f"/media/get_media/{FILM}", params={"redirect": False}).json() == {"url": URL}
+
+
+def test_head(client):
+    response = client.head(f"/media/get_media/{FILM}", follow_redirects=False)
+
+    assert response.status_code == 302
+    assert response.headers["location"] == URL
+    assert response.content == b""
+    assert client.recorded == []
+
+
+def test_server_timing(client):
+    response = client.get(f"/media/get_media/{FILM}")
+
+    metrics = [metric.split(";")[0] for metric in response.headers["server-timing"].split(", ")]
+    assert metrics == ["ugc", "total"]
+
+
+def test_metrics(client):
+    client.get(f"/media/get_media/{FILM}")
+    client.app.include_router(metrics.router)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'routing_stage_seconds_count{stage="ugc"}' in response.text
@@ -0,0 +1,58 @@
+from uuid import NAMESPACE_URL, uuid5
+
+import pytest
+
+from src.placement import Placement, rendezvous_order
+
+FILMS = [str(uuid5(NAMESPACE_URL, str(number))) for number in range(3000)]
+
+
+def preferred(film_id: str, nodes: list[str]) -> str:
+    return rendezvous_order(film_id, nodes)[0]
+
+
+def make_info(node: str, distance: float, penalty: float = 0) -> dict:
+    return {"id": node, "storage": None, "distance": distance, "cost": distance + penalty}
+
+
+def test_even_shares():
+    shares = Placement(region_radius=300).shares(["edge-1", "edge-2", "edge-3"], FILMS)
+
+    assert all(share == pytest.approx(1 / 3, abs=0.05) for share in shares.values())
+
+
+def test_adding_node_moves_its_share_only():
+    nodes = [f"edge-{number}" for number in range(4)]
+    before = {film_id: preferred(film_id, nodes) for film_id in FILMS}
+    after = {film_id: preferred(film_id, nodes + ["edge-4"]) for film_id in FILMS}
+
+    moved = [film_id for film_id in FILMS if before[film_id] != after[film_id]]
+    assert all(after[film_id] == "edge-4" for film_id in moved)
+    assert len(moved) / len(FILMS) == pytest.approx(1 / 5, abs=0.05)
+
+
+def test_order_within_region():
+    placement = Placement(region_radius=100)
+    storages = [make_info("moscow-1", 10), make_info("moscow-2", 50), make_info("berlin", 1600)]
+
+    orders = {tuple(info["id"] for info in placement.order(film_id, storages)) for film_id in FILMS[:100]}
+
+    assert orders == {("moscow-1", "moscow-2", "berlin"), ("moscow-2", "moscow-1", "berlin")}
+
+
+def test_unlocated_client():
+    placement = Placement(region_radius=100)
+    storages = [make_info(f"edge-{number}", float("inf")) for number in range(3)]
+
+    assert placement.region_size(storages) == 0
+    assert placement.region_size([]) == 0
+    assert all(placement.order(film_id, storages) == storages for film_id in FILMS[:100])
+
+
+def test_penalised_nearest_storage_is_not_preferred():
+    placement = Placement(region_radius=100)
+    # moscow-1 ближе, но нагружен: ранжирование по стоимости поставило его после moscow-2
+    storages = [make_info("moscow-2", 50), make_info("moscow-1", 10, penalty=500), make_info("berlin", 1600)]
+
+    assert placement.region_size(storages) == 1
+    assert all(placement.order(film_id, storages)[0]["id"] == "moscow-2" for film_id in FILMS[:100])
@@ -0,0 +1,77 @@
+import asyncio
+
+from src.probe import probe_storages
+
+
+class FakeStorage:
+    def __init__(self, name: str, has_file: bool, latency: float):
+        self.endpoint_url = name
+        self.has_file = has_file
+        self.latency = latency
+        self.probed = False
+        self.failures = 0
+
+    def mark_probe(self, succeeded: bool):
+        self.failures = 0 if succeeded else self.failures + 1
+
+    async def check_file_async(self, key):
+        self.probed = True
+        await asyncio.sleep(self.latency)
+        return {"ContentLength": 1} if self.has_file else None
+
+
+class BrokenStorage(FakeStorage):
+    async def check_file_async(self, key):
+        raise ConnectionError("storage is down")
+
+
+def probe(storages, **kwargs):
+    return asyncio.run(probe_storages(storages, "film", **kwargs))
+
+
+def test_nearest_has_file():
+    storages = [FakeStorage("near", True, 0.01), FakeStorage("far", True, 0.01)]
+
+    assert probe(storages, fanout=1, delay=None) is storages[0]
+    assert not storages[1].probed
+
+
+def test_sequential_fallback():
+    storages = [FakeStorage("near", False, 0.01), BrokenStorage("broken", True, 0), FakeStorage("far", True, 0.01)]
+
+    assert probe(storages, fanout=1, delay=None) is storages[2]
+    assert storages[1].failures == 1
+
+
+def test_not_found():
+    storages = [FakeStorage("near", False, 0.01), FakeStorage("far", False, 0.01)]
+
+    assert probe(storages, fanout=2, delay=0.001) is None
+    assert probe([], fanout=2, delay=0.001) is None
+
+
+def test_hedged_probe_waits_for_nearest():
+    """Дальнее хранилище ответило раньше, но выбирается ближайшее с файлом"""
+    storages = [FakeStorage("near", True, 0.1), FakeStorage("far", True, 0.01)]
+
+    assert probe(storages, fanout=1, delay=0.01) is storages[0]
+    assert storages[1].probed
+
+
+def test_hedged_probe_skips_missing():
+    storages = [
+        FakeStorage("near", False, 0.05),
+        FakeStorage("middle", True, 0.01),
+        FakeStorage("far", True, 1),
+    ]
+
+    async def timed_probe():
+        start = asyncio.get_running_loop().time()
+        result = await probe_storages(storages, "film", fanout=3, delay=None)
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(timed_probe())
+
+    # не ждем самое дальнее хранилище
+    assert result is storages[1]
+    assert elapsed < 0.5
@@ -0,0 +1,101 @@
+import math
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.edges import EdgeRegistry
+from src.geoip import GeoIPIndex
+from src.routing import RoutingTable
+from src.schemas import Storage
+
+BLOCKS_CSV = """network,geoname_id,latitude,longitude
+5.8.0.0/19,524901,55.7522,37.6156
+5.8.32.0/21,498817,59.8944,30.2642
+2.56.0.0/16,2950159,52.5244,13.4105
+"""
+
+MOSCOW = (55.7522, 37.6156)
+SAINT_PETERSBURG = (59.8944, 30.2642)
+BERLIN = (52.5244, 13.4105)
+
+
+def lookups(result: str) -> float:
+    return REGISTRY.get_sample_value("routing_table_lookups_total", {"result": result}) or 0.0
+
+
+def make_storage(ip: str, latlng) -> Storage:
+    return Storage(url=f"http://{ip}:9000", ip=ip, access_key="key", secret_key="secret", latlng=latlng)
+
+
+@pytest.fixture()
+def geoip(tmp_path):
+    path = tmp_path / "blocks.csv"
+    path.write_text(BLOCKS_CSV)
+    return GeoIPIndex.from_csv(str(path))
+
+
+@pytest.fixture()
+def storages():
+    return [
+        make_storage("172.18.0.10", BERLIN),
+        make_storage("172.18.0.11", MOSCOW),
+        make_storage("172.18.0.12", SAINT_PETERSBURG),
+        make_storage("10.0.0.5", None),
+    ]
+
+
+def test_edge_distances(storages):
+    edges = EdgeRegistry(storages)
+
+    distances = edges.distances([MOSCOW[0], BERLIN[0]], [MOSCOW[1], BERLIN[1]])
+
+    assert distances.shape == (2, 4)
+    assert distances[0, 1] == pytest.approx(0)
+    assert distances[0, 2] == pytest.approx(635, abs=5)
+    assert distances[1, 0] == pytest.approx(0)
+    assert distances[1, 3] == math.inf
+
+
+def test_edge_nearest(storages):
+    edges = EdgeRegistry(storages * 50)
+
+    order, distances = edges.nearest([SAINT_PETERSBURG[0]], [SAINT_PETERSBURG[1]], k=3)
+
+    assert order.shape == (1, 3)
+    assert all(edges.storages[index].latlng == SAINT_PETERSBURG for index in order[0])
+    assert list(distances[0]) == sorted(distances[0])
+
+
+def test_rank_by_location(geoip, storages):
+    table = RoutingTable(storages, geoip, candidates=10, lru_size=10).build()
+    hits = lookups("hit")
+
+    ranking = table.lookup("5.8.0.1")
+
+    assert [ranked.storage.ip for ranked in ranking] == ["172.18.0.11", "172.18.0.12", "172.18.0.10", "10.0.0.5"]
+    assert ranking[0].distance == 0
+    assert ranking[-1].distance == math.inf
+    assert table.lookup("2.56.1.1")[0].storage.ip == "172.18.0.10"
+    assert lookups("hit") - hits == 2
+
+
+def test_candidates_limit(geoip, storages):
+    table = RoutingTable(storages, geoip, candidates=2, lru_size=10).build()
+
+    assert [ranked.storage.ip for ranked in table.lookup("5.8.32.1")] == ["172.18.0.12", "172.18.0.11"]
+
+
+def test_rank_by_network(geoip, storages):
+    table = RoutingTable(storages, geoip, candidates=10, lru_size=2).build()
+    hits, misses = lookups("hit"), lookups("miss")
+
+    assert table.lookup("10.0.1.1")[0].storage.ip == "10.0.0.5"
+    assert table.lookup("172.18.0.200")[0].storage.ip.startswith("172.18.0.")
+    assert table.lookup("10.0.1.2")[0].storage.ip == "10.0.0.5"
+    assert table.stats() == {"storages": 4, "locations": 3, "prefixes": 2}
+    assert (lookups("hit") - hits, lookups("miss") - misses) == (1, 2)
+
+    # вытесняется самый давно использованный префикс
+    table.lookup("192.168.1.1")
+    table.lookup("172.18.0.201")
+    assert lookups("miss") - misses == 4
@@ -0,0 +1,56 @@
+from prometheus_client import REGISTRY
+
+from src.signing import PresignedUrlCache
+
+
+class Signer:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, expires_in: int) -> str:
+        self.count += 1
+        return f"url_{self.count}?expires={expires_in}"
+
+
+def exported(result: str) -> float:
+    return REGISTRY.get_sample_value("routing_presigned_url_cache_total", {"result": result}) or 0.0
+
+
+def test_reuse():
+    cache = PresignedUrlCache(max_size=10, expires_in=100, reuse_fraction=0.5)
+    sign = Signer()
+    hits, misses = exported("hit"), exported("miss")
+
+    assert cache.get("edge-1", "film", sign) == "url_1?expires=100"
+    assert cache.get("edge-1", "film", sign) == "url_1?expires=100"
+    assert cache.get("edge-2", "film", sign) == "url_2?expires=100"
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 2}
+    assert (exported("hit") - hits, exported("miss") - misses) == (1, 2)
+
+
+def test_expired(monkeypatch):
+    cache = PresignedUrlCache(max_size=10, expires_in=100, reuse_fraction=0.5)
+    sign = Signer()
+    now = 1000.0
+    monkeypatch.setattr("src.signing.time.time", lambda: now)
+
+    cache.get("edge-1", "film", sign)
+    now += 49
+    assert cache.get("edge-1", "film", sign) == "url_1?expires=100"
+    now += 2
+    assert cache.get("edge-1", "film", sign) == "url_2?expires=100"
+
+
+def test_bounded():
+    cache = PresignedUrlCache(max_size=2, expires_in=100, reuse_fraction=0.5)
+    sign = Signer()
+
+    cache.get("edge-1", "film_1", sign)
+    cache.get("edge-1", "film_2", sign)
+    cache.get("edge-1", "film_1", sign)
+    cache.get("edge-1", "film_3", sign)
+
+    assert cache.stats()["size"] == 2
+    # film_2 использовался давнее всех и был вытеснен
+    assert cache.get("edge-1", "film_1", sign) == "url_1?expires=100"
+    assert cache.get("edge-1", "film_2", sign) == "url_4?expires=100"
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+
+import aiohttp
+import botocore.exceptions
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.geoip import GeoIPIndex
+from src.schemas import Storage
+from src.settings import settings
+from src.storages import ObjectStorageBase, StorageClients, StorageWorker
+
+BLOCKS_CSV = """network,geoname_id,latitude,longitude
+5.8.0.0/19,524901,55.7522,37.6156
+"""
+
+
+class BlockingS3:
+    """Stand-in for S3: HEAD blocks its thread until release is set"""
+
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.release = threading.Event()
+        self.threads = []
+
+    def head_object(self, Bucket, Key):
+        self.threads.append(threading.current_thread().name)
+        # в потоке event loop ожидание заблокировало бы loop и release бы не пришел
+        if not self.release.wait(timeout=5):
+            raise TimeoutError("HEAD is blocking the event loop")
+        if Key not in self.keys:
+            raise botocore.exceptions.ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": 1}
+
+
+def make_storage(keys) -> ObjectStorageBase:
+    storage = ObjectStorageBase("http://localhost:9000", "key", "secret", "movies")
+    storage.s3 = BlockingS3(keys)
+    return storage
+
+
+async def run_blocked_checks(storage: ObjectStorageBase):
+    checks = asyncio.gather(storage.check_file_async("film_0"), storage.check_file_async("film_1"))
+    # оба HEAD запроса ждут одновременно, а event loop продолжает работать
+    while len(storage.s3.threads) < 2:
+        await asyncio.sleep(0.001)
+    storage.s3.release.set()
+    return await checks
+
+
+def test_check_file_async():
+    storage = make_storage({"film_0"})
+    storage.s3.release.set()
+
+    assert asyncio.run(storage.check_file_async("film_0"))
+    assert asyncio.run(storage.check_file_async("film_1")) is None
+
+
+def test_check_file_async_runs_in_executor():
+    storage = make_storage({"film_0"})
+
+    found, missing = asyncio.run(run_blocked_checks(storage))
+
+    assert found and missing is None
+    assert all(name.startswith("s3") for name in storage.s3.threads)
+
+
+def test_dead_storage(monkeypatch):
+    monkeypatch.setattr(settings, "storage_failures_threshold", 2)
+    monkeypatch.setattr(settings, "storage_dead_cooldown", 30)
+    storage = make_storage(set())
+
+    storage.mark_probe(succeeded=False)
+    assert storage.is_alive()
+    storage.mark_probe(succeeded=False)
+    assert not storage.is_alive()
+
+    storage.dead_until -= 30
+    assert storage.is_alive()
+    storage.mark_probe(succeeded=True)
+    storage.mark_probe(succeeded=False)
+    assert storage.is_alive()
+
+
+def test_storage_clients_are_reused():
+    def make(number: int, secret_key: str = "secret") -> Storage:
+        return Storage(url=f"http://edge-{number}:9000", ip="5.8.0.10", access_key="key", secret_key=secret_key)
+
+    clients = StorageClients([make(0), make(1), make(2)])
+    rebuilt = StorageClients([make(0), make(1, secret_key="rotated"), make(3)], clients)
+
+    assert rebuilt["http://edge-0:9000"] is clients["http://edge-0:9000"]
+    assert rebuilt.session is clients.session
+    # новые ключи - новый клиент
+    assert rebuilt["http://edge-1:9000"] is not clients["http://edge-1:9000"]
+    assert rebuilt["http://edge-1:9000"].secret_key == "rotated"
+    assert rebuilt["http://edge-3:9000"].endpoint_url == "http://edge-3:9000"
+    # удаленное хранилище не остается в реестре
+    assert "http://edge-2:9000" not in rebuilt.clients
+    assert len(rebuilt) == 3
+
+
+def sync_storage(number: int) -> dict:
+    return {"id": f"edge-{number}", "url": f"http://edge-{number}:9000", "ip_address": "5.8.0.10"}
+
+
+async def start_sync(storages: list[dict]):
+    """sync_service stand-in: the list can be changed between requests"""
+    requests = []
+
+    async def read_storages(request: web.Request) -> web.Response:
+        requests.append(dict(request.query))
+        await asyncio.sleep(0.01)
+        return web.json_response(storages)
+
+    app = web.Application()
+    app.router.add_get("/api/v1/storages", read_storages)
+    server = TestServer(app)
+    await server.start_server()
+    return server, requests
+
+
+@pytest.fixture()
+def worker(tmp_path):
+    path = tmp_path / "blocks.csv"
+    path.write_text(BLOCKS_CSV)
+    return StorageWorker(GeoIPIndex.from_csv(str(path)))
+
+
+def with_sync(storages: list[dict], monkeypatch, scenario):
+    async def run():
+        server, requests = await start_sync(storages)
+        monkeypatch.setattr(settings, "sync_service_url", str(server.make_url("")).rstrip("/"))
+        try:
+            return await scenario(requests)
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_fetch_storages_drops_duplicates(worker, monkeypatch):
+    storages = [sync_storage(0), sync_storage(1), {**sync_storage(0), "id": "edge-0-copy"}]
+
+    async def scenario(requests):
+        async with aiohttp.ClientSession() as session:
+            return await worker.fetch_storages(session), requests
+
+    fetched, requests = with_sync(storages, monkeypatch, scenario)
+
+    assert [storage.id for storage in fetched] == ["edge-0", "edge-1"]
+    assert fetched[0].latlng == pytest.approx((55.7522, 37.6156))
+    assert fetched[0].access_key == settings.storage_access_key
+    assert requests == [{"alive_for": str(settings.storage_heartbeat_timeout)}]
+
+
+def test_create_storage_list_swaps_on_change_only(worker, monkeypatch):
+    storages = [sync_storage(0)]
+
+    async def scenario(requests):
+        await worker.create_storage_list()
+        table, clients = worker.routing_table, worker.clients
+        await worker.create_storage_list()
+        unchanged = worker.routing_table is table and worker.clients is clients
+
+        storages.append(sync_storage(1))
+        await worker.create_storage_list()
+        return table, clients, unchanged
+
+    table, clients, unchanged = with_sync(storages, monkeypatch, scenario)
+
+    assert unchanged
+    assert worker.routing_table is not table and worker.clients is not clients
+    assert [storage.id for storage in worker.cdn_storages] == ["edge-0", "edge-1"]
+    assert worker.clients["http://edge-0:9000"] is clients["http://edge-0:9000"]
+    assert len(worker.routing_table.lookup("5.8.0.1")) == 2
+
+
+def test_empty_storage_list(worker, monkeypatch):
+    async def scenario(requests):
+        await worker.wait_loaded()
+        # клиент с известным GeoIP местоположением, а таблица без строк
+        return await worker.get_storages("5.8.0.1")
+
+    assert with_sync([], monkeypatch, scenario) == []
+    assert worker.loaded
+
+
+def test_first_load_is_shared(worker, monkeypatch):
+    async def scenario(requests):
+        await asyncio.gather(*(worker.wait_loaded() for _ in range(20)))
+        await worker.wait_loaded()
+        return requests
+
+    assert len(with_sync([sync_storage(0)], monkeypatch, scenario)) == 1
+    assert len(worker.clients) == 1
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.ugc import UGCRecorder
+
+FILM = "3c1f4e7e-3375-4f11-a3f9-e735d3f5ae8e"
+
+
+async def start_ugc(status: int = 204):
+    batches = []
+
+    async def record_films(request: web.Request) -> web.Response:
+        batches.append(await request.json())
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_post("/ugc/v1/events/record_films", record_films)
+    server = TestServer(app)
+    await server.start_server()
+    return server, batches
+
+
+def make_recorder(server: TestServer, **kwargs) -> UGCRecorder:
+    options = {"queue_size": 100, "batch_size": 10, "flush_interval": 0.05, "timeout": 1, **kwargs}
+    return UGCRecorder(str(server.make_url("/ugc/v1/events/record_films")), **options)
+
+
+async def wait_for(condition, timeout: float = 2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_records_are_sent_in_batches():
+    async def scenario():
+        server, batches = await start_ugc()
+        recorder = make_recorder(server)
+        recorder.start()
+        for user in range(25):
+            recorder.record(FILM, str(user))
+        await wait_for(lambda: recorder.sent == 25)
+        await recorder.stop()
+        await server.close()
+        return recorder, batches
+
+    recorder, batches = asyncio.run(scenario())
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert batches[0][0] == {"film_id": FILM, "user_id": "0"}
+    assert recorder.stats() == {"queued": 0, "sent": 25, "spilled": 0, "dropped": 0}
+
+
+def test_overflow_is_dropped():
+    async def scenario():
+        server, _ = await start_ugc()
+        recorder = make_recorder(server, queue_size=2)
+        recorder.start()
+        # flusher еще не запускался - очередь не разгружается
+        for user in range(5):
+            recorder.record(FILM, str(user))
+        dropped = recorder.dropped
+        await recorder.stop()
+        await server.close()
+        return dropped
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_failed_batches_are_spilled_and_resent(tmp_path):
+    spill_path = str(tmp_path / "ugc.jsonl")
+
+    async def scenario():
+        failing, _ = await start_ugc(status=503)
+        recorder = make_recorder(failing, spill_path=spill_path)
+        recorder.start()
+        for user in range(3):
+            recorder.record(FILM, str(user))
+        await wait_for(lambda: recorder.spilled == 3)
+        await recorder.stop()
+        await failing.close()
+        spilled = recorder.spilled
+
+        server, batches = await start_ugc()
+        recorder = make_recorder(server, spill_path=spill_path)
+        recorder.start()
+        recorder.record(FILM, "3")
+        await wait_for(lambda: recorder.sent == 4)
+        await recorder.stop()
+        await server.close()
+        return spilled, batches
+
+    spilled, batches = asyncio.run(scenario())
+
+    assert spilled == 3
+    assert sorted(record["user_id"] for batch in batches for record in batch) == ["0", "1", "2", "3"]
+
+
+def test_spill_file_is_per_process_and_corrupt_lines_are_skipped(tmp_path):
+    spill_path = str(tmp_path / "ugc.jsonl")
+    with open(f"{spill_path}.{os.getpid()}", "w") as spill_file:
+        spill_file.write('{"film_id": "%s", "user_id": "0"}\n{"film_id": \n' % FILM)
+        spill_file.writelines(json.dumps({"film_id": FILM, "user_id": str(user)}) + "\n" for user in range(1, 5))
+    # файл другого процесса не трогаем
+    with open(f"{spill_path}.1", "w") as spill_file:
+        spill_file.write(json.dumps({"film_id": FILM, "user_id": "other"}) + "\n")
+
+    async def scenario():
+        server, batches = await start_ugc()
+        recorder = make_recorder(server, spill_path=spill_path, batch_size=2)
+        recorder.start()
+        recorder.record(FILM, "5")
+        await wait_for(lambda: recorder.sent == 6)
+        await recorder.stop()
+        await server.close()
+        return batches
+
+    batches = asyncio.run(scenario())
+
+    assert [len(batch) for batch in batches] == [1, 2, 2, 1]
+    assert sorted(record["user_id"] for batch in batches for record in batch) == ["0", "1", "2", "3", "4", "5"]
+    assert not os.path.exists(f"{spill_path}.{os.getpid()}.sending")
+    assert os.path.exists(f"{spill_path}.1")
+
+
+def test_flusher_survives_unexpected_errors(monkeypatch):
+    async def scenario():
+        server, batches = await start_ugc()
+        recorder = make_recorder(server)
+        send = recorder._send
+        calls = []
+
+        async def flaky_send(session, batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return await send(session, batch)
+
+        monkeypatch.setattr(recorder, "_send", flaky_send)
+        recorder.start()
+        recorder.record(FILM, "0")
+        await wait_for(lambda: len(calls) == 1)
+        recorder.record(FILM, "1")
+        await wait_for(lambda: recorder.sent == 1)
+        await recorder.stop()
+        await server.close()
+        return batches
+
+    assert asyncio.run(scenario()) == [[{"film_id": FILM, "user_id": "1"}]]
+
+
+def test_queued_records_are_sent_on_stop():
+    async def scenario():
+        server, batches = await start_ugc()
+        # пачки отправляются только по размеру, оставшиеся 3 записи ждут в очереди
+        recorder = make_recorder(server, batch_size=5, flush_interval=60)
+        recorder.start()
+        for user in range(8):
+            recorder.record(FILM, str(user))
+        await wait_for(lambda: recorder.sent == 5)
+        await recorder.stop()
+        await server.close()
+        return recorder, batches
+
+    recorder, batches = asyncio.run(scenario())
+
+    assert [len(batch) for batch in batches] == [5, 3]
+    assert recorder.stats() == {"queued": 0, "sent": 8, "spilled": 0, "dropped": 0}
+
+
+def test_undelivered_records_are_dropped_on_stop():
+    async def scenario():
+        failing, _ = await start_ugc(status=503)
+        recorder = make_recorder(failing, batch_size=2, flush_interval=60)
+        recorder.start()
+        await asyncio.sleep(0)
+        for user in range(5):
+            recorder.record(FILM, str(user))
+        await wait_for(lambda: recorder.dropped == 4)
+        await recorder.stop()
+        await failing.close()
+        return recorder
+
+    assert asyncio.run(scenario()).stats() == {"queued": 0, "sent": 0, "spilled": 0, "dropped": 5}
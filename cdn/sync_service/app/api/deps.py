@@ -1,8 +1,27 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import async_session
+from app.schemas import Event
+from app.services.packed_events import EventFormatError, UnsupportedEventFormat, parse_event
 
 
 async def get_session() -> AsyncSession:
     async with async_session() as session:
         yield session
+
+
+async def get_event(request: Request) -> Event:
+    """Событие хранилища в JSON или упакованном формате, формат - по Content-Type"""
+    try:
+        return parse_event(
+            await request.body(),
+            request.headers.get("content-type", ""),
+            request.headers.get("content-encoding", ""),
+        )
+    except UnsupportedEventFormat as err:
+        raise HTTPException(status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, detail=str(err))
+    except EventFormatError as err:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(err))
@@ -2,11 +2,12 @@ from http import HTTPStatus
 from urllib.parse import urlparse
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 from app.api import deps
+from app.services.film_location_service import film_location_service
 from app.services.film_service import film_service
 from app.services.s3storage_service import s3storage_service
 
@@ -42,6 +43,29 @@ async def read_film_storages(film_id: UUID, session: AsyncSession = Depends(deps
     return s3storages
 
 
+@router.get("/locations", response_model=schemas.FilmLocations)
+async def read_film_locations(session: AsyncSession = Depends(deps.get_session)):
+    # номер последнего события и расположение фильмов - из одного снимка базы
+    await film_location_service.begin_snapshot(session)
+    last_event_id = await film_location_service.read_last_event_id(session)
+    films = await film_location_service.read_locations(session)
+    return schemas.FilmLocations(last_event_id=last_event_id, films=films)
+
+
+@router.get("/locations/events", response_model=schemas.FilmLocationEvents)
+async def read_film_location_events(
+    since: int = 0,
+    limit: int = Query(1000, gt=0, le=10000),
+    session: AsyncSession = Depends(deps.get_session),
+):
+    events = await film_location_service.read_events(session, since, limit)
+    return schemas.FilmLocationEvents(
+        last_event_id=events[-1].id if events else since,
+        events=[schemas.FilmLocationEvent.from_orm(event) for event in events],
+        has_more=len(events) == limit,
+    )
+
+
 @router.post("", response_model=schemas.Film, status_code=HTTPStatus.CREATED)
 async def create_film(
     film_in: schemas.FilmCreate,
@@ -12,7 +12,10 @@ router = APIRouter()
 
 
 @router.get("", response_model=list[schemas.S3Storage])
-async def read_multiple_storages(session: AsyncSession = Depends(deps.get_session)):
+async def read_multiple_storages(alive_for: int | None = None, session: AsyncSession = Depends(deps.get_session)):
+    """alive_for - вернуть только хранилища, от которых был heartbeat за последние alive_for секунд"""
+    if alive_for is not None:
+        return await s3storage_service.read_alive(session, alive_for)
     s3storages = await s3storage_service.read_multi(session)
     return s3storages
 
@@ -59,7 +62,11 @@ async def delete_storage(
 
 
 @router.post("/{storage_id}/events")
-async def process_event(storage_id: str, event: schemas.Event, session: AsyncSession = Depends(deps.get_session)):
+async def process_event(
+    storage_id: str,
+    event: schemas.Event = Depends(deps.get_event),
+    session: AsyncSession = Depends(deps.get_session),
+):
     s3storage = await s3storage_service.read(session, id=storage_id)
     if not s3storage:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="S3 Storage not found")
@@ -71,8 +78,9 @@ async def process_event(storage_id: str, event: schemas.Event, session: AsyncSes
                 raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Film not found")
 
 
-@router.post("/storages/{storage_id}/heartbeat")
-async def storage_heartbeat(storage_id: str):
-    # TODO добавить отслеживание состояния хранилищ
-    # выдавать только живые хранилища
-    pass
+@router.post("/{storage_id}/heartbeat")
+async def storage_heartbeat(storage_id: str, session: AsyncSession = Depends(deps.get_session)):
+    s3storage = await s3storage_service.read(session, id=storage_id)
+    if not s3storage:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="S3 Storage not found")
+    await s3storage_service.update_heartbeat(session, s3storage)
@@ -10,7 +10,7 @@ from app.core.config import settings
 from app.db.base_class import Base
 
 # нужно импортировать модели, чтобы алхимия знала о них
-from app.models.models import Film, S3Storage, films_s3storages  # noqa
+from app.models.models import Film, FilmStorageEvent, S3Storage, films_s3storages  # noqa
 
 engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=settings.DEBUG)
 async_session = async_sessionmaker(bind=engine, expire_on_commit=False)
@@ -1,4 +1,6 @@
-from sqlalchemy import BigInteger, Column, ForeignKey, String, Table, Uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Identity, String, Table, Uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base_class import Base
@@ -10,6 +12,8 @@ class S3Storage(Base):
     url: Mapped[str] = mapped_column(String(255), unique=True)
     ip_address: Mapped[str] = mapped_column(String(255), unique=True)
     size_bytes: Mapped[int] = mapped_column(BigInteger)
+    # время последнего heartbeat от сервиса загрузки хранилища
+    last_heartbeat: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     def __repr__(self):
         return f"<S3Storage {self.url}>"
@@ -31,3 +35,16 @@ class Film(Base):
 
     def __repr__(self):
         return f"<Film {self.id}>"
+
+
+class FilmStorageEvent(Base):
+    """Журнал изменений расположения фильмов по хранилищам, читается сервисом маршрутизации"""
+
+    __tablename__ = "films_s3storages_events"
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    film_id: Mapped[Uuid] = mapped_column(Uuid)
+    s3storage_id: Mapped[str] = mapped_column(String(50))
+    action: Mapped[str] = mapped_column(String(10))
+
+    def __repr__(self):
+        return f"<FilmStorageEvent {self.action} {self.film_id} {self.s3storage_id}>"
@@ -1,3 +1,4 @@
 from app.schemas.film import Film, FilmCreate, FilmSync, FilmUpdate  # noqa
+from app.schemas.film_location import FilmLocationEvent, FilmLocationEvents, FilmLocations  # noqa
 from app.schemas.s3storage import S3Storage, S3StorageCreate, S3StorageUpdate  # noqa
 from app.schemas.sync import Action, Event, Movie, SyncTask, UploadTask  # noqa
@@ -0,0 +1,26 @@
+from typing import Literal
+from uuid import UUID
+
+from app.schemas.base_class import BaseSchema
+
+
+class FilmLocations(BaseSchema):
+    """Хранилища каждого фильма на момент события last_event_id."""
+
+    last_event_id: int
+    films: dict[UUID, list[str]]
+
+
+class FilmLocationEvent(BaseSchema):
+    id: int
+    film_id: UUID
+    s3storage_id: str
+    action: Literal["ADD", "REMOVE"]
+
+
+class FilmLocationEvents(BaseSchema):
+    """Изменения расположения фильмов после события since."""
+
+    last_event_id: int
+    events: list[FilmLocationEvent]
+    has_more: bool
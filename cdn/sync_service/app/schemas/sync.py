@@ -1,6 +1,8 @@
 from typing import Literal
 from uuid import UUID
 
+from pydantic import root_validator
+
 from app.schemas.base_class import BaseSchema
 
 
@@ -11,6 +13,9 @@ class Movie(BaseSchema):
 class UploadTask(BaseSchema):
     movie_id: UUID
     storage_url: str
+    # load_service копирует сначала популярные фильмы, из них - маленькие
+    size_bytes: int | None = None
+    score: float | None = None
 
 
 class SyncTask(BaseSchema):
@@ -25,3 +30,10 @@ class Action(BaseSchema):
 
 class Event(BaseSchema):
     actions: list[Action]
+
+    @root_validator(pre=True)
+    def items_to_actions(cls, values):
+        # load_service присылает действия под ключом items
+        if "actions" not in values and "items" in values:
+            values = {**values, "actions": values["items"]}
+        return values
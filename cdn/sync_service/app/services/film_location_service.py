@@ -0,0 +1,53 @@
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import FilmStorageEvent, films_s3storages
+
+ADD = "ADD"
+REMOVE = "REMOVE"
+# ключ advisory lock, под которым пишутся события журнала
+EVENTS_LOCK_KEY = 0x66696C6D
+
+
+class FilmLocationService:
+    """Расположение фильмов по хранилищам и журнал его изменений"""
+
+    model = FilmStorageEvent
+
+    async def add_events(self, session: AsyncSession, film_ids: list[UUID], storage_id: str, action: str):
+        """
+        Добавляет события в сессию, сохраняются вместе с изменением films_s3storages.
+        id событий выдаются при вставке, а видны они после commit, поэтому транзакции
+        с событиями идут по очереди: блокировка держится до конца транзакции, и событие
+        с меньшим id не может появиться после большего - курсор since его не пропустит
+        """
+        if not film_ids:
+            return
+        await session.execute(select(func.pg_advisory_xact_lock(EVENTS_LOCK_KEY)))
+        session.add_all([self.model(film_id=film_id, s3storage_id=storage_id, action=action) for film_id in film_ids])
+
+    async def begin_snapshot(self, session: AsyncSession):
+        """Все следующие чтения сессии до конца транзакции видят один снимок базы"""
+        await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    async def read_last_event_id(self, session: AsyncSession) -> int:
+        result = await session.execute(select(func.coalesce(func.max(self.model.id), 0)))
+        return result.scalar_one()
+
+    async def read_locations(self, session: AsyncSession) -> dict[UUID, list[str]]:
+        result = await session.execute(select(films_s3storages.c.film_id, films_s3storages.c.s3storage_id))
+        locations: dict[UUID, list[str]] = {}
+        for film_id, storage_id in result:
+            locations.setdefault(film_id, []).append(storage_id)
+        return locations
+
+    async def read_events(self, session: AsyncSession, since: int, limit: int) -> list[FilmStorageEvent]:
+        result = await session.scalars(
+            select(self.model).filter(self.model.id > since).order_by(self.model.id).limit(limit)
+        )
+        return result.all()
+
+
+film_location_service = FilmLocationService()
@@ -7,6 +7,7 @@ from sqlalchemy.orm import selectinload
 from app.models.models import Film, S3Storage, films_s3storages
 from app.schemas import FilmCreate, FilmUpdate
 from app.services.crud_base import CRUDBase
+from app.services.film_location_service import ADD, REMOVE, film_location_service
 
 
 class FilmService(CRUDBase[Film, FilmCreate, FilmUpdate]):
@@ -32,6 +33,7 @@ class FilmService(CRUDBase[Film, FilmCreate, FilmUpdate]):
             # добавляем существующий фильм в хранилище
             film.storages.append(storage)
 
+        await film_location_service.add_events(session, [film_id], storage.id, ADD)
         await session.commit()
         return film
 
@@ -46,6 +48,7 @@ class FilmService(CRUDBase[Film, FilmCreate, FilmUpdate]):
         )
         film = result.scalar_one()
         film.storages.remove(storage)
+        await film_location_service.add_events(session, [film_id], storage.id, REMOVE)
         await session.commit()
         return film
 
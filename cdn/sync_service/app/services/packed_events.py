@@ -0,0 +1,84 @@
+"""
+Форматы событий хранилища (POST /storages/{storage_id}/events).
+JSON - {"actions": [{"action": "UPLOAD", "movie_id": "<uuid>"}, ...]}.
+Упакованный (CONTENT_TYPE) - байт версии формата, затем записи по 17 байт:
+16 байт UUID фильма и байт действия. Тело любого формата может быть сжато
+zlib (Content-Encoding: deflate), распакованное тело не больше MAX_BODY байт.
+"""
+import zlib
+from uuid import UUID
+
+import orjson
+from pydantic import ValidationError
+
+from app.schemas import Action, Event
+
+JSON_CONTENT_TYPE = "application/json"
+CONTENT_TYPE = "application/vnd.film-actions"
+VERSION = 1
+RECORD_SIZE = 17
+MAX_BODY = 16 * 1024 * 1024  # около миллиона действий в упакованном формате
+ACTION_CODES = {"UPLOAD": 1, "DELETE": 2}
+ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+
+
+class EventFormatError(ValueError):
+    pass
+
+
+class UnsupportedEventFormat(EventFormatError):
+    pass
+
+
+def pack_actions(actions: list[Action]) -> bytes:
+    records = (action.movie_id.bytes + bytes([ACTION_CODES[action.action]]) for action in actions)
+    return bytes([VERSION]) + b"".join(records)
+
+
+def unpack_actions(data: bytes) -> list[Action]:
+    if not data or data[0] != VERSION:
+        raise EventFormatError("unknown version of packed actions")
+    if (len(data) - 1) % RECORD_SIZE:
+        raise EventFormatError("packed actions are truncated")
+
+    view = memoryview(data)
+    actions = []
+    for offset in range(1, len(data), RECORD_SIZE):
+        action = ACTIONS.get(data[offset + 16])
+        if action is None:
+            raise EventFormatError(f"unknown action code {data[offset + 16]}")
+        # данные уже проверены, валидация pydantic не нужна
+        actions.append(Action.construct(action=action, movie_id=UUID(bytes=bytes(view[offset:offset + 16]))))
+    return actions
+
+
+def decompress(body: bytes) -> bytes:
+    """Распаковка zlib с ограничением размера, чтобы маленькое тело не заняло всю память"""
+    decompressor = zlib.decompressobj()
+    try:
+        data = decompressor.decompress(body, MAX_BODY)
+    except zlib.error as err:
+        raise EventFormatError(str(err))
+    if decompressor.unconsumed_tail:
+        raise EventFormatError(f"decompressed body is larger than {MAX_BODY} bytes")
+    if not decompressor.eof:
+        raise EventFormatError("compressed body is truncated")
+    return data
+
+
+def parse_event(body: bytes, content_type: str, content_encoding: str = "") -> Event:
+    """Событие из тела запроса; EventFormatError - неизвестный формат или ошибка в данных"""
+    if content_encoding == "deflate":
+        body = decompress(body)
+    elif content_encoding and content_encoding != "identity":
+        raise UnsupportedEventFormat(f"unsupported content encoding {content_encoding}")
+
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == CONTENT_TYPE:
+        return Event.construct(actions=unpack_actions(body))
+    if media_type in (JSON_CONTENT_TYPE, ""):
+        try:
+            return Event.parse_obj(orjson.loads(body))
+        except (orjson.JSONDecodeError, ValidationError) as err:
+            raise EventFormatError(str(err))
+    raise UnsupportedEventFormat(f"unsupported content type {content_type}")
@@ -1,12 +1,14 @@
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
-from sqlalchemy import and_, delete, select
+from sqlalchemy import and_, delete, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.models.models import S3Storage, films_s3storages
 from app.schemas import S3StorageCreate, S3StorageUpdate
 from app.services.crud_base import CRUDBase
+from app.services.film_location_service import REMOVE, film_location_service
 
 
 class S3StorageService(CRUDBase[S3Storage, S3StorageCreate, S3StorageUpdate]):
@@ -16,6 +18,22 @@ class S3StorageService(CRUDBase[S3Storage, S3StorageCreate, S3StorageUpdate]):
         )
         return result.scalars().all()
 
+    async def read_alive(self, session: AsyncSession, heartbeat_timeout: int) -> list[S3Storage]:
+        """Хранилища, приславшие heartbeat за последние heartbeat_timeout секунд,
+        и хранилища без сервиса загрузки, которые heartbeat не присылают."""
+        alive_since = datetime.now(timezone.utc) - timedelta(seconds=heartbeat_timeout)
+        result = await session.scalars(
+            select(self.model).filter(
+                or_(self.model.last_heartbeat.is_(None), self.model.last_heartbeat >= alive_since)
+            )
+        )
+        return result.all()
+
+    async def update_heartbeat(self, session: AsyncSession, storage: S3Storage) -> S3Storage:
+        storage.last_heartbeat = datetime.now(timezone.utc)
+        await session.commit()
+        return storage
+
     async def get_master_storage(self, session: AsyncSession) -> S3Storage:
         result = await session.execute(select(self.model).filter(self.model.id == settings.S3_MASTER_ID))
         return result.scalars().one()
@@ -27,9 +45,10 @@ class S3StorageService(CRUDBase[S3Storage, S3StorageCreate, S3StorageUpdate]):
     async def delete_films_from_storage(self, session: AsyncSession, storage_id: str, film_ids: list[UUID]):
         await session.execute(
             delete(films_s3storages).where(
-                and_(films_s3storages.c.storage_id == storage_id, films_s3storages.c.film_id.in_(film_ids))
+                and_(films_s3storages.c.s3storage_id == storage_id, films_s3storages.c.film_id.in_(film_ids))
             )
         )
+        await film_location_service.add_events(session, film_ids, storage_id, REMOVE)
 
 
 s3storage_service = S3StorageService(S3Storage)
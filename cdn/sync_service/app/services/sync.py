@@ -49,9 +49,13 @@ async def make_sync_task(
 
     to_delete = [Movie(movie_id=film_id) for film_id in film_ids_to_delete]
     storages_to_download_from = await select_storages(session, film_ids_to_upload)
+    films = {film.id: film for film in film_scores}
     to_upload = []
     for film_id, storage in zip(film_ids_to_upload, storages_to_download_from):
-        to_upload.append(UploadTask(movie_id=film_id, storage_url=storage.url))
+        film = films[film_id]
+        to_upload.append(
+            UploadTask(movie_id=film_id, storage_url=storage.url, size_bytes=film.size_bytes, score=film.score)
+        )
     return SyncTask(delete=to_delete, upload=to_upload)
 
 
@@ -1,11 +1,16 @@
 from http import HTTPStatus
+from uuid import UUID
 
 import pytest
 from fastapi.encoders import jsonable_encoder
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.db.session import add_storages
+from app.schemas import FilmCreate
+from app.services.film_service import film_service
+from app.services.s3storage_service import s3storage_service
 from app.tests import constants
 
 pytestmark = pytest.mark.asyncio
@@ -32,3 +37,30 @@ async def test_put_events(client: AsyncClient, session: AsyncSession):
     assert response.status_code == HTTPStatus.OK
     storage_ips = {storage["ip_address"] for storage in response.json()}
     assert storage_ips == {master_ip, edge_ip}
+
+
+async def test_film_locations(client: AsyncClient, session: AsyncSession):
+    await add_storages(session)
+    film_id = UUID("9d8c7f3e-5a44-4f6b-8a87-2f6a0e3d1b11")
+    master_id = settings.S3_SETTINGS[0].id
+    edge_id = settings.S3_SETTINGS[1].id
+    await film_service.create(session, obj_in=FilmCreate(id=film_id, size_bytes=15))
+    await film_service.add_film_to_storage(session, film_id, await s3storage_service.read(session, id=master_id))
+
+    response = await client.get("api/v1/films/locations")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["films"][str(film_id)] == [master_id]
+    last_event_id = response.json()["last_event_id"]
+
+    await film_service.add_film_to_storage(session, film_id, await s3storage_service.read(session, id=edge_id))
+    await film_service.delete_film_from_storage(session, film_id, await s3storage_service.read(session, id=master_id))
+
+    response = await client.get("api/v1/films/locations/events", params={"since": last_event_id})
+    assert response.status_code == HTTPStatus.OK
+    changes = response.json()
+    assert [(event["action"], event["s3storage_id"]) for event in changes["events"]] == [
+        ("ADD", edge_id),
+        ("REMOVE", master_id),
+    ]
+    assert changes["last_event_id"] == changes["events"][-1]["id"]
+    assert changes["has_more"] is False
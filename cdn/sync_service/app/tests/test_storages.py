@@ -1,4 +1,7 @@
+import zlib
+from datetime import timedelta
 from http import HTTPStatus
+from uuid import UUID, uuid4
 
 import pytest
 import pytest_asyncio
@@ -11,6 +14,8 @@ from app import schemas
 from app.core.config import settings
 from app.db.session import add_storages
 from app.models.models import S3Storage
+from app.services.film_service import film_service
+from app.services.packed_events import CONTENT_TYPE, MAX_BODY, EventFormatError, pack_actions, parse_event
 from app.services.s3storage_service import s3storage_service
 
 pytestmark = pytest.mark.asyncio
@@ -122,3 +127,80 @@ async def test_get_storage_by_ip(session: AsyncSession):
     await add_storages(session)
     storage = await s3storage_service.get_storage_by_ip(session, storage_ip)
     assert storage.ip_address == storage_ip
+
+
+async def test_alive_storages(client: AsyncClient, session: AsyncSession, clear_s3storage_table):
+    await add_storages(session)
+    edge_id = settings.S3_SETTINGS[1].id
+    response = await client.post(f"api/v1/storages/{edge_id}/heartbeat")
+    assert response.status_code == HTTPStatus.OK
+
+    edge = await s3storage_service.read(session, id=edge_id)
+    await session.refresh(edge)
+    edge.last_heartbeat -= timedelta(minutes=5)
+    await session.commit()
+
+    response = await client.get("api/v1/storages", params={"alive_for": 60})
+    assert response.status_code == HTTPStatus.OK
+    storage_ids = {storage["id"] for storage in response.json()}
+    assert edge_id not in storage_ids
+    assert settings.S3_SETTINGS[0].id in storage_ids
+
+
+def test_packed_actions_roundtrip():
+    actions = [
+        schemas.Action(action="UPLOAD", movie_id=UUID("3c1f4e7e-3375-4f11-a3f9-e735d3f5ae8e")),
+        schemas.Action(action="DELETE", movie_id=UUID("9d8c7f3e-5a44-4f6b-8a87-2f6a0e3d1b11")),
+    ]
+    body = pack_actions(actions)
+
+    assert len(body) == 1 + 17 * len(actions)
+    assert parse_event(body, CONTENT_TYPE).actions == actions
+    assert parse_event(zlib.compress(body), CONTENT_TYPE, "deflate").actions == actions
+    assert parse_event(b'{"items": [{"action": "UPLOAD", "movie_id": "%s"}]}' % str(actions[0].movie_id).encode(), "")
+
+
+def test_compressed_body_is_limited():
+    bomb = zlib.compress(b"\x00" * (MAX_BODY + 1))
+    with pytest.raises(EventFormatError):
+        parse_event(bomb, CONTENT_TYPE, "deflate")
+
+    body = zlib.compress(pack_actions([schemas.Action(action="UPLOAD", movie_id=uuid4())]))
+    with pytest.raises(EventFormatError):
+        parse_event(body[:-4], CONTENT_TYPE, "deflate")
+
+
+@pytest.mark.parametrize("content_type, packed", [("application/json", False), (CONTENT_TYPE, True)])
+async def test_storage_events(client: AsyncClient, session: AsyncSession, content_type: str, packed: bool):
+    await add_storages(session)
+    film_id = uuid4()
+    edge_id = settings.S3_SETTINGS[1].id
+    await film_service.create(session, obj_in=schemas.FilmCreate(id=film_id, size_bytes=15))
+
+    actions = [schemas.Action(action="UPLOAD", movie_id=film_id)]
+    if packed:
+        body = pack_actions(actions)
+    else:
+        body = schemas.Event(actions=actions).json().encode()
+    response = await client.post(
+        f"api/v1/storages/{edge_id}/events", content=body, headers={"Content-Type": content_type}
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    response = await client.get(f"api/v1/films/{film_id}/storages")
+    assert edge_id in {storage["id"] for storage in response.json()}
+
+
+async def test_storage_events_unknown_format(client: AsyncClient, session: AsyncSession):
+    await add_storages(session)
+    edge_id = settings.S3_SETTINGS[1].id
+
+    response = await client.post(
+        f"api/v1/storages/{edge_id}/events", content=b"\x01", headers={"Content-Type": "application/msgpack"}
+    )
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+    response = await client.post(
+        f"api/v1/storages/{edge_id}/events", content=b"\x01\x00", headers={"Content-Type": CONTENT_TYPE}
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
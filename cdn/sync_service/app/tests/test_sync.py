@@ -26,7 +26,12 @@ async def test_make_sync_task(session: AsyncSession):
     sync_task = SyncTask(
         delete=[Movie(movie_id=UUID("507447e5-1d3a-4e1e-b16a-3868dbc6cf90"))],
         upload=[
-            UploadTask(movie_id=UUID("507447e5-1d3a-4e1e-b16a-3868dbc6cf92"), storage_url=settings.S3_SETTINGS[0].url)
+            UploadTask(
+                movie_id=UUID("507447e5-1d3a-4e1e-b16a-3868dbc6cf92"),
+                storage_url=settings.S3_SETTINGS[0].url,
+                size_bytes=100,
+                score=0.8,
+            )
         ],
     )
     assert result == sync_task
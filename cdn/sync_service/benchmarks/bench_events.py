@@ -0,0 +1,49 @@
+"""
+Storage events benchmark: payload size and parse time of a batch of actions
+in JSON and in the packed format, with and without zlib.
+
+    python -m benchmarks.bench_events --actions 500
+"""
+import argparse
+import timeit
+import zlib
+from uuid import uuid4
+
+from app.schemas import Action, Event
+from app.services.packed_events import CONTENT_TYPE, JSON_CONTENT_TYPE, pack_actions, parse_event
+
+
+def measure(func, number: int, repeat: int = 5) -> float:
+    """Best time of one call in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(args):
+    actions = [Action(action=("UPLOAD", "DELETE")[n % 2], movie_id=uuid4()) for n in range(args.actions)]
+    # тело JSON в том виде, в котором его присылает load_service
+    json_body = Event(actions=actions).json(by_alias=True).replace('"actions"', '"items"', 1).encode()
+    packed_body = pack_actions(actions)
+    payloads = [
+        ("json", json_body, JSON_CONTENT_TYPE, ""),
+        ("json + zlib", zlib.compress(json_body), JSON_CONTENT_TYPE, "deflate"),
+        ("packed", packed_body, CONTENT_TYPE, ""),
+        ("packed + zlib", zlib.compress(packed_body), CONTENT_TYPE, "deflate"),
+    ]
+
+    print(f"{args.actions} actions")
+    print(f"{'format':<16} {'bytes':>10} {'bytes/action':>13} {'parse, us':>12}")
+    for name, body, content_type, encoding in payloads:
+        assert parse_event(body, content_type, encoding).actions == actions
+        parse = measure(lambda: parse_event(body, content_type, encoding), args.number)
+        print(f"{name:<16} {len(body):>10} {len(body) / args.actions:>13.1f} {parse:>12.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actions", type=int, default=500, help="actions in a batch")
+    parser.add_argument("--number", type=int, default=200, help="parse calls per measurement")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -3,6 +3,7 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, Response, HTTPException
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 
 from core.auth_bearer import AccessTokenPayload, jwt_bearer
 from core.core_model import CoreModel
@@ -59,3 +60,26 @@ async def record_movie_request(
         return {"success": True, "id": str(result.inserted_id)}
     except Exception:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Insert error")
+
+
+@router.post(
+    "/record_films",
+    summary="Add a batch of film requests",
+    status_code=HTTPStatus.NO_CONTENT,
+)
+async def record_movie_requests(
+    records: list[RecordMovie],
+    db: AsyncIOMotorClient = Depends(get_session),
+) -> Response:
+    """
+    Batch version of record_film for the routing service.
+    A film request of a user is stored once, repeated records are ignored.
+    """
+    if records:
+        operations = []
+        for record in records:
+            record_film = RecordFilm(film_id=str(record.film_id), user_id=str(record.user_id))
+            operations.append(UpdateOne(record_film.dict(), {"$setOnInsert": record_film.dict()}, upsert=True))
+        await db["record_films"].bulk_write(operations, ordered=False)
+
+    return Response(status_code=HTTPStatus.NO_CONTENT)